@@ -0,0 +1,285 @@
+"""
+Benchmark suite for run_regression / run_classification / run_clustering.
+
+Times every registered dataset plus synthetic datasets at increasing sizes,
+broken down per stage and per model (from each payload's `timings` block),
+and records the peak RSS of every case. Each case runs in a fresh process so
+RSS and warm caches do not leak between cases.
+
+    python benchmark.py run --out benchmarks/baseline.json
+    python benchmark.py run --sizes 10000,100000 --compare benchmarks/baseline.json
+    python benchmark.py compare benchmarks/baseline.json benchmarks/current.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+
+TASKS = ("regression", "classification", "clustering")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+SYNTHETIC_FEATURES = 10
+
+
+def _registry(task):
+    if task == "regression":
+        from ml.regression import REGRESSION_DATASETS, run_regression
+        return REGRESSION_DATASETS, run_regression
+    if task == "classification":
+        from ml.classification import CLASSIFICATION_DATASETS, run_classification
+        return CLASSIFICATION_DATASETS, run_classification
+    from ml.clustering import CLUSTERING_DATASETS, run_clustering
+    return CLUSTERING_DATASETS, run_clustering
+
+
+def _make_synthetic(task, rows):
+    from sklearn.datasets import make_blobs, make_classification, make_regression
+    from sklearn.utils import Bunch
+
+    if task == "regression":
+        X, y = make_regression(n_samples=rows, n_features=SYNTHETIC_FEATURES, n_informative=6, noise=10.0, random_state=0)
+        target_names = []
+    elif task == "classification":
+        X, y = make_classification(n_samples=rows, n_features=SYNTHETIC_FEATURES, n_informative=6,
+                                   n_classes=3, random_state=0)
+        target_names = ["class_0", "class_1", "class_2"]
+    else:
+        X, y = make_blobs(n_samples=rows, centers=4, n_features=SYNTHETIC_FEATURES, random_state=0)
+        target_names = ["blob_0", "blob_1", "blob_2", "blob_3"]
+    return Bunch(
+        data=X.astype("float32"),
+        target=y.astype("float32" if task == "regression" else "int32"),
+        feature_names=[f"x{i}" for i in range(SYNTHETIC_FEATURES)],
+        target_names=target_names,
+        DESCR=f"Synthetic {task} benchmark dataset with {rows:,} rows.",
+    )
+
+
+def _register_synthetic(task, rows):
+    """Add a synthetic dataset to the task's registry (in this process) and return its id."""
+    import functools
+
+    registry, _ = _registry(task)
+    dataset_id = f"synthetic-{rows}"
+    registry[dataset_id] = {
+        "name": f"Synthetic {rows:,} rows",
+        "loader": functools.partial(_make_synthetic, task, rows),
+        "store_key": f"bench-{task}-{rows}",
+        "target_name": "y",
+        "is_artificial": True,
+    }
+    return dataset_id
+
+
+def _case_main(conn, task, dataset_name, rows, parallel):
+    """Child process: materialize the dataset untimed, then time one run."""
+    try:
+        from ml.datastore import load_registered
+
+        if rows is not None:
+            dataset_name = _register_synthetic(task, rows)
+        registry, run = _registry(task)
+        raw = load_registered(registry[dataset_name])
+        start = time.perf_counter()
+        payload = run(dataset_name, parallel=parallel)
+        wall = time.perf_counter() - start
+        conn.send({
+            "status": "ok",
+            "rows": int(raw.data.shape[0]),
+            "features": int(raw.data.shape[1]),
+            "wall": round(wall, 4),
+            "timings": payload["timings"],
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        })
+    except Exception as e:
+        conn.send({"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(task, dataset_name, rows=None, parallel=False, timeout=600):
+    """Run one case in a fresh spawned process; returns its measurements or an error/timeout record."""
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_case_main, args=(child, task, dataset_name, rows, parallel), daemon=True)
+    proc.start()
+    child.close()
+    try:
+        if parent.poll(timeout):
+            return parent.recv()
+        return {"status": "timed_out", "error": f"exceeded {timeout}s"}
+    except EOFError:
+        return {"status": "error", "error": f"worker exited with code {proc.exitcode}"}
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+
+
+def _best_of(results):
+    """Element-wise minimum over repeats: the least noisy estimate of each duration."""
+    best = dict(results[0])
+    timings = best["timings"] = json.loads(json.dumps(results[0]["timings"]))
+    for other in results[1:]:
+        best["wall"] = min(best["wall"], other["wall"])
+        best["peak_rss_mb"] = max(best["peak_rss_mb"], other["peak_rss_mb"])
+        timings["total"] = min(timings["total"], other["timings"]["total"])
+        for stage, seconds in other["timings"]["stages"].items():
+            timings["stages"][stage] = min(timings["stages"].get(stage, seconds), seconds)
+        for model, phases in other["timings"]["models"].items():
+            for phase, seconds in phases.items():
+                current = timings["models"].setdefault(model, {})
+                current[phase] = min(current.get(phase, seconds), seconds)
+    return best
+
+
+def run_suite(tasks, sizes, builtin=True, parallel=False, repeat=1, timeout=600, log=print):
+    cases = []
+    for task in tasks:
+        if builtin:
+            registry, _ = _registry(task)
+            cases += [(task, name, None) for name in registry]
+        cases += [(task, None, rows) for rows in sizes]
+
+    results = {}
+    for task, dataset_name, rows in cases:
+        case_id = f"{task}/{dataset_name or f'synthetic-{rows}'}"
+        log(f"⏱️  {case_id} ...")
+        runs = []
+        for _ in range(repeat):
+            result = run_case(task, dataset_name, rows, parallel, timeout)
+            if result["status"] != "ok":
+                runs = [result]
+                break
+            runs.append(result)
+        result = _best_of(runs) if runs[0]["status"] == "ok" else runs[0]
+        results[case_id] = {"task": task, "synthetic": rows is not None, **result}
+        if result["status"] == "ok":
+            stages = ", ".join(f"{k}={v:.3f}" for k, v in result["timings"]["stages"].items())
+            log(f"   {result['rows']:,} rows | total {result['timings']['total']:.3f}s | "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB | {stages}")
+        else:
+            log(f"   ⚠️  {result['status']}: {result['error']}")
+
+    return {"meta": _environment(parallel, repeat), "cases": results}
+
+
+def _environment(parallel, repeat):
+    import numpy
+    import pandas
+    import sklearn
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {"numpy": numpy.__version__, "pandas": pandas.__version__, "scikit-learn": sklearn.__version__},
+        "parallel": parallel,
+        "repeat": repeat,
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_seconds=0.05):
+    """
+    Regressions of `current` against `baseline`: every total / stage / model-phase
+    duration that grew by more than `threshold` (relative) and `min_seconds`, plus
+    cases that ran in the baseline but fail now.
+    """
+    regressions = []
+
+    def check(case_id, metric, old, new):
+        if old is not None and new is not None and new - old > min_seconds and new > old * (1 + threshold):
+            regressions.append({"case": case_id, "metric": metric, "baseline": old, "current": new,
+                                "change": round(new / old - 1, 3) if old else None})
+
+    for case_id, old in baseline["cases"].items():
+        new = current["cases"].get(case_id)
+        if new is None or old["status"] != "ok":
+            continue
+        if new["status"] != "ok":
+            regressions.append({"case": case_id, "metric": new["status"], "baseline": old["timings"]["total"],
+                                "current": None, "change": None})
+            continue
+        check(case_id, "total", old["timings"]["total"], new["timings"]["total"])
+        for stage, seconds in old["timings"]["stages"].items():
+            check(case_id, f"stage:{stage}", seconds, new["timings"]["stages"].get(stage))
+        for model, phases in old["timings"]["models"].items():
+            for phase, seconds in phases.items():
+                check(case_id, f"{model}:{phase}", seconds, new["timings"]["models"].get(model, {}).get(phase))
+    return regressions
+
+
+def _report(regressions, threshold, log=print):
+    if not regressions:
+        log(f"✅ No slowdowns beyond {threshold:.0%}")
+        return 0
+    log(f"❌ {len(regressions)} slowdown(s) beyond {threshold:.0%}:")
+    for r in regressions:
+        change = f"+{r['change']:.0%}" if r["change"] is not None else r["metric"]
+        current = f"{r['current']:.3f}s" if r["current"] is not None else "—"
+        log(f"   {r['case']:<40} {r['metric']:<40} {r['baseline']:.3f}s → {current} ({change})")
+    return 1
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="run the benchmark suite and save a JSON baseline")
+    run_p.add_argument("--tasks", default=",".join(TASKS), help="comma-separated subset of %(default)s")
+    run_p.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                       help="synthetic dataset sizes in rows (empty for none)")
+    run_p.add_argument("--no-builtin", action="store_true", help="skip the registered datasets")
+    run_p.add_argument("--parallel", action="store_true", help="train each catalog in parallel mode")
+    run_p.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is kept")
+    run_p.add_argument("--timeout", type=float, default=600, help="seconds before a case is abandoned")
+    run_p.add_argument("--out", help="write results to this JSON file")
+    run_p.add_argument("--compare", metavar="BASELINE", help="compare against a saved baseline and fail on slowdowns")
+    run_p.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that fails a compare")
+
+    cmp_p = sub.add_parser("compare", help="compare two saved result files")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.2)
+    cmp_p.add_argument("--min-seconds", type=float, default=0.05, help="ignore changes smaller than this")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        regressions = compare(_load(args.baseline), _load(args.current), args.threshold, args.min_seconds)
+        return _report(regressions, args.threshold)
+
+    tasks = [t for t in args.tasks.split(",") if t]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    # Keep benchmark models out of the server's model directory
+    os.environ.setdefault("ML_MODEL_DIR", tempfile.mkdtemp(prefix="ml-bench-models-"))
+    results = run_suite(tasks, sizes, builtin=not args.no_builtin, parallel=args.parallel,
+                        repeat=args.repeat, timeout=args.timeout)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved {len(results['cases'])} cases to {args.out}")
+    if args.compare:
+        return _report(compare(_load(args.compare), results, args.threshold), args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+HTTP load generator for the API.
+
+Drives the FastAPI app either in-process (through httpx's ASGI transport) or
+over the network against a running server (e.g. a local uvicorn), with a
+configurable number of concurrent virtual users, a weighted request mix and a
+ramp profile. Reports throughput, p50/p95/p99 latency and error rates per
+request kind, plus server CPU saturation.
+
+    python loadtest.py --concurrency 50 --duration 60
+    python loadtest.py --url http://localhost:8000 --server-pid $(pgrep -of uvicorn) \\
+        --stages 10:30,50:60,0:10 --mix datasets=4,train=1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+
+TASKS = ("regression", "classification", "clustering")
+DEFAULT_MIX = "datasets=4,train=1,health=1"
+
+
+# ── Request mix ────────────────────────────────────────────────
+def _request_datasets(rng, catalog):
+    return f"/api/{rng.choice(TASKS)}/datasets"
+
+
+def _request_train(rng, catalog):
+    task = rng.choice([t for t in TASKS if catalog[t]])
+    return f"/api/{task}/train?dataset={rng.choice(catalog[task])}"
+
+
+def _request_health(rng, catalog):
+    return "/health"
+
+
+def _request_metrics(rng, catalog):
+    return "/metrics"
+
+
+REQUEST_KINDS = {
+    "datasets": _request_datasets,
+    "train": _request_train,
+    "health": _request_health,
+    "metrics": _request_metrics,
+}
+
+
+def parse_mix(spec):
+    """'datasets=4,train=1' -> ([kinds], [weights])"""
+    kinds, weights = [], []
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind {kind!r}; choose from {', '.join(REQUEST_KINDS)}")
+        kinds.append(kind)
+        weights.append(float(weight or 1))
+    return kinds, weights
+
+
+def parse_stages(spec):
+    """'10:30,50:60' -> [(10, 30.0), (50, 60.0)]: ramp linearly to N users over S seconds, k6-style."""
+    stages = []
+    for part in spec.split(","):
+        users, _, seconds = part.partition(":")
+        stages.append((int(users), float(seconds)))
+    return stages
+
+
+def target_users(stages, elapsed, start_users=0):
+    """Virtual users the ramp profile asks for `elapsed` seconds into the run (None once it is over)."""
+    previous = start_users
+    for users, seconds in stages:
+        if elapsed < seconds:
+            return round(previous + (users - previous) * elapsed / seconds) if seconds else users
+        elapsed -= seconds
+        previous = users
+    return None
+
+
+# ── Server CPU ─────────────────────────────────────────────────
+def _process_tree_cpu_seconds(pid):
+    """user+system CPU seconds of `pid` and all its descendants (Linux /proc), or None."""
+    ticks = os.sysconf("SC_CLK_TCK")
+    try:
+        stats = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        fields = f.read().rsplit(")", 1)[1].split()
+                except OSError:
+                    continue
+                stats[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))
+    except OSError:
+        return None
+    if pid not in stats:
+        return None
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [p for p, (ppid, _) in stats.items() if ppid == parent and p not in tree]
+        tree.update(children)
+        frontier += children
+    return sum(stats[p][1] for p in tree) / ticks
+
+
+class CpuMonitor:
+    """
+    Samples server CPU use once a second: a server pid's process tree, or this
+    process when driving the app in-process (which then includes the load generator).
+    """
+
+    def __init__(self, pid=None):
+        self.pid = pid
+        self.samples = []
+
+    def cpu_seconds(self):
+        if self.pid is None:
+            t = os.times()
+            return t.user + t.system
+        return _process_tree_cpu_seconds(self.pid)
+
+    async def run(self, stop):
+        last_cpu, last_wall = self.cpu_seconds(), time.perf_counter()
+        while not stop.is_set() and last_cpu is not None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            cpu, wall = self.cpu_seconds(), time.perf_counter()
+            if cpu is None:
+                break
+            self.samples.append((cpu - last_cpu) / (wall - last_wall))
+            last_cpu, last_wall = cpu, wall
+
+    def summary(self):
+        if not self.samples:
+            return None
+        cpus = os.cpu_count() or 1
+        mean = float(np.mean(self.samples))
+        return {
+            "cores_busy_mean": round(mean, 2),
+            "cores_busy_max": round(float(np.max(self.samples)), 2),
+            "utilization_mean": round(mean / cpus, 3),
+            "utilization_max": round(float(np.max(self.samples)) / cpus, 3),
+            "cpus": cpus,
+            "saturated_seconds": sum(1 for s in self.samples if s >= 0.9 * cpus),
+        }
+
+
+# ── Load generation ────────────────────────────────────────────
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.timeline = defaultdict(int)
+
+    def record(self, kind, seconds, error, started):
+        self.latencies[kind].append(seconds)
+        if error is not None:
+            self.errors[kind][error] += 1
+        self.timeline[int(started)] += 1
+
+
+async def _user(client, kinds, weights, catalog, recorder, stop, rng, t0, think_time):
+    while not stop.is_set():
+        kind = rng.choices(kinds, weights)[0]
+        path = REQUEST_KINDS[kind](rng, catalog)
+        start = time.perf_counter()
+        error = None
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                error = str(response.status_code)
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        recorder.record(kind, time.perf_counter() - start, error, start - t0)
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def _catalog(client, datasets=None):
+    """Datasets /train requests pick from: given `task:dataset` pairs, else everything the server lists."""
+    catalog = {task: [] for task in TASKS}
+    if datasets:
+        for pair in datasets.split(","):
+            task, _, name = pair.partition(":")
+            catalog[task].append(name)
+        return catalog
+    for task in TASKS:
+        response = await client.get(f"/api/{task}/datasets")
+        response.raise_for_status()
+        catalog[task] = [d["id"] for d in response.json()]
+    return catalog
+
+
+async def run_load(client, stages, mix=DEFAULT_MIX, datasets=None, think_time=0.0, server_pid=None,
+                   in_process=False, seed=0, log=print):
+    kinds, weights = parse_mix(mix)
+    catalog = await _catalog(client, datasets)
+    recorder = Recorder()
+    monitor = CpuMonitor(None if in_process else server_pid)
+    monitor_stop = asyncio.Event()
+    monitor_task = asyncio.create_task(monitor.run(monitor_stop)) if in_process or server_pid else None
+
+    users = []  # (task, stop event)
+    t0 = time.perf_counter()
+    last_log = 0
+    while True:
+        elapsed = time.perf_counter() - t0
+        target = target_users(stages, elapsed)
+        if target is None:
+            break
+        while len(users) < target:
+            stop = asyncio.Event()
+            rng = random.Random(seed + len(users) + 1000 * int(elapsed))
+            users.append((asyncio.create_task(
+                _user(client, kinds, weights, catalog, recorder, stop, rng, t0, think_time)), stop))
+        while len(users) > target:
+            users.pop()[1].set()
+        if int(elapsed) >= last_log + 5:
+            last_log = int(elapsed)
+            done = sum(len(v) for v in recorder.latencies.values())
+            log(f"   t={int(elapsed):>4}s  users={len(users):>4}  requests={done:,}")
+        await asyncio.sleep(0.1)
+
+    for _, stop in users:
+        stop.set()
+    await asyncio.gather(*(task for task, _ in users), return_exceptions=True)
+    wall = time.perf_counter() - t0
+    if monitor_task is not None:
+        monitor_stop.set()
+        await monitor_task
+    return summarize(recorder, wall, stages, monitor.summary())
+
+
+def _latency_stats(values, wall, errors):
+    ms = np.asarray(values) * 1000
+    n_errors = sum(errors.values())
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / wall, 2),
+        "error_rate": round(n_errors / len(values), 4) if len(values) else 0.0,
+        "errors": dict(errors),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+    }
+
+
+def summarize(recorder, wall, stages, cpu):
+    per_kind = {kind: _latency_stats(v, wall, recorder.errors[kind]) for kind, v in recorder.latencies.items() if v}
+    all_latencies = [x for v in recorder.latencies.values() for x in v]
+    all_errors = defaultdict(int)
+    for errors in recorder.errors.values():
+        for error, n in errors.items():
+            all_errors[error] += n
+    return {
+        "duration_s": round(wall, 2),
+        "stages": stages,
+        "overall": _latency_stats(all_latencies, wall, all_errors) if all_latencies else None,
+        "by_kind": per_kind,
+        "server_cpu": cpu,
+        "timeline_rps": [recorder.timeline.get(s, 0) for s in range(int(wall) + 1)],
+    }
+
+
+def print_report(report, log=print):
+    log(f"\n📈 {report['duration_s']}s, stages {report['stages']}")
+    header = f"{'kind':<10} {'reqs':>8} {'rps':>8} {'err%':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    log(header)
+    log("─" * len(header))
+    rows = list(report["by_kind"].items()) + ([("overall", report["overall"])] if report["overall"] else [])
+    for kind, s in rows:
+        log(f"{kind:<10} {s['requests']:>8,} {s['throughput_rps']:>8.1f} {s['error_rate'] * 100:>6.2f}% "
+            f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+    if report["overall"] and report["overall"]["errors"]:
+        log(f"Errors: {report['overall']['errors']}")
+    cpu = report["server_cpu"]
+    if cpu:
+        log(f"Server CPU: {cpu['cores_busy_mean']:.2f} cores busy on average (peak {cpu['cores_busy_max']:.2f}) "
+            f"of {cpu['cpus']} — {cpu['utilization_mean']:.0%} mean utilization, "
+            f"saturated for {cpu['saturated_seconds']}s")
+
+
+async def _main(args):
+    stages = parse_stages(args.stages or f"{args.concurrency}:{args.duration}")
+    if args.ramp_up:
+        stages.insert(0, (stages[0][0], args.ramp_up))
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            return await run_load(client, stages, args.mix, args.datasets, args.think_time, args.server_pid, seed=args.seed)
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            return await run_load(client, stages, args.mix, args.datasets, args.think_time, in_process=True, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: drive the app in-process)")
+    parser.add_argument("--server-pid", type=int, help="pid of the server (e.g. uvicorn master) to sample CPU from")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users for a constant profile")
+    parser.add_argument("--duration", type=float, default=30, help="seconds for a constant profile")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds to ramp linearly up to the first stage")
+    parser.add_argument("--stages", help="ramp profile as users:seconds,... (overrides --concurrency/--duration)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"request kinds and weights ({', '.join(REQUEST_KINDS)})")
+    parser.add_argument("--datasets", help="task:dataset pairs /train picks from (default: all listed)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds a user waits between requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"🚀 Load test against {args.url or 'in-process app'}")
+    report = asyncio.run(_main(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,61 @@
-from fastapi import FastAPI, Query
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from ml import classification, clustering, regression
+from ml.regression import run_regression, REGRESSION_DATASETS, build_models as build_regression_models
+from ml.classification import run_classification, CLASSIFICATION_DATASETS, build_models as build_classification_models
+from ml.clustering import run_clustering, CLUSTERING_DATASETS, build_models as build_clustering_models, catalog_for
+from ml.cache import RESULT_CACHE, SINGLE_FLIGHT, make_key, catalog_fingerprint
+from ml.datastore import DATASET_STORE, preload_registries, load_registered
+from ml.ingest import (
+    MAX_UPLOAD_BYTES, IngestError, PipeReader, ingest_csv, ingest_parquet, register_upload, restore_uploads,
+)
+from ml.streaming import stream_run, replay_payload
+from ml.encoding import compress, compress_stream, encode_payload, negotiate_encoding, negotiate_format, to_columnar
+from ml.instrument import METRICS, STARTUP, RequestMetricsMiddleware, observe_timings
+from ml.costmodel import COST_MODEL, plan_catalog
+from ml.parallel import CPU_SCHEDULER
+from ml.pipeline import ARTIFACTS, select_models
+from ml.search import MAX_CANDIDATES, SEARCH_TASKS, TRIAL_CACHE, run_search
+from ml.jobs import JOB_QUEUE, QueueFull, FINISHED, SUCCEEDED
+from ml.registry import MODEL_REGISTRY, predict_batch, decode_columnar
+from ml.warmup import WARMUP, warm_up
+
+
+@asynccontextmanager
+async def lifespan(app):
+    restore_uploads(REGISTRIES)
+    if WARMUP == "off":
+        # Materialize every registered dataset into the mmap store without blocking startup
+        threading.Thread(
+            target=preload_registries,
+            args=(REGRESSION_DATASETS, CLASSIFICATION_DATASETS, CLUSTERING_DATASETS),
+            daemon=True,
+        ).start()
+    else:
+        # Blocks startup, so the worker only accepts connections (and answers /health) once it is warm
+        STARTUP.warmup = await run_in_threadpool(warm_up, WARMUP, _default_runs())
+    STARTUP.mark("ready")
+    yield
+    JOB_QUEUE.shutdown()
 
-from ml.regression import run_regression, REGRESSION_DATASETS
-from ml.classification import run_classification, CLASSIFICATION_DATASETS
-from ml.clustering import run_clustering, CLUSTERING_DATASETS
 
 app = FastAPI(
     title="ML Model Trainer — Sklearn Showcase",
     description="Demonstrates Regression, Classification, and Clustering using sklearn datasets.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -18,6 +65,124 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+
+
+TASKS = {
+    "regression": (REGRESSION_DATASETS, "california", build_regression_models, run_regression),
+    "classification": (CLASSIFICATION_DATASETS, "iris", build_classification_models, run_classification),
+    "clustering": (CLUSTERING_DATASETS, "iris", build_clustering_models, run_clustering),
+}
+REGISTRIES = {task: spec[0] for task, spec in TASKS.items()}
+# Per task: (cheaper variants, catalog model -> its variants, workload of a dataset) for latency budgets
+BUDGETING = {
+    "regression": (regression.build_variants, regression.VARIANTS, regression.workload_for),
+    "classification": (classification.build_variants, classification.VARIANTS, classification.workload_for),
+    "clustering": (clustering.build_variants, clustering.VARIANTS, clustering.workload_for),
+}
+DEFAULT_LATENCY_BUDGET = float(os.environ.get("ML_LATENCY_BUDGET", 0)) or None
+CLUSTERING_MODE = Query("auto", pattern="^(auto|standard|large)$")
+MODEL_SUBSET = Query(None, description="Comma-separated model names to train (default: the whole catalog)")
+RESPONSE_FORMAT = Query(None, pattern="^(records|columnar|binary)$",
+                        description="Payload encoding (default: from the Accept header, else records)")
+STREAM_FORMAT = Query("records", pattern="^(records|columnar)$")
+CV_FOLDS = Query(None, ge=2, le=10, description="Rank models by k-fold cross-validation instead of one 80/20 split")
+EARLY_STOP = Query(False, description="Grow tree ensembles in steps, stopping once a held-out slice stops improving; "
+                                      "the payload gains each ensemble's learning curve")
+LATENCY_BUDGET = Query(None, gt=0, description="Seconds of estimated training time: models that do not fit are "
+                                               "swapped for cheaper variants or skipped (default: ML_LATENCY_BUDGET)")
+
+
+def _catalog(task, dataset_name, mode="auto"):
+    """Fresh catalog a run of `task` will train; for clustering it depends on the dataset size."""
+    if task == "clustering":
+        return catalog_for(dataset_name, mode)
+    return TASKS[task][2]()
+
+
+def _subset(task, dataset_name, models, mode="auto", budget=None, cv=None):
+    """
+    (names, catalog, plan) for a `models=` query: the requested part of the run's
+    catalog, fitted into the latency `budget` if one applies (plan is then the
+    payload's `budget` block, else None).
+    """
+    names = [n.strip() for n in models.split(",") if n.strip()] if models else None
+    try:
+        catalog = select_models(_catalog(task, dataset_name, mode), names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    budget = budget or DEFAULT_LATENCY_BUDGET
+    if budget is None:
+        return names, catalog, None
+
+    build_variants, alternatives, workload_for = BUDGETING[task]
+    workload = workload_for(dataset_name, mode) if task == "clustering" else workload_for(dataset_name)
+    variants = build_variants()
+    names, plan = plan_catalog(task, catalog, variants, alternatives, workload, budget, fits=cv or 1)
+    if not names:
+        raise HTTPException(status_code=400, detail={"message": f"No model fits a {budget:g}s budget", "budget": plan})
+    return names, select_models(catalog, names, variants), plan
+
+
+def _run_options(cv=None, early_stop=False):
+    """The result-cache key options of a supervised run (None for the default mode, so keys stay unchanged)."""
+    return {name: value for name, value in {"cv": cv, "early_stop": early_stop}.items() if value} or None
+
+
+def _with_budget(payload, plan):
+    """The payload with the request's `budget` block; cached payloads never carry one."""
+    return payload if plan is None else {**payload, "budget": plan}
+
+
+def _respond(request, payload, format=None):
+    """A training payload in the format and content encoding the client asked for."""
+    body, media_type = encode_payload(payload, negotiate_format(request.headers.get("accept"), format))
+    body, encoding = compress(body, negotiate_encoding(request.headers.get("accept-encoding")))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def _stream_training(task, dataset_name, models, run, request, format="records", plan=None, options=None):
+    """SSE response for one training run, replayed from the result cache when possible."""
+    key = make_key(task, dataset_name, models, options)
+
+    def encode_result(result):
+        result = _with_budget(result, plan)
+        return to_columnar(result) if format == "columnar" else result
+
+    payload = RESULT_CACHE.get(key)
+    if payload is not None:
+        events = replay_payload(payload, encode_result)
+    else:
+        # Concurrent identical streams share one run; followers get a replay
+        events = stream_run(
+            lambda on_event: SINGLE_FLIGHT.do(key, lambda: run(dataset_name, on_event=on_event)),
+            on_result=lambda result: RESULT_CACHE.put(key, result, task, dataset_name),
+            encode_result=encode_result,
+        )
+    return _sse_response(request, events)
+
+
+def _sse_response(request, events):
+    """`events` as a text/event-stream response, compressed if the client accepts it."""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        # Flushed per frame, so progress events still arrive as they happen
+        events = compress_stream(events, encoding)
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(events, media_type="text/event-stream", headers=headers)
+
+
+def _default_runs():
+    """(name, run) computing each task's default training request into the result cache, for a full warm-up."""
+    def prime(task):
+        _, default, _, run = TASKS[task]
+        return lambda: RESULT_CACHE.get_or_compute(task, default, _catalog(task, default), run)
+
+    return [(f"train_{task}", prime(task)) for task in TASKS]
 
 
 @app.get("/health")
@@ -25,6 +190,45 @@ def health_check():
     return {"status": "ok", "version": "1.0.0"}
 
 
+@app.get("/api/startup")
+def startup_stats():
+    """Seconds from process start to import and readiness, warm-up steps, and each route's first-request latency."""
+    return {"warmup_level": WARMUP, **STARTUP.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request latency, training stage durations, cache and job queue state in Prometheus text format."""
+    cache, single_flight, jobs, models = RESULT_CACHE.stats(), SINGLE_FLIGHT.stats(), JOB_QUEUE.stats(), MODEL_REGISTRY.stats()
+    cpu, startup, trials = CPU_SCHEDULER.stats(), STARTUP.stats(), TRIAL_CACHE.stats()
+    samples = [
+        ("ml_result_cache_entries", "gauge", "Training payloads held in the memory tier.", {None: cache["entries"]}),
+        ("ml_result_cache_bytes", "gauge", "Bytes held in the memory tier.", {None: cache["bytes"]}),
+        ("ml_result_cache_lookups_total", "counter", "Result cache lookups by outcome.",
+         {(("outcome", k),): cache[k] for k in ("memory_hits", "disk_hits", "misses")}),
+        ("ml_result_cache_hit_rate", "gauge", "Fraction of lookups served from the cache.", {None: cache["hit_rate"]}),
+        ("ml_search_trial_cache_entries", "gauge", "Scored search trials held in memory.", {None: trials["entries"]}),
+        ("ml_search_trial_cache_lookups_total", "counter", "Search trial cache lookups by outcome.",
+         {(("outcome", k),): trials[k] for k in ("memory_hits", "disk_hits", "misses")}),
+        ("ml_single_flight_in_flight", "gauge", "Distinct training runs currently being computed.",
+         {None: single_flight["in_flight"]}),
+        ("ml_jobs", "gauge", "Training jobs by status.", {(("status", k),): jobs[k] for k in ("queued", "running")}),
+        ("ml_job_workers", "gauge", "Size of the training worker pool.", {None: jobs["workers"]}),
+        ("ml_model_registry_entries", "gauge", "Fitted pipelines held in memory.", {None: models["entries"]}),
+        ("ml_cpu_cores", "gauge", "CPU cores leased to training runs, by state.",
+         {(("state", "leased"),): cpu["leased"], (("state", "total"),): cpu["cores"]}),
+        ("ml_cpu_runs", "gauge", "Training runs holding or waiting for a CPU lease.",
+         {(("state", "active"),): cpu["active"], (("state", "waiting"),): cpu["waiting"]}),
+        ("ml_cpu_lease_wait_seconds_total", "counter", "Time training runs spent queued for CPU cores.",
+         {None: cpu["wait_seconds"]}),
+        ("ml_startup_seconds", "gauge", "Seconds from process start to each startup milestone.",
+         {(("milestone", k),): v for k, v in startup["milestones"].items()}),
+        ("ml_first_request_seconds", "gauge", "Latency of the first request the process served, by route.",
+         {(("route", k),): v["seconds"] for k, v in startup["first_requests"].items()}),
+    ]
+    return PlainTextResponse(METRICS.render(samples), media_type="text/plain; version=0.0.4")
+
+
 # ── Regression ──────────────────────────────────────────────────
 @app.get("/api/regression/datasets")
 def list_regression_datasets():
@@ -32,9 +236,38 @@ def list_regression_datasets():
 
 
 @app.get("/api/regression/train")
-def train_regression(dataset: str = "california"):
+def train_regression(request: Request, dataset: str = "california", parallel: bool = False,
+                     models: str | None = MODEL_SUBSET, format: str | None = RESPONSE_FORMAT,
+                     budget: float | None = LATENCY_BUDGET, cv: int | None = CV_FOLDS,
+                     early_stop: bool = EARLY_STOP):
     """Train regression models on selected dataset."""
-    return run_regression(dataset)
+    if dataset not in REGRESSION_DATASETS:
+        dataset = "california"
+    names, catalog, plan = _subset("regression", dataset, models, budget=budget, cv=cv)
+    payload = RESULT_CACHE.get_or_compute(
+        "regression", dataset, catalog,
+        lambda name: run_regression(name, parallel=parallel, model_names=names, cv=cv, early_stop=early_stop),
+        options=_run_options(cv, early_stop),
+    )
+    return _respond(request, _with_budget(payload, plan), format)
+
+
+@app.get("/api/regression/train/stream")
+def stream_regression(request: Request, dataset: str = "california", parallel: bool = False,
+                      models: str | None = MODEL_SUBSET, format: str = STREAM_FORMAT,
+                      budget: float | None = LATENCY_BUDGET, cv: int | None = CV_FOLDS,
+                      early_stop: bool = EARLY_STOP):
+    """Train regression models, streaming logs and metric rows as Server-Sent Events."""
+    if dataset not in REGRESSION_DATASETS:
+        dataset = "california"
+    names, catalog, plan = _subset("regression", dataset, models, budget=budget, cv=cv)
+    return _stream_training(
+        "regression", dataset, catalog,
+        lambda name, on_event: run_regression(
+            name, parallel=parallel, on_event=on_event, model_names=names, cv=cv, early_stop=early_stop
+        ),
+        request, format, plan, _run_options(cv, early_stop),
+    )
 
 
 # ── Classification ──────────────────────────────────────────────
@@ -44,9 +277,38 @@ def list_classification_datasets():
 
 
 @app.get("/api/classification/train")
-def train_classification(dataset: str = "iris"):
+def train_classification(request: Request, dataset: str = "iris", parallel: bool = False,
+                         models: str | None = MODEL_SUBSET, format: str | None = RESPONSE_FORMAT,
+                         budget: float | None = LATENCY_BUDGET, cv: int | None = CV_FOLDS,
+                         early_stop: bool = EARLY_STOP):
     """Train classification models on selected dataset."""
-    return run_classification(dataset)
+    if dataset not in CLASSIFICATION_DATASETS:
+        dataset = "iris"
+    names, catalog, plan = _subset("classification", dataset, models, budget=budget, cv=cv)
+    payload = RESULT_CACHE.get_or_compute(
+        "classification", dataset, catalog,
+        lambda name: run_classification(name, parallel=parallel, model_names=names, cv=cv, early_stop=early_stop),
+        options=_run_options(cv, early_stop),
+    )
+    return _respond(request, _with_budget(payload, plan), format)
+
+
+@app.get("/api/classification/train/stream")
+def stream_classification(request: Request, dataset: str = "iris", parallel: bool = False,
+                          models: str | None = MODEL_SUBSET, format: str = STREAM_FORMAT,
+                          budget: float | None = LATENCY_BUDGET, cv: int | None = CV_FOLDS,
+                          early_stop: bool = EARLY_STOP):
+    """Train classification models, streaming logs and metric rows as Server-Sent Events."""
+    if dataset not in CLASSIFICATION_DATASETS:
+        dataset = "iris"
+    names, catalog, plan = _subset("classification", dataset, models, budget=budget, cv=cv)
+    return _stream_training(
+        "classification", dataset, catalog,
+        lambda name, on_event: run_classification(
+            name, parallel=parallel, on_event=on_event, model_names=names, cv=cv, early_stop=early_stop
+        ),
+        request, format, plan, _run_options(cv, early_stop),
+    )
 
 
 # ── Clustering ─────────────────────────────────────────────────
@@ -56,7 +318,345 @@ def list_clustering_datasets():
 
 
 @app.get("/api/clustering/train")
-def train_clustering(dataset: str = "iris"):
-    """Train clustering models on selected dataset."""
-    return run_clustering(dataset)
+def train_clustering(request: Request, dataset: str = "iris", parallel: bool = False, mode: str = CLUSTERING_MODE,
+                     models: str | None = MODEL_SUBSET, format: str | None = RESPONSE_FORMAT,
+                     budget: float | None = LATENCY_BUDGET):
+    """Train clustering models on selected dataset (`mode=large` forces the large-data catalog)."""
+    if dataset not in CLUSTERING_DATASETS:
+        dataset = "iris"
+    names, catalog, plan = _subset("clustering", dataset, models, mode, budget)
+    payload = RESULT_CACHE.get_or_compute(
+        "clustering", dataset, catalog,
+        lambda name: run_clustering(name, parallel=parallel, mode=mode, model_names=names),
+    )
+    return _respond(request, _with_budget(payload, plan), format)
+
+
+@app.get("/api/clustering/train/stream")
+def stream_clustering(request: Request, dataset: str = "iris", parallel: bool = False, mode: str = CLUSTERING_MODE,
+                      models: str | None = MODEL_SUBSET, format: str = STREAM_FORMAT,
+                      budget: float | None = LATENCY_BUDGET):
+    """Train clustering models, streaming logs and metric rows as Server-Sent Events."""
+    if dataset not in CLUSTERING_DATASETS:
+        dataset = "iris"
+    names, catalog, plan = _subset("clustering", dataset, models, mode, budget)
+    return _stream_training(
+        "clustering", dataset, catalog,
+        lambda name, on_event: run_clustering(name, parallel=parallel, on_event=on_event, mode=mode, model_names=names),
+        request, format, plan,
+    )
+
+
+# ── Hyperparameter search ──────────────────────────────────────
+SEARCH_ETA = Query(3, ge=2, le=4, description="Halving rate: each round keeps 1/eta of the candidates at eta x the budget")
+SEARCH_CANDIDATES = Query(MAX_CANDIDATES, ge=2, le=256, description="Grid configurations sampled into the first round")
+
+
+def _search_dataset(task, dataset_name, model_name):
+    """The dataset a search of `task` runs on, after checking the model has a search space."""
+    if task not in SEARCH_TASKS:
+        raise HTTPException(status_code=404, detail=f"Unknown task: {task}")
+    module, registry, default, _ = SEARCH_TASKS[task]
+    if model_name not in module.SEARCH_SPACES:
+        raise HTTPException(status_code=400,
+                            detail=f"No search space for {model_name!r}; choose from {list(module.SEARCH_SPACES)}")
+    return dataset_name if dataset_name in registry else default
+
+
+@app.get("/api/{task}/search")
+def search(task: str, request: Request, model: str, dataset: str | None = None, eta: int = SEARCH_ETA,
+           candidates: int = SEARCH_CANDIDATES, format: str | None = RESPONSE_FORMAT):
+    """Successive-halving hyperparameter search for one model; scored trials are cached, so repeats resume."""
+    dataset = _search_dataset(task, dataset, model)
+    return _respond(request, run_search(task, dataset, model, eta, candidates), format)
+
+
+@app.get("/api/{task}/search/stream")
+def stream_search(task: str, request: Request, model: str, dataset: str | None = None, eta: int = SEARCH_ETA,
+                  candidates: int = SEARCH_CANDIDATES, format: str = STREAM_FORMAT):
+    """Run a search, streaming logs, `trial` results and per-round `leaderboard`s as Server-Sent Events."""
+    dataset = _search_dataset(task, dataset, model)
+    events = stream_run(
+        lambda on_event: run_search(task, dataset, model, eta, candidates, on_event=on_event),
+        encode_result=to_columnar if format == "columnar" else None,
+    )
+    return _sse_response(request, events)
+
+
+# ── Result cache ───────────────────────────────────────────────
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Hit/miss counters and size of the training result cache, plus request coalescing and search trials."""
+    return {
+        **RESULT_CACHE.stats(),
+        "single_flight": SINGLE_FLIGHT.stats(),
+        "artifacts": ARTIFACTS.stats(),
+        "search_trials": TRIAL_CACHE.stats(),
+    }
+
+
+@app.get("/api/cost-model")
+def cost_model_stats():
+    """Calibrated seconds-per-unit fit rates used to plan latency-budgeted catalogs."""
+    return COST_MODEL.stats()
+
+
+@app.delete("/api/cache")
+def invalidate_cache(task: str | None = None, dataset: str | None = None):
+    """Drop cached results and search trials, optionally for one task and/or dataset (unfiltered also drops artifacts)."""
+    if task is None and dataset is None:
+        ARTIFACTS.clear()
+    return {"removed": RESULT_CACHE.invalidate(task, dataset), "search_trials": TRIAL_CACHE.invalidate(task, dataset)}
+
+
+# ── Training jobs ──────────────────────────────────────────────
+class JobRequest(BaseModel):
+    task: str
+    dataset: str | None = None
+    parallel: bool = False
+    timeout: float | None = Field(None, gt=0)
+    mode: str = Field("auto", pattern="^(auto|standard|large)$")
+    models: list[str] | None = None
+    budget: float | None = Field(None, gt=0)
+    cv: int | None = Field(None, ge=2, le=10)
+    early_stop: bool = False
+
+
+def _get_job(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+def _job_status(job):
+    status = job.to_dict()
+    status["position"] = JOB_QUEUE.position(job)
+    return status
+
+
+def _on_job_result(key, task, dataset_name, catalog, result):
+    RESULT_CACHE.put(key, result, task, dataset_name)
+    # Jobs run in worker processes, whose stage histograms and cost model this process never sees
+    observe_timings(task, result["timings"])
+    COST_MODEL.calibrate(task, result["timings"], catalog)
+
+
+@app.post("/api/jobs", status_code=202)
+def submit_job(req: JobRequest):
+    """Queue a training run and return its id immediately."""
+    if req.task not in TASKS:
+        raise HTTPException(status_code=400, detail=f"Unknown task: {req.task}")
+    registry, default = TASKS[req.task][:2]
+    dataset = req.dataset if req.dataset in registry else default
+
+    options = {"parallel": req.parallel}
+    if req.task == "clustering":
+        options["mode"] = req.mode
+    if req.cv:
+        if req.task == "clustering":
+            raise HTTPException(status_code=400, detail="cv applies to regression and classification")
+        options["cv"] = req.cv
+    if req.early_stop:
+        if req.task == "clustering":
+            raise HTTPException(status_code=400, detail="early_stop applies to regression and classification")
+        options["early_stop"] = True
+    names, catalog, plan = _subset(req.task, dataset, ",".join(req.models or []), req.mode, req.budget, req.cv)
+    if names:
+        options["model_names"] = names
+    key = make_key(req.task, dataset, catalog, _run_options(req.cv, req.early_stop))
+    try:
+        job = JOB_QUEUE.submit(
+            req.task, dataset,
+            options=options,
+            timeout=req.timeout,
+            on_result=lambda result: _on_job_result(key, req.task, dataset, catalog, result),
+            result=RESULT_CACHE.get(key),
+            budget=plan,
+        )
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Training queue is full: {e}")
+    return _job_status(job)
+
+
+@app.get("/api/jobs")
+def list_jobs():
+    """Queue depth, worker count and every tracked job."""
+    return {"stats": JOB_QUEUE.stats(), "jobs": JOB_QUEUE.list()}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """Job status; with ?wait=N, long-poll up to N seconds for it to finish."""
+    job = _get_job(job_id)
+    deadline = time.monotonic() + wait
+    while job.status not in FINISHED and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    return _job_status(job)
+
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str, request: Request, format: str | None = RESPONSE_FORMAT):
+    """Training payload of a finished job."""
+    job = _get_job(job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}" + (f": {job.error}" if job.error else ""))
+    return _respond(request, _with_budget(job.result, job.budget), format)
+
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued job, or stop a running one."""
+    return _job_status(JOB_QUEUE.cancel(job_id) or _get_job(job_id))
+
+
+# ── Inference ──────────────────────────────────────────────────
+def _get_pipeline(task, dataset_name, model_name):
+    """
+    Fitted pipeline from the registry, retraining the catalog once if it is
+    missing. Without `model_name`, the highest-ranked model that can predict.
+    """
+    run = TASKS[task][3]
+    models = _catalog(task, dataset_name)
+    key = make_key(task, dataset_name, models)
+    fingerprint = catalog_fingerprint(task, dataset_name, models)
+
+    variants = BUDGETING[task][0]()
+    if model_name is None:
+        names = _ranked_models(task, RESULT_CACHE.get_or_compute(task, dataset_name, models, run))
+    elif model_name in models or model_name in variants:
+        names = [model_name]
+    else:
+        raise HTTPException(status_code=404, detail=f"Unknown model {model_name!r}; choose from {list(models)}")
+
+    def first_fitted():
+        for name in names:
+            pipeline = MODEL_REGISTRY.get(task, dataset_name, fingerprint, name)
+            if pipeline is not None:
+                return name, pipeline
+        return None, None
+
+    found, pipeline = first_fitted()
+    if pipeline is None and model_name in variants:
+        # Variants are only fitted by budgeted runs; retraining the catalog would not produce one
+        raise HTTPException(status_code=404, detail=f"{model_name} has not been trained on {dataset_name}")
+    if pipeline is None:
+        payload, _ = SINGLE_FLIGHT.do(key, lambda: run(dataset_name))
+        RESULT_CACHE.put(key, payload, task, dataset_name)
+        found, pipeline = first_fitted()
+    if pipeline is None:
+        detail = f"{model_name} cannot predict on new data" if model_name else f"No model on {dataset_name} can predict on new data"
+        raise HTTPException(status_code=404, detail=detail)
+    return found, pipeline
+
+
+def _ranked_models(task, payload):
+    """The payload's models, best first by the task's headline metric (unscored ones last)."""
+    metric = SEARCH_TASKS[task][3]
+    ranked = sorted(payload["metrics"], key=lambda row: -np.inf if row.get(metric) is None else row[metric],
+                    reverse=True)
+    return [row["model"] for row in ranked]
+
+
+@app.get("/api/models")
+def list_models():
+    """Fitted pipelines available for /predict."""
+    return {"stats": MODEL_REGISTRY.stats(), "models": MODEL_REGISTRY.list()}
+
+
+@app.post("/api/{task}/predict")
+async def predict(task: str, request: Request, dataset: str | None = None, model: str | None = None,
+                  dtype: str = Query("float64", pattern="^float(32|64)$")):
+    """
+    Score a batch of rows with a fitted model (default: the dataset's best model).
+    Body is JSON `{"rows": [[...], ...]}`, or `application/octet-stream` holding
+    one little-endian `dtype` column per feature, concatenated. Send
+    `Accept: application/octet-stream` to get predictions back as raw float64.
+    """
+    if task not in TASKS:
+        raise HTTPException(status_code=404, detail=f"Unknown task: {task}")
+    registry, default = TASKS[task][:2]
+    dataset = dataset if dataset in registry else default
+
+    model_name, pipeline = await run_in_threadpool(_get_pipeline, task, dataset, model)
+
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/octet-stream"):
+            X = decode_columnar(body, pipeline.n_features_in_, dtype)
+        else:
+            X = np.asarray((await request.json())["rows"], dtype=np.float64)
+        predictions, seconds = await run_in_threadpool(predict_batch, pipeline, X)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch: {e}")
+
+    headers = {"X-Model": model_name, "X-Rows": str(len(predictions)), "X-Predict-Seconds": f"{seconds:.6f}"}
+    if "application/octet-stream" in request.headers.get("accept", ""):
+        return Response(predictions.astype("<f8").tobytes(), media_type="application/octet-stream", headers=headers)
+
+    result = {
+        "task": task,
+        "dataset": dataset,
+        "model": model_name,
+        "n_rows": len(predictions),
+        "predictions": predictions.tolist(),
+        "predict_seconds": round(seconds, 6),
+        "us_per_row": round(seconds * 1e6 / max(len(predictions), 1), 3),
+    }
+    if task == "classification":
+        target_names = np.asarray(load_registered(registry[dataset]).target_names)
+        result["labels"] = target_names[predictions.astype(int)].tolist()
+    return result
+
+
+# ── Dataset uploads ────────────────────────────────────────────
+async def _receive_body(request, sink):
+    """Pass the request body to `sink` chunk by chunk (in the threadpool), enforcing the size limit."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES:,} bytes")
+        if chunk:
+            await run_in_threadpool(sink, chunk)
+    return received
+
+
+@app.post("/api/{task}/upload", status_code=201)
+async def upload_dataset(task: str, request: Request, target: str | None = None, name: str | None = None,
+                         format: str = Query("csv", pattern="^(csv|parquet)$")):
+    """
+    Stream a CSV or Parquet body into the dataset store and register it for `task`.
+    Returns the new dataset id plus row count, ingest throughput and memory usage.
+    """
+    if task not in TASKS:
+        raise HTTPException(status_code=404, detail=f"Unknown task: {task}")
+
+    try:
+        if format == "csv":
+            # Parse concurrently with the upload; the pipe bounds the bytes in flight
+            pipe = PipeReader()
+            ingestion = asyncio.ensure_future(run_in_threadpool(ingest_csv, task, pipe, target, name))
+            ingestion.add_done_callback(lambda _: setattr(pipe, "aborted", True))
+            try:
+                received = await _receive_body(request, pipe.feed)
+                await run_in_threadpool(pipe.finish)
+            except BaseException:
+                pipe.abort()
+                raise
+            report = await ingestion
+        else:
+            # Parquet keeps its schema in a footer, so spool to disk before reading batches
+            os.makedirs(DATASET_STORE.root, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=DATASET_STORE.root, prefix=".upload-", suffix=".parquet") as spool:
+                received = await _receive_body(request, spool.write)
+                spool.flush()
+                report = await run_in_threadpool(ingest_parquet, task, spool.name, target, name)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    register_upload(REGISTRIES, report)
+    return {**report, "uploaded_bytes": received}
+
 
+STARTUP.mark("imported")
@@ -0,0 +1,110 @@
+"""
+Offline dataset bundle.
+Packs every built-in dataset, as the dataset store's `.npy` arrays and metadata,
+into one tar.gz that a fresh container opens with no network access
+(fetch_california_housing otherwise downloads on first use). Build it once where
+the network is available, e.g. in the image build:
+
+    python -m ml.bundle                                  # writes ML_DATASET_BUNDLE (backend/datasets.tar.gz)
+    python -m ml.bundle --output /srv/datasets.tar.gz --allow-missing
+    python -m ml.bundle --list
+
+At runtime the dataset store installs any dataset missing from ML_DATA_DIR from
+the bundle, and only falls back to its loader when the bundle lacks it.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+from importlib.metadata import version
+
+from ml import classification, clustering, regression
+from ml.datastore import DATASET_FILES, DATASET_STORE, FORMAT_VERSION, store_key
+
+
+BUILTIN_REGISTRIES = (
+    regression.REGRESSION_DATASETS,
+    classification.CLASSIFICATION_DATASETS,
+    clustering.CLUSTERING_DATASETS,
+)
+
+
+def builtin_datasets():
+    """Store key -> loader of every registered dataset that is not an upload."""
+    entries = {}
+    for registry in BUILTIN_REGISTRIES:
+        for config in registry.values():
+            if not config.get("uploaded"):
+                entries.setdefault(store_key(config), config["loader"])
+    return entries
+
+
+def build_bundle(path, store=DATASET_STORE, allow_missing=False):
+    """
+    Materialize every built-in dataset in `store` and write them to the bundle
+    at `path` (atomically). Returns the bundle's manifest; raises RuntimeError
+    if a dataset cannot be loaded, unless `allow_missing`.
+    """
+    manifest = {"format": FORMAT_VERSION, "scikit-learn": version("scikit-learn"), "datasets": {}, "missing": {}}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with tarfile.open(tmp, "w:gz") as tar:
+            for key, loader in builtin_datasets().items():
+                try:
+                    raw = store.load(key, loader)
+                except Exception as e:
+                    manifest["missing"][key] = str(e)
+                    continue
+                for name in DATASET_FILES:
+                    tar.add(os.path.join(store.path(key), name), arcname=f"{key}/{name}")
+                manifest["datasets"][key] = {"rows": int(raw.data.shape[0]), "features": int(raw.data.shape[1])}
+
+            blob = json.dumps(manifest, indent=2).encode("utf-8")
+            info = tarfile.TarInfo("manifest.json")
+            info.size = len(blob)
+            tar.addfile(info, io.BytesIO(blob))
+
+        if manifest["missing"] and not allow_missing:
+            raise RuntimeError(f"Could not load {', '.join(manifest['missing'])}; is the network available?")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return manifest
+
+
+def read_manifest(path):
+    with tarfile.open(path) as tar:
+        return json.load(tar.extractfile("manifest.json"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DATASET_STORE.bundle, help="bundle path (default: %(default)s)")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="write the bundle even if some datasets cannot be loaded")
+    parser.add_argument("--list", action="store_true", help="print the manifest of an existing bundle")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print(json.dumps(read_manifest(args.output), indent=2))
+        return 0
+
+    try:
+        manifest = build_bundle(args.output, allow_missing=args.allow_missing)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    for key, error in manifest["missing"].items():
+        print(f"⚠️  Skipped {key}: {error}")
+    size = os.path.getsize(args.output)
+    print(f"📦 Bundled {len(manifest['datasets'])} datasets into {args.output} ({size / 1024 ** 2:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Result cache for the training endpoints.
+Every run_* function is deterministic (random_state=42 everywhere), so a payload
+is fully determined by the task, the dataset, the model catalog, the library
+versions and the payload layout (PAYLOAD_VERSION). Payloads are kept in an
+in-memory LRU and, optionally, in an on-disk tier that survives restarts, one
+`<key>.json` file per entry. Both tiers evict by size. Misses go through a
+single-flight layer so identical concurrent requests train only once.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from importlib.metadata import version
+
+
+# Read from package metadata, so computing a key never imports pandas or scikit-learn
+LIBRARY_VERSIONS = {
+    "numpy": version("numpy"),
+    "pandas": version("pandas"),
+    "sklearn": version("scikit-learn"),
+}
+# Version of the payload layout: bump it whenever a change alters the shape of
+# a training payload, so disk entries written by an older deploy stop matching
+PAYLOAD_VERSION = 3
+
+
+def make_key(task, dataset_name, models, options=None):
+    """Content hash of everything that determines a training payload (`options`: run modes such as cv)."""
+    catalog = {
+        name: {
+            "class": f"{type(model).__module__}.{type(model).__qualname__}",
+            "params": model.get_params(),
+        }
+        for name, model in models.items()
+    }
+    run = {
+        "task": task, "dataset": dataset_name, "models": catalog,
+        "versions": LIBRARY_VERSIONS, "payload_version": PAYLOAD_VERSION,
+    }
+    if options:
+        run["options"] = options
+    blob = json.dumps(run, sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def catalog_fingerprint(task, dataset_name, models):
+    """Short form of make_key, used to version fitted models on disk."""
+    return make_key(task, dataset_name, models)[:16]
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one computation: the first
+    caller (the leader) runs it, later callers block until it finishes and share
+    its result or exception.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """Return (fn() result, shared) where shared is True if another caller computed it."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+                self._counters["leaders"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), **self._counters}
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) cache of training payloads."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()  # key -> (payload, size, task, dataset)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # ── Lookup / store ──────────────────────────────────────────
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry[0]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    header, raw = f.read().split(b"\n", 1)
+                owner = json.loads(header)
+                payload = json.loads(raw)
+                task, dataset_name = owner["task"], owner["dataset"]
+                os.utime(path)
+            except (OSError, ValueError, TypeError, KeyError):
+                payload = None
+            if payload is not None:
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._store_memory(key, payload, len(raw), task, dataset_name)
+                return payload
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key, payload, task, dataset_name):
+        raw = json.dumps(payload).encode("utf-8")
+        with self._lock:
+            self._store_memory(key, payload, len(raw), task, dataset_name)
+        if self.disk_dir:
+            self._write_disk(key, raw, task, dataset_name)
+
+    def get_or_compute(self, task, dataset_name, models, compute, options=None):
+        """
+        Return the cached payload for this run. On a miss, concurrent identical
+        requests share a single computation, whose result is then stored.
+        """
+        key = make_key(task, dataset_name, models, options)
+        payload = self.get(key)
+        if payload is None:
+            payload, _ = SINGLE_FLIGHT.do(key, lambda: self._compute_and_put(key, task, dataset_name, compute))
+        return payload
+
+    def _compute_and_put(self, key, task, dataset_name, compute):
+        payload = compute(dataset_name)
+        self.put(key, payload, task, dataset_name)
+        return payload
+
+    # ── Invalidation / stats ────────────────────────────────────
+    def invalidate(self, task=None, dataset_name=None):
+        """Drop every entry matching task/dataset (None matches all). Returns the count removed."""
+        def matches(t, d):
+            return (task is None or t == task) and (dataset_name is None or d == dataset_name)
+
+        removed = 0
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if matches(e[2], e[3])]:
+                self._bytes -= self._entries.pop(key)[1]
+                removed += 1
+
+        for name in self._disk_files():
+            path = os.path.join(self.disk_dir, name)
+            owner = _read_owner(path)
+            # Entries without a readable header (e.g. an older layout) only go on a full clear
+            if matches(*owner) if owner else (task is None and dataset_name is None):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            })
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        if self.disk_dir:
+            files = self._disk_files()
+            stats["disk_entries"] = len(files)
+            stats["disk_bytes"] = sum(_file_size(os.path.join(self.disk_dir, n)) for n in files)
+            stats["disk_max_bytes"] = self.disk_max_bytes
+        return stats
+
+    # ── Internals ───────────────────────────────────────────────
+    def _store_memory(self, key, payload, size, task, dataset_name):
+        """Insert under self._lock and evict least-recently-used entries past max_bytes."""
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (payload, size, task, dataset_name)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[1]
+            self._counters["evictions"] += 1
+
+    def _disk_files(self):
+        if not self.disk_dir:
+            return []
+        try:
+            return [n for n in os.listdir(self.disk_dir) if n.endswith(".json")]
+        except OSError:
+            return []
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _write_disk(self, key, raw, task, dataset_name):
+        if len(raw) > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # One header line names the run's task and dataset, for invalidate()
+        header = json.dumps({"task": task, "dataset": dataset_name}).encode("utf-8")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(header + b"\n" + raw)
+            os.replace(tmp, path)
+        except OSError:
+            return
+
+        # Evict least-recently-used files (by mtime, refreshed on every hit)
+        files = [os.path.join(self.disk_dir, n) for n in self._disk_files()]
+        files.sort(key=lambda p: _file_mtime(p))
+        total = sum(_file_size(p) for p in files)
+        for p in files:
+            if total <= self.disk_max_bytes:
+                break
+            size = _file_size(p)
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._counters["disk_evictions"] += 1
+
+
+def _read_owner(path):
+    """The (task, dataset) header of a disk entry, or None if it is unreadable."""
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+        return header["task"], header["dataset"]
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+RESULT_CACHE = ResultCache(
+    max_bytes=int(os.environ.get("ML_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    disk_dir=os.environ.get("ML_CACHE_DIR") or None,
+    disk_max_bytes=int(os.environ.get("ML_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024)),
+)
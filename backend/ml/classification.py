@@ -4,203 +4,295 @@ Trains: Logistic Regression, Decision Tree, Random Forest, SVM, KNN
 Returns step-by-step logs, per-model metrics, confusion matrix, and chart data.
 """
 
+import math
 import time
 import numpy as np
-import pandas as pd
-from sklearn.datasets import load_iris, load_breast_cancer, load_wine, load_digits
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.svm import SVC
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    confusion_matrix, classification_report,
-)
+
+from ml.cache import catalog_fingerprint
+from ml.datastore import load_registered, sklearn_loader
+from ml.incremental import can_grow, early_stopping_summary, grow, growth_log
+from ml.metrics import classification_scores
+from ml.pipeline import TrainingRun, select_models
 
 
 CLASSIFICATION_DATASETS = {
     "iris": {
         "name": "Iris Dataset",
-        "loader": load_iris,
+        "loader": sklearn_loader("load_iris"),
     },
     "breast_cancer": {
         "name": "Breast Cancer",
-        "loader": load_breast_cancer,
+        "loader": sklearn_loader("load_breast_cancer"),
     },
     "wine": {
         "name": "Wine Recognition",
-        "loader": load_wine,
+        "loader": sklearn_loader("load_wine"),
     },
     "digits": {
         "name": "Digits Dataset",
-        "loader": load_digits,
+        "loader": sklearn_loader("load_digits"),
     },
 }
 
 
-def run_classification(dataset_name="iris"):
-    logs = []
+def build_models():
+    """Fresh, unfitted instances of every model in the catalog."""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
 
-    def log(msg):
-        logs.append(msg)
+    return {
+        "Logistic Regression": LogisticRegression(max_iter=200, random_state=42),
+        "Decision Tree": DecisionTreeClassifier(max_depth=5, random_state=42),
+        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+        "SVM (RBF Kernel)": SVC(kernel="rbf", random_state=42),
+        "KNN (k=5)": KNeighborsClassifier(n_neighbors=5),
+        "Gradient Boosting": GradientBoostingClassifier(n_estimators=100, random_state=42),
+    }
+
+
+def build_variants():
+    """Cheaper stand-ins a latency budget may train in place of catalog models (see VARIANTS)."""
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from sklearn.svm import LinearSVC
+
+    return {
+        "Random Forest (30 trees)": RandomForestClassifier(n_estimators=30, random_state=42, n_jobs=-1),
+        "SVM (linear)": LinearSVC(dual="auto", random_state=42),
+        "Gradient Boosting (histogram)": HistGradientBoostingClassifier(max_iter=100, random_state=42),
+    }
+
+
+# Catalog model -> its variants, best first
+VARIANTS = {
+    "Random Forest": ["Random Forest (30 trees)"],
+    "SVM (RBF Kernel)": ["SVM (linear)"],
+    "Gradient Boosting": ["Gradient Boosting (histogram)"],
+}
+
+# Catalog model -> hyperparameter grid for /api/classification/search, and the resource
+# successive halving grows (training rows, or n_estimators up to the catalog's)
+SEARCH_SPACES = {
+    "Logistic Regression": {"params": {"C": [0.01, 0.1, 1.0, 10.0, 100.0]}, "resource": "n_samples"},
+    "Decision Tree": {
+        "params": {"max_depth": [3, 5, 10, None], "min_samples_leaf": [1, 5, 20], "criterion": ["gini", "entropy"]},
+        "resource": "n_samples",
+    },
+    "Random Forest": {
+        "params": {"max_depth": [5, 10, None], "max_features": ["sqrt", "log2", 0.5], "min_samples_leaf": [1, 5]},
+        "resource": "n_estimators",
+    },
+    "SVM (RBF Kernel)": {
+        "params": {"C": [0.1, 1.0, 10.0, 100.0], "gamma": ["scale", 0.01, 0.1, 1.0]},
+        "resource": "n_samples",
+    },
+    "KNN (k=5)": {
+        "params": {"n_neighbors": [1, 3, 5, 9, 15, 25], "weights": ["uniform", "distance"]},
+        "resource": "n_samples",
+    },
+    "Gradient Boosting": {
+        "params": {"learning_rate": [0.03, 0.1, 0.3], "max_depth": [2, 3, 5], "subsample": [0.7, 1.0]},
+        "resource": "n_estimators",
+    },
+}
+
+
+def workload(raw_data):
+    """(training rows, features, classes, metric units) the cost model sizes each fit by."""
+    n = len(raw_data.data)
+    return n - math.ceil(n * 0.2), raw_data.data.shape[1], len(raw_data.target_names), 0
+
+
+def workload_for(dataset_name):
+    """The workload run_classification(dataset_name) will train on."""
+    return workload(load_registered(CLASSIFICATION_DATASETS.get(dataset_name, CLASSIFICATION_DATASETS["iris"])))
 
-    # 1. Load dataset
-    if dataset_name not in CLASSIFICATION_DATASETS:
-        dataset_name = "iris"
 
-    config = CLASSIFICATION_DATASETS[dataset_name]
+def run_classification(dataset_name="iris", parallel=False, on_event=None, model_names=None, cv=None,
+                       early_stop=False):
+    run = TrainingRun("classification", CLASSIFICATION_DATASETS, dataset_name, "iris", on_event)
+    config, log = run.config, run.log
+
+    # 1. Load dataset
     log(f"📂 Loading {config['name']}...")
-    raw_data = config["loader"]()
+    raw_data = run.load()
 
-    df = pd.DataFrame(raw_data.data, columns=raw_data.feature_names)
-    df["target"] = raw_data.target
+    n_samples = len(raw_data.data)
     class_names = list(raw_data.target_names)
 
-    log(f"✅ Loaded {len(df)} samples with {len(raw_data.feature_names)} features")
+    log(f"✅ Loaded {n_samples} samples with {len(raw_data.feature_names)} features")
     log(f"📋 Features: {', '.join(raw_data.feature_names)}")
     log(f"🏷️  Classes: {', '.join(class_names)} ({len(class_names)} classes)")
 
-    # 2. Split data
-    log("✂️  Splitting data into 80% train / 20% test...")
-    X = df[raw_data.feature_names]
-    y = df["target"]
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    log(f"   Train: {len(X_train)} samples | Test: {len(X_test)} samples")
-
-    # 3. Scale features
-    log("⚙️  Scaling features with StandardScaler...")
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    # 4. Train models
-    models = {
-        "Logistic Regression": LogisticRegression(max_iter=200, random_state=42),
-        "Decision Tree": DecisionTreeClassifier(max_depth=5, random_state=42),
-        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
-        "SVM (RBF Kernel)": SVC(kernel="rbf", random_state=42),
-        "KNN (k=5)": KNeighborsClassifier(n_neighbors=5),
-        "Gradient Boosting": GradientBoostingClassifier(n_estimators=100, random_state=42),
-    }
-
+    y = raw_data.target
+    models = select_models(build_models(), model_names, build_variants())
     results = []
     best_model = None
+    best_scores = None
     best_acc = -1.0
     best_name = ""
-
-    for name, model in models.items():
-        log(f"🏋️  Training {name}...")
-        start = time.time()
-        model.fit(X_train_scaled, y_train)
-        train_time = time.time() - start
-
-        y_pred = model.predict(X_test_scaled)
-        acc = accuracy_score(y_test, y_pred)
-        prec = precision_score(y_test, y_pred, average="weighted", zero_division=0)
-        rec = recall_score(y_test, y_pred, average="weighted", zero_division=0)
-        f1 = f1_score(y_test, y_pred, average="weighted", zero_division=0)
-
+    learning_curves = {}
+
+    def accuracy(y_true, y_pred):
+        return classification_scores(y_true, y_pred, len(class_names))["accuracy"]
+
+    def fit_on(name, model, X_fit, X_eval, y_fit, y_eval, fold=None):
+        X_fit, X_eval = run.model_inputs(model, X_fit, X_eval, fold=fold)
+        start = time.perf_counter()
+        if early_stop and can_grow(model):
+            growth = grow(model, X_fit, y_fit, accuracy)
+            if fold in (None, 0):
+                learning_curves[name] = growth
+        else:
+            model.fit(X_fit, y_fit)
+        fitted = time.perf_counter()
+        y_pred = model.predict(X_eval)
+        predicted = time.perf_counter()
+        scores = classification_scores(y_eval, y_pred, len(class_names))
+        phases = {"fit": fitted - start, "predict": predicted - fitted, "metrics": time.perf_counter() - predicted}
+        return ((scores, y_pred) if fold is not None else scores), phases
+
+    if cv:
+        # 2-4. Stratified k-fold cross-validation: folds and per-fold scaled matrices are shared by every model
+        log(f"✂️  Splitting data into {cv} stratified cross-validation folds...")
+        folds = run.kfold(y, cv, stratify=True)
+        log(f"   Train: ~{len(folds[0][0])} samples | Test: ~{len(folds[0][1])} samples per fold")
+        log("⚙️  Scaling each fold with StandardScaler...")
+        scaled_folds = run.scale_folds(folds)
+        first_fold_models = {}
+
+        def fit_fold(name, model, fold):
+            (train_idx, test_idx), (X_fit, X_eval) = folds[fold], scaled_folds[fold]
+            if fold == 0:
+                first_fold_models[name] = model
+            return fit_on(name, model, X_fit, X_eval, y[train_idx], y[test_idx], fold)
+
+        trained = _cv_results(run.cross_validate(models, cv, fit_fold, parallel=True), folds, y, len(class_names))
+    else:
+        # 2. Split data
+        log("✂️  Splitting data into 80% train / 20% test...")
+        train_idx, test_idx = run.split(y, stratify=True)
+        y_train, y_test = y[train_idx], y[test_idx]
+        log(f"   Train: {len(train_idx)} samples | Test: {len(test_idx)} samples")
+
+        # 3. Scale features
+        log("⚙️  Scaling features with StandardScaler...")
+        scaler, X_train_scaled, X_test_scaled = run.scale((train_idx, test_idx))
+
+        # 4. Train models
+        if not early_stop:
+            # Early-stopped ensembles fit less than their size predicts; keep them out of the cost model
+            run.workload = workload(raw_data)
+
+        def fit_one(name, model):
+            return fit_on(name, model, X_train_scaled, X_test_scaled, y_train, y_test)
+
+        trained = ((name, scores, train_time, {}) for name, scores, train_time in run.train(models, fit_one, parallel))
+
+    for name, scores, train_time, spread in trained:
+        acc, prec, rec, f1 = scores["accuracy"], scores["precision"], scores["recall"], scores["f1"]
         results.append({
             "model": name,
-            "accuracy": round(acc, 4),
-            "precision": round(prec, 4),
-            "recall": round(rec, 4),
-            "f1_score": round(f1, 4),
+            "accuracy": round(float(acc), 4),
+            "precision": round(float(prec), 4),
+            "recall": round(float(rec), 4),
+            "f1_score": round(float(f1), 4),
             "train_time": round(train_time, 3),
+            **spread,
         })
+        run.emit("metric", results[-1])
 
-        log(f"   ✅ {name}: Accuracy={acc:.4f} | F1={f1:.4f} ({train_time:.3f}s)")
+        if spread:
+            log(f"   ✅ {name}: Accuracy={acc:.4f} ± {spread['accuracy_std']:.4f} | F1={f1:.4f} ({train_time:.3f}s)")
+        else:
+            log(f"   ✅ {name}: Accuracy={acc:.4f} | F1={f1:.4f} ({train_time:.3f}s)")
+        if name in learning_curves:
+            log(growth_log(name, learning_curves[name], "accuracy"))
 
         if acc > best_acc:
             best_acc = acc
-            best_model = model
+            best_scores = scores
+            best_model = first_fold_models[name] if cv else models[name]
             best_name = name
 
     log(f"🏆 Best model: {best_name} (Accuracy={best_acc:.4f})")
 
-    # 5. Confusion matrix for best model
-    y_pred_best = best_model.predict(X_test_scaled)
-    cm = confusion_matrix(y_test, y_pred_best)
-    confusion_matrix_data = {
-        "labels": class_names,
-        "matrix": cm.tolist(),
-    }
-
-    # 6. Classification report for best model
-    report = classification_report(y_test, y_pred_best, target_names=class_names, output_dict=True)
-    per_class_metrics = [
-        {"class": cn, "precision": round(report[cn]["precision"], 4),
-         "recall": round(report[cn]["recall"], 4),
-         "f1_score": round(report[cn]["f1-score"], 4),
-         "support": int(report[cn]["support"])}
-        for cn in class_names
-    ]
-
-    # 7. Feature importance from best model
-    feature_importance = _get_feature_importance(best_model, raw_data.feature_names)
+    if not cv and not early_stop:
+        # Cross-validated and early-stopped fits stay out of the registry; /predict serves the full catalog
+        run.register(catalog_fingerprint("classification", run.dataset_name, build_models()), models, scaler)
+
+    # 5. Confusion matrix for best model (from its scoring pass; out-of-fold with cv)
+    with run.stage("charts"):
+        confusion_matrix_data = {
+            "labels": class_names,
+            "matrix": best_scores["confusion_matrix"].tolist(),
+        }
+
+        # 6. Classification report for best model
+        per_class = best_scores["per_class"]
+        per_class_metrics = [
+            {"class": cn, "precision": round(float(per_class["precision"][i]), 4),
+             "recall": round(float(per_class["recall"][i]), 4),
+             "f1_score": round(float(per_class["f1"][i]), 4),
+             "support": int(per_class["support"][i])}
+            for i, cn in enumerate(class_names)
+        ]
+
+        # 7. Feature importance from best model
+        feature_importance = _get_feature_importance(best_model, raw_data.feature_names)
 
     log("📊 Training complete! Results ready.")
 
     # 8. EDA
-    eda = _compute_eda_classification(df, raw_data.feature_names, class_names)
+    eda = run.eda(raw_data.target, class_names)
 
-    return {
+    return run.finish({
         "dataset": {
             "name": config["name"],
-            "samples": len(df),
+            "samples": n_samples,
             "features": len(raw_data.feature_names),
             "classes": len(class_names),
             "class_names": class_names,
             "description": raw_data.get("DESCR", "")[:300],
         },
-        "logs": logs,
+        "logs": run.logs,
         "metrics": results,
         "best_model": best_name,
         "confusion_matrix": confusion_matrix_data,
         "per_class_metrics": per_class_metrics,
         "feature_importance": feature_importance,
         "eda": eda,
-    }
-
-
-def _compute_eda_classification(df, feature_names, class_names):
-    """Compute EDA stats for Iris dataset."""
-    # Class distribution
-    class_dist = [
-        {"class": class_names[i], "count": int((df["target"] == i).sum())}
-        for i in range(len(class_names))
-    ]
-
-    # Feature stats per feature
-    feature_stats = []
-    for col in feature_names:
-        s = df[col]
-        feature_stats.append({
-            "feature": col,
-            "mean": round(float(s.mean()), 4),
-            "std": round(float(s.std()), 4),
-            "min": round(float(s.min()), 4),
-            "max": round(float(s.max()), 4),
-        })
-
-    # Feature correlation matrix
-    feat_df = df[list(feature_names)]
-    corr = feat_df.corr().round(3)
-    correlation = {
-        "labels": list(feature_names),
-        "matrix": corr.values.tolist(),
-    }
-
-    return {
-        "class_distribution": class_dist,
-        "feature_stats": feature_stats,
-        "correlation": correlation,
-    }
+        **({"cross_validation": _cv_summary(folds)} if cv else {}),
+        **({"early_stopping": early_stopping_summary(learning_curves)} if early_stop else {}),
+    })
+
+
+def _cv_results(folded, folds, y, n_classes):
+    """
+    (name, scores, fit seconds, spread) per model: the mean of each fold's
+    accuracy/precision/recall/F1, with the confusion matrix and per-class
+    metrics of the out-of-fold predictions.
+    """
+    keys = ("accuracy", "precision", "recall", "f1")
+    for name, fold_results, fold_times in folded:
+        y_pred = np.empty_like(y)
+        for (_, test_idx), (_, fold_pred) in zip(folds, fold_results):
+            y_pred[test_idx] = fold_pred
+        fold_scores = np.array([[scores[k] for k in keys] for scores, _ in fold_results])
+        scores = classification_scores(y, y_pred, n_classes)
+        scores.update(zip(keys, fold_scores.mean(axis=0)))
+        spread = {
+            f"{'f1_score' if k == 'f1' else k}_std": round(float(std), 4) for k, std in zip(keys, fold_scores.std(axis=0))
+        }
+        spread["fold_train_times"] = [round(t, 3) for t in fold_times]
+        yield name, scores, sum(fold_times), spread
+
+
+def _cv_summary(folds):
+    """The payload's `cross_validation` block."""
+    return {"folds": len(folds), "stratified": True, "test_sizes": [len(test_idx) for _, test_idx in folds]}
 
 
 def _get_feature_importance(model, feature_names):
@@ -2,181 +2,301 @@
 Clustering demo using the Iris dataset (unsupervised).
 Trains: KMeans, Agglomerative Clustering, DBSCAN
 Returns step-by-step logs, per-model metrics, and 2D PCA scatter data.
+
+Datasets with at least LARGE_DATA_THRESHOLD rows switch to a large-data mode:
+MiniBatchKMeans and BIRCH instead of the O(n²) models, silhouette on a
+label-stratified sample (with a 95% confidence interval), and
+Calinski-Harabasz / Davies-Bouldin accumulated in chunked passes.
 """
 
+import os
 import time
 import numpy as np
-import pandas as pd
-from sklearn.datasets import load_iris, load_wine, load_breast_cancer, make_blobs
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans, AgglomerativeClustering, DBSCAN
-from sklearn.metrics import (
-    silhouette_score,
-    calinski_harabasz_score,
-    davies_bouldin_score,
-)
+
+from ml.cache import catalog_fingerprint
+from ml.datastore import load_registered, sklearn_loader
+from ml.pipeline import TrainingRun, select_models
+from ml.viz import POINT_BUDGET, centroid_distances, density_grid, sampling_summary, stratified_sample
+
+
+LARGE_DATA_THRESHOLD = int(os.environ.get("ML_CLUSTERING_LARGE_THRESHOLD", 20000))
+SILHOUETTE_SAMPLE_SIZE = int(os.environ.get("ML_SILHOUETTE_SAMPLE_SIZE", 5000))
+METRIC_CHUNK_ROWS = 65536
+MODES = ("auto", "standard", "large")
+
+
+def _load_blobs():
+    from sklearn.datasets import make_blobs
+    from sklearn.utils import Bunch
+
+    X, y = make_blobs(n_samples=200, centers=4, n_features=4, random_state=42)
+    return Bunch(
+        data=X,
+        target=y,
+        target_names=["Cluster A", "Cluster B", "Cluster C", "Cluster D"],
+        feature_names=["Feature 1", "Feature 2", "Feature 3", "Feature 4"],
+        DESCR="Artificial dataset generated with Gaussian blobs.",
+    )
 
 
 CLUSTERING_DATASETS = {
     "iris": {
         "name": "Iris Dataset",
-        "loader": lambda: (load_iris().data, load_iris().target, list(load_iris().target_names), load_iris().feature_names, load_iris().DESCR),
+        "loader": sklearn_loader("load_iris"),
         "is_artificial": False,
     },
     "wine": {
         "name": "Wine Dataset",
-        "loader": lambda: (load_wine().data, load_wine().target, list(load_wine().target_names), load_wine().feature_names, load_wine().DESCR),
+        "loader": sklearn_loader("load_wine"),
         "is_artificial": False,
     },
     "breast_cancer": {
         "name": "Breast Cancer",
-        "loader": lambda: (load_breast_cancer().data, load_breast_cancer().target, list(load_breast_cancer().target_names), load_breast_cancer().feature_names, load_breast_cancer().DESCR),
+        "loader": sklearn_loader("load_breast_cancer"),
         "is_artificial": False,
     },
     "blobs": {
         "name": "Gaussian Blobs",
-        "loader": lambda: (
-            *make_blobs(n_samples=200, centers=4, n_features=4, random_state=42),
-            ["Cluster A", "Cluster B", "Cluster C", "Cluster D"],
-            ["Feature 1", "Feature 2", "Feature 3", "Feature 4"],
-            "Artificial dataset generated with Gaussian blobs."
-        ),
+        "loader": _load_blobs,
         "is_artificial": True,
     },
 }
 
 
-def run_clustering(dataset_name="iris"):
-    logs = []
+def build_models(large=False):
+    """Fresh, unfitted instances of every model in the catalog (large-data catalog if `large`)."""
+    from sklearn.cluster import DBSCAN, AgglomerativeClustering, Birch, KMeans, MiniBatchKMeans
 
-    def log(msg):
-        logs.append(msg)
+    if large:
+        return {
+            "MiniBatchKMeans (k=3)": MiniBatchKMeans(n_clusters=3, random_state=42, n_init=3, batch_size=4096),
+            "MiniBatchKMeans (k=4)": MiniBatchKMeans(n_clusters=4, random_state=42, n_init=3, batch_size=4096),
+            "BIRCH (k=3)": Birch(n_clusters=3, threshold=1.0),
+        }
+    return {
+        "KMeans (k=3)": KMeans(n_clusters=3, random_state=42, n_init=10),
+        "KMeans (k=4)": KMeans(n_clusters=4, random_state=42, n_init=10),
+        "Agglomerative (k=3)": AgglomerativeClustering(n_clusters=3),
+        "DBSCAN (eps=0.8)": DBSCAN(eps=0.8, min_samples=5),
+    }
+
+
+def build_variants():
+    """Cheaper stand-ins a latency budget may train in place of standard-catalog models (see VARIANTS)."""
+    from sklearn.cluster import Birch, MiniBatchKMeans
+
+    return {
+        "MiniBatchKMeans (k=3)": MiniBatchKMeans(n_clusters=3, random_state=42, n_init=3, batch_size=4096),
+        "MiniBatchKMeans (k=4)": MiniBatchKMeans(n_clusters=4, random_state=42, n_init=3, batch_size=4096),
+        "BIRCH (k=3)": Birch(n_clusters=3, threshold=1.0),
+    }
+
+
+# Catalog model -> its variants, best first
+VARIANTS = {
+    "KMeans (k=3)": ["MiniBatchKMeans (k=3)"],
+    "KMeans (k=4)": ["MiniBatchKMeans (k=4)"],
+    "Agglomerative (k=3)": ["BIRCH (k=3)"],
+}
+
+# Standard-catalog model -> hyperparameter grid for /api/clustering/search (scored by
+# silhouette), grown over training rows by successive halving
+SEARCH_SPACES = {
+    "KMeans (k=3)": {"params": {"n_clusters": [2, 3, 4, 5, 6, 7, 8]}, "resource": "n_samples"},
+    "Agglomerative (k=3)": {
+        "params": {"n_clusters": [2, 3, 4, 5, 6], "linkage": ["ward", "average", "complete"]},
+        "resource": "n_samples",
+    },
+    "DBSCAN (eps=0.8)": {
+        "params": {"eps": [0.3, 0.5, 0.8, 1.2, 1.6], "min_samples": [3, 5, 10]},
+        "resource": "n_samples",
+    },
+}
+
+
+def workload(raw_data, large=False):
+    """
+    (rows, features, classes, metric units) the cost model sizes each fit by;
+    the metric units are the n² x d silhouette on every row, or on the sample.
+    """
+    n, d = raw_data.data.shape
+    scored = min(n, SILHOUETTE_SAMPLE_SIZE) if large else n
+    return n, d, 1, scored * scored * d
+
+
+def is_large(n_samples, mode="auto"):
+    return mode == "large" or (mode == "auto" and n_samples >= LARGE_DATA_THRESHOLD)
+
+
+def catalog_for(dataset_name, mode="auto"):
+    """The catalog run_clustering(dataset_name, mode=mode) will train."""
+    config = CLUSTERING_DATASETS.get(dataset_name, CLUSTERING_DATASETS["iris"])
+    return build_models(large=is_large(len(load_registered(config).data), mode))
 
-    # 1. Load dataset
-    if dataset_name not in CLUSTERING_DATASETS:
-        dataset_name = "iris"
 
-    config = CLUSTERING_DATASETS[dataset_name]
+def workload_for(dataset_name, mode="auto"):
+    """The workload run_clustering(dataset_name, mode=mode) will train on."""
+    raw_data = load_registered(CLUSTERING_DATASETS.get(dataset_name, CLUSTERING_DATASETS["iris"]))
+    return workload(raw_data, is_large(len(raw_data.data), mode))
+
+
+def run_clustering(dataset_name="iris", parallel=False, on_event=None, mode="auto", model_names=None):
+    from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_score
+
+    run = TrainingRun("clustering", CLUSTERING_DATASETS, dataset_name, "iris", on_event)
+    config, log = run.config, run.log
+
+    # 1. Load dataset
     log(f"📂 Loading {config['name']}...")
-    X_raw, true_labels, target_names, feature_names, descr = config["loader"]()
+    raw_data = run.load()
+    true_labels = raw_data.target
+    target_names, feature_names, descr = raw_data.target_names, raw_data.feature_names, raw_data.DESCR
 
-    df = pd.DataFrame(X_raw, columns=feature_names)
+    n_samples = len(raw_data.data)
 
-    log(f"✅ Loaded {len(df)} samples with {len(feature_names)} features")
+    log(f"✅ Loaded {n_samples} samples with {len(feature_names)} features")
     log(f"📋 Features: {', '.join(feature_names)}")
     log("🔒 Labels hidden — treating as unsupervised problem")
 
+    large = is_large(n_samples, mode)
+    if large:
+        log(f"📏 Large-data mode ({n_samples:,} samples, threshold {LARGE_DATA_THRESHOLD:,}) — "
+            f"mini-batch models, sampled silhouette, chunked metrics")
+
     # 2. Scale features
     log("⚙️  Scaling features with StandardScaler...")
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(df)
+    scaler, X_scaled = run.scale_all()
 
     # 3. PCA for visualization
     log("🔬 Reducing to 2D with PCA for visualization...")
-    pca = PCA(n_components=2, random_state=42)
-    X_2d = pca.fit_transform(X_scaled)
-    explained = pca.explained_variance_ratio_
+    explained, X_2d = run.pca(X_scaled)
     log(f"   Explained variance: PC1={explained[0]:.2%}, PC2={explained[1]:.2%} (Total: {sum(explained):.2%})")
 
     # 4. Train clustering models
-    models = {
-        "KMeans (k=3)": KMeans(n_clusters=3, random_state=42, n_init=10),
-        "KMeans (k=4)": KMeans(n_clusters=4, random_state=42, n_init=10),
-        "Agglomerative (k=3)": AgglomerativeClustering(n_clusters=3),
-        "DBSCAN (eps=0.8)": DBSCAN(eps=0.8, min_samples=5),
-    }
+    models = select_models(build_models(large), model_names, build_variants())
+    run.workload = workload(raw_data, large)
 
     results = []
     best_model_labels = None
     best_sil = -1.0
     best_name = ""
 
-    for name, model in models.items():
-        log(f"🏋️  Training {name}...")
-        start = time.time()
-
-        if hasattr(model, "predict"):
-            labels = model.fit_predict(X_scaled)
-        else:
-            labels = model.fit_predict(X_scaled)
-
-        train_time = time.time() - start
+    def fit_one(name, model):
+        start = time.perf_counter()
+        labels = model.fit_predict(X_scaled)
+        fitted = time.perf_counter()
 
         n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-        n_noise = list(labels).count(-1)
-
+        n_noise = int((labels == -1).sum())
         if n_clusters < 2:
+            return (labels, n_clusters, n_noise, None), {"fit": fitted - start}
+
+        if large:
+            sil, sil_ci, sample_size = sampled_silhouette(X_scaled, labels, SILHOUETTE_SAMPLE_SIZE)
+            ch, db = chunked_ch_db(X_scaled, labels)
+            scores = (sil, ch, db, sil_ci, sample_size)
+            return (labels, n_clusters, n_noise, scores), {"fit": fitted - start, "metrics": time.perf_counter() - fitted}
+
+        scores = (
+            silhouette_score(X_scaled, labels),
+            calinski_harabasz_score(X_scaled, labels),
+            davies_bouldin_score(X_scaled, labels),
+            None,
+            len(labels),
+        )
+        return (labels, n_clusters, n_noise, scores), {"fit": fitted - start, "metrics": time.perf_counter() - fitted}
+
+    for name, (labels, n_clusters, n_noise, scores), train_time in run.train(models, fit_one, parallel):
+        if scores is None:
             log(f"   ⚠️  {name}: Only {n_clusters} cluster found — skipping metrics")
             results.append({
                 "model": name,
                 "n_clusters": n_clusters,
                 "n_noise": n_noise,
                 "silhouette": None,
+                "silhouette_ci95": None,
+                "silhouette_sample_size": None,
                 "calinski_harabasz": None,
                 "davies_bouldin": None,
                 "train_time": round(train_time, 3),
             })
+            run.emit("metric", results[-1])
             continue
 
-        sil = silhouette_score(X_scaled, labels)
-        ch = calinski_harabasz_score(X_scaled, labels)
-        db = davies_bouldin_score(X_scaled, labels)
-
+        sil, ch, db, sil_ci, sample_size = scores
         results.append({
             "model": name,
             "n_clusters": n_clusters,
             "n_noise": n_noise,
-            "silhouette": round(sil, 4),
-            "calinski_harabasz": round(ch, 2),
-            "davies_bouldin": round(db, 4),
+            "silhouette": round(float(sil), 4),
+            "silhouette_ci95": [round(float(v), 4) for v in sil_ci] if sil_ci is not None else None,
+            "silhouette_sample_size": sample_size,
+            "calinski_harabasz": round(float(ch), 2),
+            "davies_bouldin": round(float(db), 4),
             "train_time": round(train_time, 3),
         })
+        run.emit("metric", results[-1])
 
-        log(f"   ✅ {name}: {n_clusters} clusters | Silhouette={sil:.4f} | CH={ch:.1f} ({train_time:.3f}s)")
+        if sil_ci is not None:
+            log(f"   ✅ {name}: {n_clusters} clusters | Silhouette={sil:.4f} "
+                f"(95% CI {sil_ci[0]:.4f}–{sil_ci[1]:.4f}, n={sample_size:,}) | CH={ch:.1f} ({train_time:.3f}s)")
+        else:
+            log(f"   ✅ {name}: {n_clusters} clusters | Silhouette={sil:.4f} | CH={ch:.1f} ({train_time:.3f}s)")
 
         if sil > best_sil:
             best_sil = sil
             best_model_labels = labels
             best_name = name
 
+    if best_model_labels is None:
+        # No model found 2+ clusters (possible with a model subset): chart the last one
+        best_model_labels, best_name = labels, name
     log(f"🏆 Best model: {best_name} (Silhouette={best_sil:.4f})")
 
-    # 5. Chart data — 2D PCA scatter with cluster labels
-    chart_data = [
-        {
-            "x": round(float(X_2d[i, 0]), 3),
-            "y": round(float(X_2d[i, 1]), 3),
-            "cluster": int(best_model_labels[i]),
-            "true_label": target_names[true_labels[i]],
-        }
-        for i in range(len(X_2d))
-    ]
-
-    # 6. True labels scatter for comparison
-    true_chart_data = [
-        {
-            "x": round(float(X_2d[i, 0]), 3),
-            "y": round(float(X_2d[i, 1]), 3),
-            "cluster": int(true_labels[i]),
-            "label": target_names[true_labels[i]],
-        }
-        for i in range(len(X_2d))
-    ]
+    run.register(catalog_fingerprint("clustering", run.dataset_name, build_models(large)), models, scaler)
+
+    # 5. Chart data — 2D PCA scatter with cluster labels, bounded to POINT_BUDGET points
+    with run.stage("charts"):
+        idx = stratified_sample(best_model_labels, POINT_BUDGET, centroid_distances(X_2d, best_model_labels))
+        if len(idx) < n_samples:
+            log(f"🎨 Charting {len(idx):,} of {n_samples:,} points (stratified by cluster, outliers kept)")
+            density = density_grid(X_2d[:, 0], X_2d[:, 1], best_model_labels)
+        else:
+            density = None
+        chart_data = [
+            {
+                "x": round(float(X_2d[i, 0]), 3),
+                "y": round(float(X_2d[i, 1]), 3),
+                "cluster": int(best_model_labels[i]),
+                "true_label": target_names[true_labels[i]],
+            }
+            for i in idx
+        ]
+
+        # 6. True labels scatter for comparison
+        true_chart_data = [
+            {
+                "x": round(float(X_2d[i, 0]), 3),
+                "y": round(float(X_2d[i, 1]), 3),
+                "cluster": int(true_labels[i]),
+                "label": target_names[true_labels[i]],
+            }
+            for i in idx
+        ]
 
     log("📊 Training complete! Results ready.")
 
     # 7. EDA
-    eda = _compute_eda_clustering(df, feature_names)
+    eda = run.eda()
 
-    return {
+    return run.finish({
         "dataset": {
             "name": config["name"],
-            "samples": len(df),
+            "samples": n_samples,
             "features": len(feature_names),
             "description": descr[:300],
         },
-        "logs": logs,
+        "logs": run.logs,
         "metrics": results,
         "best_model": best_name,
         "chart_data": chart_data,
@@ -185,31 +305,79 @@ def run_clustering(dataset_name="iris"):
             "pc1": round(float(explained[0]), 4),
             "pc2": round(float(explained[1]), 4),
         },
+        "chart_sampling": sampling_summary(n_samples, idx, density),
         "eda": eda,
-    }
-
-
-def _compute_eda_clustering(df, feature_names):
-    """Compute EDA stats for Iris (clustering mode)."""
-    feature_stats = []
-    for col in feature_names:
-        s = df[col]
-        feature_stats.append({
-            "feature": col,
-            "mean": round(float(s.mean()), 4),
-            "std": round(float(s.std()), 4),
-            "min": round(float(s.min()), 4),
-            "max": round(float(s.max()), 4),
-        })
-
-    # Feature correlation matrix
-    corr = df[list(feature_names)].corr().round(3)
-    correlation = {
-        "labels": list(feature_names),
-        "matrix": corr.values.tolist(),
-    }
-
-    return {
-        "feature_stats": feature_stats,
-        "correlation": correlation,
-    }
+        "scaling": {
+            "mode": "large" if large else "standard",
+            "threshold": LARGE_DATA_THRESHOLD,
+            "silhouette_sample_size": min(SILHOUETTE_SAMPLE_SIZE, n_samples) if large else n_samples,
+            "metric_chunk_rows": METRIC_CHUNK_ROWS if large else None,
+        },
+    })
+
+
+def sampled_silhouette(X, labels, sample_size, random_state=42):
+    """
+    Mean silhouette over a sample stratified by cluster label (proportional
+    allocation, at least 2 points per cluster), with a normal-approximation
+    95% CI. Returns (mean, (low, high), n_sampled).
+    """
+    from sklearn.metrics import silhouette_samples
+
+    n = len(labels)
+    if n <= sample_size:
+        idx = np.arange(n)
+    else:
+        rng = np.random.RandomState(random_state)
+        uniq, codes, counts = np.unique(labels, return_inverse=True, return_counts=True)
+        alloc = np.minimum(counts, np.maximum(np.round(counts * sample_size / n).astype(int), 2))
+        idx = np.sort(np.concatenate([
+            rng.choice(np.flatnonzero(codes == c), size=alloc[c], replace=False)
+            for c in range(len(uniq))
+        ]))
+
+    values = silhouette_samples(X[idx], labels[idx])
+    mean = values.mean()
+    half_width = 1.96 * values.std(ddof=1) / np.sqrt(len(values)) if len(values) < n else 0.0
+    return mean, (mean - half_width, mean + half_width), len(values)
+
+
+def chunked_ch_db(X, labels, chunk_rows=METRIC_CHUNK_ROWS):
+    """
+    Calinski-Harabasz and Davies-Bouldin indices in two bounded-memory passes:
+    per-cluster sums -> centroids, then within-cluster distances. Matches
+    sklearn's calinski_harabasz_score / davies_bouldin_score.
+    """
+    n, d = X.shape
+    _, codes = np.unique(labels, return_inverse=True)
+    k = codes.max() + 1
+    counts = np.bincount(codes, minlength=k)
+
+    sums = np.zeros((k, d))
+    for start in range(0, n, chunk_rows):
+        block, block_codes = X[start:start + chunk_rows], codes[start:start + chunk_rows]
+        for j in range(d):
+            sums[:, j] += np.bincount(block_codes, weights=block[:, j], minlength=k)
+    centroids = sums / counts[:, None]
+    overall_mean = sums.sum(axis=0) / n
+
+    within = 0.0
+    intra = np.zeros(k)
+    for start in range(0, n, chunk_rows):
+        block, block_codes = X[start:start + chunk_rows], codes[start:start + chunk_rows]
+        dist = np.sqrt(((block - centroids[block_codes]) ** 2).sum(axis=1))
+        within += float((dist ** 2).sum())
+        intra += np.bincount(block_codes, weights=dist, minlength=k)
+
+    between = float((counts * ((centroids - overall_mean) ** 2).sum(axis=1)).sum())
+    ch = 1.0 if within == 0 else between * (n - k) / (within * (k - 1))
+
+    intra /= counts
+    centroid_dist = np.sqrt(((centroids[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2))
+    if np.allclose(intra, 0) or np.allclose(centroid_dist, 0):
+        return ch, 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = (intra[:, None] + intra[None, :]) / centroid_dist
+    ratios[np.isinf(ratios)] = np.nan
+    db = float(np.mean(np.nanmax(ratios, axis=1)))
+    return ch, db
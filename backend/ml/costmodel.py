@@ -0,0 +1,266 @@
+"""
+Fit-cost model for latency-budgeted catalogs.
+Each estimator declares its work as a function of (n_samples, n_features,
+n_classes) and its own parameters, in abstract units; predicted seconds are
+units × a per-(task, model) rate, plus the task's per-model metric work
+(clustering's silhouette) at a shared rate. Rates start from a per-class
+prior measured on a single core and are refined from every run's measured
+fit + predict + metrics time (an exponential moving average in log space),
+so estimates track the host they run on. With ML_COST_MODEL_PATH set, rates persist across
+restarts and are shared with job worker processes.
+
+plan_catalog turns a latency budget into a catalog: as many models as fit,
+cheapest variants first, then upgraded back to the full models while the
+budget allows; everything left out is reported with the reason.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+def _log2(n):
+    return math.log2(max(n, 2))
+
+
+def _max_features(model, d):
+    mf = model.get_params().get("max_features")
+    if mf in ("sqrt", "auto"):
+        return math.sqrt(d)
+    if mf == "log2":
+        return _log2(d)
+    if isinstance(mf, float):
+        return mf * d
+    if isinstance(mf, int):
+        return min(mf, d)
+    return d
+
+
+def _forest(model, n, d, k):
+    return model.n_estimators * n * _log2(n) * _max_features(model, d)
+
+
+def _boosting(model, n, d, k):
+    return model.n_estimators * n * _log2(n) * d * (k if k > 2 else 1)
+
+
+def _hist_boosting(model, n, d, k):
+    return model.max_iter * n * d * (k if k > 2 else 1)
+
+
+def _kmeans(model, n, d, k):
+    n_init = model.n_init if isinstance(model.n_init, int) else 1
+    return n * model.n_clusters * d * n_init
+
+
+# Work units of fitting and scoring one model, by estimator class name: f(model, n_samples, n_features, n_classes)
+FIT_UNITS = {
+    "LinearRegression": lambda m, n, d, k: n * d * d,
+    "Ridge": lambda m, n, d, k: n * d * d,
+    "LogisticRegression": lambda m, n, d, k: n * d * max(k, 2),
+    "SGDClassifier": lambda m, n, d, k: n * d * max(k, 2),
+    "LinearSVC": lambda m, n, d, k: n * d * max(k, 2),
+    "DecisionTreeClassifier": lambda m, n, d, k: n * _log2(n) * d,
+    "DecisionTreeRegressor": lambda m, n, d, k: n * _log2(n) * d,
+    "RandomForestClassifier": _forest,
+    "RandomForestRegressor": _forest,
+    "ExtraTreesClassifier": _forest,
+    "ExtraTreesRegressor": _forest,
+    "GradientBoostingClassifier": _boosting,
+    "GradientBoostingRegressor": _boosting,
+    "HistGradientBoostingClassifier": _hist_boosting,
+    "HistGradientBoostingRegressor": _hist_boosting,
+    "SVC": lambda m, n, d, k: n * n * d,
+    "SVR": lambda m, n, d, k: n * n * d,
+    # Fitting is free; scoring the 25%-sized test set against every training row is not
+    "KNeighborsClassifier": lambda m, n, d, k: n * n * d / 4,
+    "KNeighborsRegressor": lambda m, n, d, k: n * n * d / 4,
+    "KMeans": _kmeans,
+    "MiniBatchKMeans": _kmeans,
+    # Subcluster and neighbourhood sizes grow with density
+    "Birch": lambda m, n, d, k: n * math.sqrt(n) * d,
+    "DBSCAN": lambda m, n, d, k: n * math.sqrt(n) * d,
+    "AgglomerativeClustering": lambda m, n, d, k: n * n * d,
+}
+
+# Seconds per unit on one core (scikit-learn 1.4, 3k-12k rows), before any calibration, by class name
+DEFAULT_RATES = {
+    "LinearRegression": 3e-9,
+    "Ridge": 3e-9,
+    "LogisticRegression": 1.2e-7,
+    "SGDClassifier": 5e-8,
+    "LinearSVC": 1e-7,
+    "DecisionTreeClassifier": 7e-8,
+    "DecisionTreeRegressor": 1e-7,
+    "RandomForestClassifier": 1e-7,
+    "RandomForestRegressor": 7.5e-8,
+    "ExtraTreesClassifier": 5e-8,
+    "ExtraTreesRegressor": 5e-8,
+    "GradientBoostingClassifier": 4.6e-8,
+    "GradientBoostingRegressor": 7e-8,
+    "HistGradientBoostingClassifier": 5e-8,
+    "HistGradientBoostingRegressor": 4e-8,
+    "SVC": 1.7e-9,
+    "SVR": 1.7e-9,
+    "KNeighborsClassifier": 7e-10,
+    "KNeighborsRegressor": 7e-10,
+    "KMeans": 1.5e-8,
+    "MiniBatchKMeans": 2e-8,
+    "Birch": 2e-7,
+    "DBSCAN": 3e-8,
+    "AgglomerativeClustering": 4e-9,
+}
+FALLBACK_RATE = 1e-7
+# Seconds per unit of the per-model metric work a task declares in its workload (silhouette: n² x d)
+METRIC_RATE = 1.3e-9
+# Per-run overhead (validation, threads, metric calls) that dominates tiny datasets
+BASE_SECONDS = 0.005
+
+
+def fit_units(model, n_samples, n_features, n_classes=1):
+    units = FIT_UNITS.get(type(model).__name__)
+    if units is None:
+        return n_samples * n_features
+    return float(units(model, n_samples, n_features, n_classes))
+
+
+class CostModel:
+    """Per-(task, model) seconds-per-unit rates, refined from measured runs."""
+
+    def __init__(self, path=None, alpha=0.3):
+        self.path = path
+        self.alpha = alpha
+        self._rates = {}  # "task/model" -> {"rate": seconds per unit, "runs": n}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._rates = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable cost model %s: %s", path, e)
+
+    def _rate(self, task, name, model):
+        entry = self._rates.get(f"{task}/{name}")
+        if entry is not None:
+            return entry["rate"]
+        return DEFAULT_RATES.get(type(model).__name__, FALLBACK_RATE)
+
+    def estimate(self, task, name, model, workload):
+        """Predicted seconds to fit, predict and score `model` on `workload`."""
+        n, d, k, metric_units = workload
+        with self._lock:
+            rate = self._rate(task, name, model)
+        return BASE_SECONDS + METRIC_RATE * metric_units + rate * fit_units(model, n, d, k)
+
+    def observe(self, task, name, model, workload, seconds):
+        """Fold one measured run into the model's rate; call save() once the run's models are in."""
+        n, d, k, metric_units = workload
+        units = fit_units(model, n, d, k)
+        seconds -= BASE_SECONDS + METRIC_RATE * metric_units
+        if units <= 0 or seconds <= 0:
+            return
+        measured = seconds / units
+        with self._lock:
+            key = f"{task}/{name}"
+            entry = self._rates.get(key)
+            if entry is None:
+                entry = self._rates[key] = {"rate": measured, "runs": 0}
+            else:
+                entry["rate"] = math.exp((1 - self.alpha) * math.log(entry["rate"]) + self.alpha * math.log(measured))
+            entry["runs"] += 1
+
+    def calibrate(self, task, timings, catalog):
+        """Fold every model of a payload's `timings` block (with its `workload`) into the rates."""
+        workload = timings.get("workload")
+        if not workload:
+            return
+        for name, phases in timings["models"].items():
+            if name in catalog:
+                self.observe(task, name, catalog[name], tuple(workload), sum(phases.values()))
+        self.save()
+
+    def save(self):
+        """Write the rates to `path` (if set), once per calibrated run rather than per model."""
+        if not self.path:
+            return
+        with self._lock:
+            rates = json.dumps(self._rates)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(rates)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Could not save cost model %s: %s", self.path, e)
+
+    def stats(self):
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._rates.items()}
+
+
+COST_MODEL = CostModel(os.environ.get("ML_COST_MODEL_PATH"))
+
+
+def plan_catalog(task, models, variants, alternatives, workload, budget, fits=1, cost_model=COST_MODEL):
+    """
+    Fit `models` into `budget` seconds of estimated sequential training time.
+
+    `variants` holds cheaper stand-in estimators by name and `alternatives`
+    maps a catalog name to its variants, best first. Returns (names, plan):
+    the model names to train (a variant replacing its catalog model where
+    needed) and the payload's `budget` block with per-model estimates and the
+    skipped models with their reasons. Each model is fitted `fits` times (once
+    per cross-validation fold).
+    """
+    pool = {**models, **variants}
+    options = {name: [name] + [v for v in alternatives.get(name, []) if v in variants] for name in models}
+    estimates = {
+        name: fits * cost_model.estimate(task, name, pool[name], workload) for opts in options.values() for name in opts
+    }
+
+    # 1. Admit models cheapest-first at their cheapest option, so the budget covers as many as possible
+    cheapest = {name: min(opts, key=estimates.get) for name, opts in options.items()}
+    chosen, skipped, spent = {}, [], 0.0
+    for name in sorted(models, key=lambda n: estimates[cheapest[n]]):
+        cost = estimates[cheapest[name]]
+        if spent + cost <= budget:
+            chosen[name] = cheapest[name]
+            spent += cost
+        else:
+            skipped.append({
+                "model": name,
+                "estimate": round(estimates[name], 3),
+                "reason": f"estimated {estimates[cheapest[name]]:.3g}s"
+                          + (f" even as {cheapest[name]}" if cheapest[name] != name else "")
+                          + f" exceeds the {max(budget - spent, 0):.3g}s left of the {budget:g}s budget",
+            })
+
+    # 2. Upgrade admitted models back towards the full model, in catalog order, while the budget allows
+    for name in models:
+        if name not in chosen:
+            continue
+        for option in options[name]:
+            extra = estimates[option] - estimates[chosen[name]]
+            if option == chosen[name] or spent + extra <= budget:
+                spent += extra
+                chosen[name] = option
+                break
+
+    names = [chosen[name] for name in models if name in chosen]
+    plan = {
+        "seconds": budget,
+        "estimated_seconds": round(spent, 3),
+        "workload": {"samples": workload[0], "features": workload[1], "classes": workload[2]},
+        "models": [
+            {"model": chosen[name], "estimate": round(estimates[chosen[name]], 3),
+             **({"replaces": name} if chosen[name] != name else {})}
+            for name in models if name in chosen
+        ],
+        "skipped": sorted(skipped, key=lambda s: list(models).index(s["model"])),
+    }
+    return names, plan
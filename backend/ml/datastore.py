@@ -0,0 +1,236 @@
+"""
+Preloaded, memory-mapped dataset store.
+Each registered dataset is materialized once into a directory holding `.npy`
+arrays plus a small JSON sidecar (feature names, target names, DESCR), then
+opened with np.load(mmap_mode="r") so run_* functions get zero-copy views and
+the OS page cache shares the pages across uvicorn workers.
+
+A dataset missing from the store is installed from the offline bundle
+(ML_DATASET_BUNDLE, built by `python -m ml.bundle`) when it holds it, and only
+otherwise fetched with its loader, which may need the network.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+
+import numpy as np
+
+from ml.cache import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Files of one dataset directory, in the store and in the bundle
+DATASET_FILES = ("data.npy", "target.npy", "meta.json")
+# Optional: EDA moments accumulated while an upload was ingested
+MOMENTS_FILE = "moments.npz"
+
+
+def write_meta(directory, feature_names, target_names, descr, extra=None):
+    meta = {
+        "format": FORMAT_VERSION,
+        "feature_names": [str(f) for f in feature_names],
+        "target_names": [str(t) for t in target_names],
+        "DESCR": descr or "",
+    }
+    meta.update(extra or {})
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+class DatasetStore:
+    """On-disk `.npy` + metadata store with a per-process table of open datasets."""
+
+    def __init__(self, root, bundle=None):
+        self.root = root
+        self.bundle = bundle
+        self._open = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def load(self, key, loader):
+        """Return the memory-mapped dataset for `key`, materializing it with `loader` on first use."""
+        bunch = self._open.get(key)
+        if bunch is not None:
+            return bunch
+        # One flight per key: a slow download of one dataset does not block opening the others
+        bunch, _ = self._flight.do(key, lambda: self._load(key, loader))
+        return bunch
+
+    def _load(self, key, loader):
+        bunch = self._open.get(key)
+        if bunch is None:
+            if not self._is_materialized(key) and not self.restore_from_bundle(key):
+                self.materialize(key, loader)
+            bunch = self._open_dir(self.path(key))
+            with self._lock:
+                self._open[key] = bunch
+        return bunch
+
+    def materialize(self, key, loader):
+        """Call `loader` once and write its arrays + metadata atomically under `key`."""
+        raw = loader()
+        self.write(key, raw.data, raw.target, raw.feature_names,
+                   raw.get("target_names", []), raw.get("DESCR", ""))
+
+    def write(self, key, data, target, feature_names, target_names, descr, extra=None):
+        """Atomically write a dataset directory; an already materialized `key` is kept."""
+        staging = self.staging_dir(key)
+        try:
+            np.save(os.path.join(staging, "data.npy"), np.ascontiguousarray(data))
+            np.save(os.path.join(staging, "target.npy"), np.ascontiguousarray(target))
+            write_meta(staging, feature_names, target_names, descr, extra)
+            self.install(key, staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def staging_dir(self, key):
+        """Fresh temp directory under the store root, to be filled and then install()ed."""
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkdtemp(prefix=f".{key}-", dir=self.root)
+
+    def install(self, key, staging):
+        """
+        Atomically move a fully written staging directory into place under `key`.
+        Keys are content ids (or fixed built-in datasets), so an already materialized
+        directory is kept as is; a stale one is renamed aside before the swap, never
+        deleted while it is the live path.
+        """
+        final = self.path(key)
+        if self._is_materialized(key):
+            return
+        aside = None
+        if os.path.isdir(final):
+            aside = tempfile.mkdtemp(prefix=f".{key}-old-", dir=self.root)
+            try:
+                os.rename(final, os.path.join(aside, key))
+            except OSError:
+                # Another worker moved it first
+                pass
+        try:
+            os.rename(staging, final)
+        except OSError:
+            # Another worker won the race; its copy is identical.
+            pass
+        if aside is not None:
+            shutil.rmtree(aside, ignore_errors=True)
+        with self._lock:
+            self._open.pop(key, None)
+
+    def restore_from_bundle(self, key):
+        """Install `key` from the offline bundle; False if there is no bundle or it lacks the dataset."""
+        if not self.bundle or not os.path.exists(self.bundle):
+            return False
+        staging = self.staging_dir(key)
+        try:
+            with tarfile.open(self.bundle) as tar:
+                for name in DATASET_FILES:
+                    try:
+                        member = tar.extractfile(f"{key}/{name}")
+                    except KeyError:
+                        return False
+                    if member is None:
+                        return False
+                    with member, open(os.path.join(staging, name), "wb") as out:
+                        shutil.copyfileobj(member, out)
+            with open(os.path.join(staging, "meta.json"), encoding="utf-8") as f:
+                if json.load(f).get("format") != FORMAT_VERSION:
+                    logger.warning("Ignoring bundled %s: built for another store format", key)
+                    return False
+            self.install(key, staging)
+            return True
+        except (OSError, ValueError, tarfile.TarError) as e:
+            logger.warning("Could not restore dataset %s from %s: %s", key, self.bundle, e)
+            return False
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def iter_meta(self):
+        """(key, metadata) for every materialized dataset."""
+        if not os.path.isdir(self.root):
+            return
+        for key in sorted(os.listdir(self.root)):
+            if key.startswith(".") or not self._is_materialized(key):
+                continue
+            with open(os.path.join(self.path(key), "meta.json"), encoding="utf-8") as f:
+                yield key, json.load(f)
+
+    def preload(self, entries):
+        """Materialize and open every (key, loader) pair, skipping ones that fail (e.g. no network)."""
+        for key, loader in entries:
+            try:
+                self.load(key, loader)
+            except Exception as e:
+                logger.warning("Could not preload dataset %s: %s", key, e)
+
+    def _is_materialized(self, key):
+        meta_path = os.path.join(self.path(key), "meta.json")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f).get("format") == FORMAT_VERSION
+        except (OSError, ValueError):
+            return False
+
+    @staticmethod
+    def _open_dir(path):
+        from sklearn.utils import Bunch
+
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        moments_path = os.path.join(path, MOMENTS_FILE)
+        if os.path.exists(moments_path):
+            from ml.eda import ColumnMoments
+
+            with np.load(moments_path) as arrays:
+                meta["moments"] = ColumnMoments.from_arrays(arrays)
+        return Bunch(
+            data=np.load(os.path.join(path, "data.npy"), mmap_mode="r"),
+            target=np.load(os.path.join(path, "target.npy"), mmap_mode="r"),
+            **meta,
+        )
+
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_STORE = DatasetStore(
+    os.environ.get("ML_DATA_DIR") or os.path.join(_BACKEND_DIR, ".data"),
+    os.environ.get("ML_DATASET_BUNDLE") or os.path.join(_BACKEND_DIR, "datasets.tar.gz"),
+)
+
+
+def sklearn_loader(name, **kwargs):
+    """A registry `loader` calling sklearn.datasets.<name>, which is imported on first call."""
+    def load():
+        import sklearn.datasets
+
+        return getattr(sklearn.datasets, name)(**kwargs)
+
+    load.__name__ = name
+    return load
+
+
+def store_key(config):
+    """Store key of a registry entry: explicit `store_key`, else the loader's name."""
+    return config.get("store_key") or config["loader"].__name__
+
+
+def load_registered(config):
+    """Open the stored copy of a registry entry, materializing it on first use."""
+    return DATASET_STORE.load(store_key(config), config["loader"])
+
+
+def preload_registries(*registries):
+    """Materialize every dataset of the given registries into the store."""
+    entries = {}
+    for registry in registries:
+        for config in registry.values():
+            entries.setdefault(store_key(config), config["loader"])
+    DATASET_STORE.preload(entries.items())
@@ -0,0 +1,232 @@
+"""
+Exploratory data analysis shared by every task.
+One pass over the feature matrix in row blocks feeds a ColumnMoments
+accumulator (count, mean, co-moment matrix, min, max), from which the
+per-feature stats and every correlation are derived; target histograms and
+class counts are accumulated over the same blocks. Accumulators merge
+(Chan et al.'s pairwise update), so blocks can come from a memory-mapped
+store, an upload stream or parallel workers. Uploads accumulate their moments
+with ImputedMoments while they are ingested and store them with the dataset,
+so their EDA only reads the target. EDA does not depend on the models, so
+TrainingRun caches it per dataset.
+"""
+
+import numpy as np
+
+
+EDA_CHUNK_ROWS = 65536
+HISTOGRAM_BINS = 10
+
+
+class ColumnMoments:
+    """Mergeable count / mean / co-moment matrix / min / max of a fixed set of columns."""
+
+    def __init__(self, n_columns):
+        self.n = 0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))  # Σ (x - mean)(x - mean)ᵀ
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, X):
+        """Fold in a block of rows."""
+        X = np.asarray(X, dtype=np.float64)
+        if not len(X):
+            return self
+        block = ColumnMoments(X.shape[1])
+        block.n = len(X)
+        block.mean = X.mean(axis=0)
+        centered = X - block.mean
+        block.comoment = centered.T @ centered
+        block.min = X.min(axis=0)
+        block.max = X.max(axis=0)
+        return self.merge(block)
+
+    def merge(self, other):
+        """Combine with the moments of a disjoint set of rows."""
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment += other.comoment + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean += delta * (other.n / n)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.n = n
+        return self
+
+    def std(self, ddof=1):
+        return np.sqrt(np.diag(self.comoment) / max(self.n - ddof, 1))
+
+    def corr(self):
+        """Pearson correlation matrix; 0 where a column is constant."""
+        scale = np.sqrt(np.diag(self.comoment))
+        denom = np.outer(scale, scale)
+        out = np.zeros_like(self.comoment)
+        np.divide(self.comoment, denom, out=out, where=denom > 0)
+        return np.clip(out, -1.0, 1.0)
+
+    def arrays(self):
+        """The accumulator as named arrays, for np.savez."""
+        return {"n": np.int64(self.n), "mean": self.mean, "comoment": self.comoment, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        moments = cls(len(arrays["mean"]))
+        moments.n = int(arrays["n"])
+        for name in ("mean", "comoment", "min", "max"):
+            setattr(moments, name, np.array(arrays[name], dtype=np.float64))
+        return moments
+
+
+class ImputedMoments:
+    """
+    ColumnMoments of a stream of blocks whose NaNs are later imputed with their
+    column's mean, accumulated before that mean is known. An imputed cell sits
+    at the mean, so it only adds to the row count; the co-moment of two columns
+    comes from the rows where both are observed, via pairwise counts, sums and
+    cross-products (about the first block's means, for numerical stability).
+    """
+
+    def __init__(self, n_columns):
+        self.n = 0
+        self.shift = None
+        self.counts = np.zeros((n_columns, n_columns))    # rows where columns i and j are both observed
+        self.sums = np.zeros((n_columns, n_columns))      # Σ x_i over those rows
+        self.products = np.zeros((n_columns, n_columns))  # Σ x_i x_j over those rows
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, X):
+        """Fold in a block of rows (NaN = missing)."""
+        X = np.asarray(X, dtype=np.float64)
+        if not len(X):
+            return self
+        observed = ~np.isnan(X)
+        if self.shift is None:
+            n_observed = observed.sum(axis=0)
+            self.shift = np.divide(np.where(observed, X, 0).sum(axis=0), n_observed,
+                                   out=np.zeros(X.shape[1]), where=n_observed > 0)
+        Z = np.where(observed, X - self.shift, 0.0)
+        M = observed.astype(np.float64)
+        self.n += len(X)
+        self.counts += M.T @ M
+        self.sums += Z.T @ M
+        self.products += Z.T @ Z
+        self.min = np.minimum(self.min, np.where(observed, X, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(observed, X, -np.inf).max(axis=0))
+        return self
+
+    def means(self):
+        """Mean of each column's observed values (0 for a column with none): the imputed value."""
+        observed = np.diag(self.counts)
+        shifted = np.divide(np.diag(self.sums), observed, out=np.zeros(len(observed)), where=observed > 0)
+        return np.where(observed > 0, shifted + (0 if self.shift is None else self.shift), 0.0)
+
+    def moments(self):
+        """The ColumnMoments of the columns after imputation."""
+        observed = np.diag(self.counts)
+        m = np.divide(np.diag(self.sums), observed, out=np.zeros(len(observed)), where=observed > 0)
+        moments = ColumnMoments(len(m))
+        moments.n = self.n
+        moments.mean = self.means()
+        # Σ (x_i - m_i)(x_j - m_j) over the rows where both are observed
+        moments.comoment = (self.products - self.sums * m[None, :] - self.sums.T * m[:, None]
+                            + self.counts * np.outer(m, m))
+        # A column with no observed value is stored as all zeros
+        moments.min = np.where(observed > 0, self.min, 0.0)
+        moments.max = np.where(observed > 0, self.max, 0.0)
+        return moments
+
+
+def summarize(X, y=None, with_target=False, n_classes=None, bins=HISTOGRAM_BINS, chunk_rows=EDA_CHUNK_ROWS,
+              moments=None):
+    """
+    Moments of X's columns (plus y as a last column when `with_target`), the
+    class counts of y when `n_classes` is given, and a `bins`-bin histogram of
+    y for a continuous target. Given precomputed `moments`, X is not read.
+    """
+    n, d = X.shape
+    streamed = moments is not None
+    if not streamed:
+        moments = ColumnMoments(d + 1 if with_target else d)
+    class_counts = np.zeros(n_classes, dtype=np.int64) if n_classes else None
+    for start in range(0, n, chunk_rows):
+        if not streamed:
+            block = X[start:start + chunk_rows]
+            if with_target:
+                block = np.column_stack([block, y[start:start + chunk_rows]])
+            moments.update(block)
+        if class_counts is not None:
+            class_counts += np.bincount(np.asarray(y[start:start + chunk_rows], dtype=np.intp), minlength=n_classes)
+
+    summary = {"moments": moments, "class_counts": class_counts, "histogram": None}
+    if with_target:
+        # Same edges as np.histogram(y, bins): the range is the target's min/max from the first pass
+        lo, hi = moments.min[-1], moments.max[-1]
+        counts = np.zeros(bins, dtype=np.int64)
+        for start in range(0, n, chunk_rows):
+            counts += np.histogram(y[start:start + chunk_rows], bins=bins, range=(lo, hi))[0]
+        summary["histogram"] = (counts, np.histogram_bin_edges([lo, hi], bins=bins, range=(lo, hi)))
+    return summary
+
+
+def feature_stats(moments, feature_names):
+    std = moments.std()
+    return [
+        {
+            "feature": col,
+            "mean": round(float(moments.mean[i]), 4),
+            "std": round(float(std[i]), 4),
+            "min": round(float(moments.min[i]), 4),
+            "max": round(float(moments.max[i]), 4),
+        }
+        for i, col in enumerate(feature_names)
+    ]
+
+
+def correlation_matrix(moments, feature_names):
+    d = len(feature_names)
+    return {
+        "labels": list(feature_names),
+        "matrix": np.round(moments.corr()[:d, :d], 3).tolist(),
+    }
+
+
+def compute_eda(task, X, y, feature_names, class_names=None, moments=None):
+    """The `eda` block of a task's payload (`moments`: X's, plus y's for regression, if already known)."""
+    if task == "regression":
+        summary = summarize(X, y, with_target=True, moments=moments)
+        moments = summary["moments"]
+        counts, edges = summary["histogram"]
+        target_corr = moments.corr()[-1, :-1]
+        correlations = [
+            {"feature": col, "correlation": round(float(target_corr[i]), 4)}
+            for i, col in enumerate(feature_names)
+        ]
+        correlations.sort(key=lambda x: abs(x["correlation"]), reverse=True)
+        return {
+            "feature_stats": feature_stats(moments, feature_names),
+            "target_distribution": [
+                {"range": f"{edges[i]:.1f}–{edges[i+1]:.1f}", "count": int(counts[i])}
+                for i in range(len(counts))
+            ],
+            "correlations": correlations,
+        }
+
+    if task == "classification":
+        summary = summarize(X, y, n_classes=len(class_names), moments=moments)
+        return {
+            "class_distribution": [
+                {"class": name, "count": int(summary["class_counts"][i])}
+                for i, name in enumerate(class_names)
+            ],
+            "feature_stats": feature_stats(summary["moments"], feature_names),
+            "correlation": correlation_matrix(summary["moments"], feature_names),
+        }
+
+    summary = summarize(X, moments=moments)
+    return {
+        "feature_stats": feature_stats(summary["moments"], feature_names),
+        "correlation": correlation_matrix(summary["moments"], feature_names),
+    }
@@ -0,0 +1,211 @@
+"""
+Response encodings for training payloads.
+Payloads are built (and cached) as JSON records, one dict per chart point. On
+the way out they can be re-encoded per request:
+
+  records   — the payload as is (default, `application/json`)
+  columnar  — chart tables as parallel arrays, string columns dictionary-
+              encoded, and the clustering scatter's x/y stored once and shared
+              by both series (`application/vnd.mltrainer.columnar+json`)
+  binary    — the columnar payload with every numeric column moved out of the
+              JSON into little-endian typed arrays (`application/vnd.mltrainer.columnar`)
+
+The format comes from `?format=` or the Accept header; gzip or brotli (if the
+`brotli` package is installed) from Accept-Encoding. JSON is written with
+orjson. The pages stream the columnar form and turn it back into records with
+decodePayload (frontend/src/payload.js); binary is for API consumers.
+
+Binary layout: b"MLC1", uint32 header length, the UTF-8 JSON header padded to
+8 bytes, then the arrays, each 8-byte aligned. In the header an array is
+{"$array": index, "dtype": "float32"|"int8"|"int16"|"int32", "offset": bytes,
+"length": n}; integer columns use the narrowest type that holds them.
+"""
+
+import gzip
+import struct
+import zlib
+
+import numpy as np
+import orjson
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.mltrainer.columnar+json"
+BINARY_MEDIA_TYPE = "application/vnd.mltrainer.columnar"
+BINARY_MAGIC = b"MLC1"
+
+# Chart tables that are re-encoded as columns
+CHART_TABLES = ("chart_data", "true_chart_data")
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(obj):
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# ── Columnar ───────────────────────────────────────────────────
+def _column(values):
+    """A list of scalars as a numpy array, or dictionary-encoded if they are strings."""
+    if values and isinstance(values[0], str):
+        dictionary, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        return {"dictionary": dictionary.tolist(), "codes": codes.astype(np.int32)}
+    if all(isinstance(v, int) for v in values):
+        return np.asarray(values, dtype=np.int32)
+    return np.asarray(values, dtype=np.float64)
+
+
+def to_columnar(payload):
+    """
+    Shallow copy of `payload` with its chart tables as {"length", "columns", "shared"};
+    columns listed in "shared" live in the payload's top-level "shared_columns".
+    """
+    out = dict(payload)
+    tables = {key: payload[key] for key in CHART_TABLES if isinstance(payload.get(key), list)}
+    if not tables:
+        return out
+
+    columns = {key: {name: [row[name] for row in rows] for name in (rows[0] if rows else {})}
+               for key, rows in tables.items()}
+    # Columns equal across every table (the scatter's x/y) are stored once
+    shared = []
+    if len(tables) > 1:
+        first, *rest = columns.values()
+        shared = [name for name in first if all(other.get(name) == first[name] for other in rest)]
+
+    if shared:
+        out["shared_columns"] = {name: _column(next(iter(columns.values()))[name]) for name in shared}
+    for key, cols in columns.items():
+        out[key] = {
+            "length": len(tables[key]),
+            "columns": {name: _column(values) for name, values in cols.items() if name not in shared},
+            "shared": shared,
+        }
+    out["encoding"] = "columnar"
+    return out
+
+
+def encode_binary(columnar):
+    """Pack a to_columnar() payload: numeric arrays go into the binary section."""
+    arrays = []
+    offset = 0
+
+    def extract(value):
+        nonlocal offset
+        if isinstance(value, np.ndarray):
+            dtype = _binary_dtype(value)
+            data = value.astype(np.dtype(dtype).newbyteorder("<")).tobytes()
+            ref = {"$array": len(arrays), "dtype": dtype, "offset": offset, "length": len(value)}
+            arrays.append(data + b"\0" * (-len(data) % 8))
+            offset += len(arrays[-1])
+            return ref
+        if isinstance(value, dict):
+            return {k: extract(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [extract(v) for v in value]
+        return value
+
+    header = dumps({**extract(columnar), "encoding": "binary"})
+    header += b" " * (-(len(header) + 8) % 8)
+    return b"".join([BINARY_MAGIC, struct.pack("<I", len(header)), header, *arrays])
+
+
+def _binary_dtype(values):
+    if values.dtype.kind not in "iu":
+        return "float32"
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in ("int8", "int16"):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return "int32"
+
+
+def encode_payload(payload, fmt="records"):
+    """(body, media_type) of `payload` in the given format."""
+    if fmt == "columnar":
+        return dumps(to_columnar(payload)), COLUMNAR_MEDIA_TYPE
+    if fmt == "binary":
+        return encode_binary(to_columnar(payload)), BINARY_MEDIA_TYPE
+    return dumps(payload), JSON_MEDIA_TYPE
+
+
+def negotiate_format(accept, fmt=None):
+    """The explicit `fmt`, else the first of our media types named in the Accept header."""
+    if fmt:
+        return fmt
+    accept = accept or ""
+    if BINARY_MEDIA_TYPE in accept.replace(COLUMNAR_MEDIA_TYPE, ""):
+        return "binary"
+    if COLUMNAR_MEDIA_TYPE in accept:
+        return "columnar"
+    return "records"
+
+
+# ── Compression ────────────────────────────────────────────────
+def _accepted_encodings(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                pass
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding):
+    """'br', 'gzip' or None, preferring brotli when it is installed and accepted."""
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    """(body, encoding actually applied); small bodies are left alone."""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=5), "br"
+    return gzip.compress(body, compresslevel=6), "gzip"
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli that flushes after every chunk, so SSE frames are not held back."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=5)
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk):
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+async def compress_stream(chunks, encoding):
+    """Compress an async iterator of str/bytes chunks with `encoding`."""
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+    yield compressor.finish()
@@ -0,0 +1,123 @@
+"""
+Incremental training of tree ensembles (`early_stop=true`).
+Instead of fitting all n_estimators at once, grow() adds GROWTH_STEP trees or
+boosting stages at a time with warm_start, scores the ensemble on a seeded
+(for classifiers, stratified) holdout of its training rows after each step,
+and stops once PATIENCE steps in a row improve the validation score by less
+than TOLERANCE. When it stopped early, the best size is refitted from scratch
+on every training row, so the reported metrics come from a model trained on
+the same rows as the full-size ones; an ensemble that grew to its best size
+keeps its holdout-trained fit rather than paying for a second one. The learning curve it
+records (validation score against ensemble size and cumulative fit time) shows
+how much capacity a dataset actually needs.
+"""
+
+import os
+import time
+
+import numpy as np
+
+
+# Ensembles (by class name) that can keep adding estimators to an already-fitted model
+GROWABLE = {
+    "RandomForestClassifier", "RandomForestRegressor",
+    "ExtraTreesClassifier", "ExtraTreesRegressor",
+    "GradientBoostingClassifier", "GradientBoostingRegressor",
+}
+GROWTH_STEP = int(os.environ.get("ML_GROWTH_STEP", 10))
+PATIENCE = int(os.environ.get("ML_GROWTH_PATIENCE", 2))
+TOLERANCE = 1e-3
+VALIDATION_FRACTION = 0.2
+
+
+def can_grow(model):
+    return type(model).__name__ in GROWABLE
+
+
+def grow(model, X, y, score, step=GROWTH_STEP, patience=PATIENCE, tol=TOLERANCE,
+         validation_fraction=VALIDATION_FRACTION):
+    """
+    Fit `model` on X/y in steps of `step` estimators, up to its n_estimators,
+    scoring `score(y_true, y_pred)` (higher is better) after each step on a
+    `validation_fraction` holdout of the rows, then refit the best size on all
+    of X/y if growth went past it. Returns the model's learning-curve block.
+    """
+    fit_idx, val_idx = _holdout(model, y, validation_fraction)
+    X_fit, y_fit, X_val, y_val = X[fit_idx], y[fit_idx], X[val_idx], y[val_idx]
+    max_estimators = model.n_estimators
+    sizes = list(range(step, max_estimators, step)) + [max_estimators]
+
+    model.set_params(warm_start=True)
+    curve, best, best_estimators, stalls, elapsed = [], -float("inf"), sizes[0], 0, 0.0
+    for n in sizes:
+        model.set_params(n_estimators=n)
+        start = time.perf_counter()
+        model.fit(X_fit, y_fit)
+        elapsed += time.perf_counter() - start
+        value = float(score(y_val, model.predict(X_val)))
+        curve.append({"estimators": n, "score": round(value, 4), "seconds": round(elapsed, 4)})
+        if value > best + tol:
+            best, best_estimators, stalls = value, n, 0
+        else:
+            stalls += 1
+            if stalls >= patience:
+                break
+    grown = model.n_estimators
+
+    # warm_start off: the refit, and any later fit() of the model, starts from scratch
+    model.set_params(warm_start=False)
+    refit_seconds = 0.0
+    if best_estimators < grown:
+        model.set_params(n_estimators=best_estimators)
+        start = time.perf_counter()
+        model.fit(X, y)
+        refit_seconds = time.perf_counter() - start
+
+    return {
+        "estimators": best_estimators,
+        "max_estimators": max_estimators,
+        "grown": grown,
+        "stopped_early": grown < max_estimators,
+        "refitted": best_estimators < grown,
+        "training_rows": len(X) if best_estimators < grown else len(X_fit),
+        "validation_rows": len(X_val),
+        "growth_seconds": round(elapsed, 4),
+        "refit_seconds": round(refit_seconds, 4),
+        "curve": curve,
+    }
+
+
+def _holdout(model, y, fraction):
+    """Sorted (fit, validation) row indices: a seeded split, stratified for classifiers when every class can be."""
+    from sklearn.base import is_classifier
+    from sklearn.model_selection import train_test_split
+
+    rows = np.arange(len(y))
+    stratify = None
+    if is_classifier(model):
+        counts = np.unique(y, return_counts=True)[1]
+        if counts.min() >= 2 and int(len(y) * fraction) >= len(counts):
+            stratify = y
+    fit_idx, val_idx = train_test_split(rows, test_size=fraction, random_state=42, stratify=stratify)
+    return np.sort(fit_idx), np.sort(val_idx)
+
+
+def growth_log(name, growth, metric):
+    """The log line reporting where grow() stopped."""
+    line = f"   📈 {name}: grew {growth['grown']}/{growth['max_estimators']} estimators"
+    if growth["stopped_early"]:
+        line += f" — validation {metric} stopped improving after {growth['estimators']}"
+    if growth["refitted"]:
+        line += f"; refitted {growth['estimators']} on all {growth['training_rows']:,} training rows"
+    return line
+
+
+def early_stopping_summary(curves):
+    """The payload's `early_stopping` block: the settings and each grown model's learning curve."""
+    return {
+        "step": GROWTH_STEP,
+        "patience": PATIENCE,
+        "tolerance": TOLERANCE,
+        "validation_fraction": VALIDATION_FRACTION,
+        "models": curves,
+    }
@@ -0,0 +1,339 @@
+"""
+Streaming ingestion of user-uploaded CSV / Parquet datasets.
+The request body is parsed in bounded chunks (pandas' C parser over a pipe fed
+by the HTTP stream for CSV; pyarrow record batches over a spooled file for
+Parquet, whose footer needs random access). The schema is inferred from the
+first chunk, every chunk is converted to float32 and appended per column, and
+the result is assembled into a column-major float32 `.npy` in the dataset store
+and registered next to the built-in datasets.
+"""
+
+import functools
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import time
+
+import numpy as np
+
+from ml.datastore import DATASET_STORE, MOMENTS_FILE, write_meta
+from ml.eda import ImputedMoments
+
+
+CHUNK_ROWS = int(os.environ.get("ML_UPLOAD_CHUNK_ROWS", 65536))
+MAX_UPLOAD_BYTES = int(os.environ.get("ML_UPLOAD_MAX_BYTES", 8 * 1024 ** 3))
+MAX_CLASSES = 1000
+MIN_ROWS = 10
+
+
+class IngestError(ValueError):
+    """The upload cannot be turned into a dataset for the requested task."""
+
+
+class PipeReader(io.RawIOBase):
+    """
+    Blocking file-like object fed with byte chunks from another thread. The
+    queue is bounded, so a slow parser applies backpressure to the uploader.
+    """
+
+    def __init__(self, max_chunks=16):
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._buffer = b""
+        self._eof = False
+        self.aborted = False
+
+    def feed(self, chunk):
+        while not self.aborted:
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def finish(self):
+        self.feed(None)
+
+    def abort(self):
+        """Stop the reader: pending and future reads raise IngestError."""
+        self.aborted = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put_nowait(None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._eof:
+            chunk = self._queue.get()
+            if self.aborted:
+                raise IngestError("Upload aborted")
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def ingest_csv(task, pipe, target=None, name=None):
+    """ingest() over CSV read from a PipeReader; call from a worker thread."""
+    import pandas as pd
+
+    chunks = pd.read_csv(io.BufferedReader(pipe, buffer_size=1 << 20), chunksize=CHUNK_ROWS, low_memory=True)
+    with chunks:
+        return ingest(task, chunks, target, name)
+
+
+def ingest_parquet(task, path, target=None, name=None):
+    """ingest() over a spooled Parquet file, one record batch at a time."""
+    return ingest(task, _iter_parquet_chunks(path), target, name)
+
+
+def _iter_parquet_chunks(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise IngestError("Parquet uploads require the optional 'pyarrow' package")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS):
+        yield batch.to_pandas()
+
+
+class _ColumnWriter:
+    """Appends float32 (or int32) chunks of each column to its own raw file."""
+
+    def __init__(self, directory, n_columns, dtype=np.float32, prefix="col"):
+        self.dtype = np.dtype(dtype)
+        self.paths = [os.path.join(directory, f"{prefix}{i}.raw") for i in range(n_columns)]
+        self.files = [open(p, "wb") for p in self.paths]
+
+    def append(self, block):
+        for j, f in enumerate(self.files):
+            np.ascontiguousarray(block[:, j], dtype=self.dtype).tofile(f)
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+def ingest(task, chunks, target=None, name=None):
+    """
+    Consume DataFrame `chunks` into the dataset store and return an upload report.
+    Numeric columns become float32 features (missing and non-finite values imputed
+    with the column mean); other non-target columns are skipped. The target is float for regression
+    and label-encoded for classification/clustering (optional for clustering).
+    """
+    import pandas as pd
+
+    started = time.perf_counter()
+    staging = DATASET_STORE.staging_dir("upload")
+    digest = hashlib.sha256()
+    # Hashed apart from the features, so the id does not depend on how the rows were chunked
+    target_digest = hashlib.sha256()
+    n_rows = 0
+    peak_chunk_bytes = 0
+    feature_cols = skipped = None
+    features = labels = None
+    classes = {}
+    moments = None
+
+    try:
+        for chunk in chunks:
+            if feature_cols is None:
+                feature_cols, skipped = _infer_schema(task, chunk, target)
+                # The id covers how the rows are interpreted, not just their bytes, so the same
+                # file uploaded for another task, target, header or name is stored separately
+                digest.update(json.dumps([task, feature_cols, target, name]).encode("utf-8"))
+                features = _ColumnWriter(staging, len(feature_cols))
+                labels = _ColumnWriter(staging, 1, np.float32 if task == "regression" else np.int32, prefix="target")
+                # EDA moments of the stored columns (plus the target, which regression EDA correlates with)
+                moments = ImputedMoments(len(feature_cols) + (task == "regression"))
+
+            with np.errstate(over="ignore"):  # out-of-range values become ±inf, handled below
+                X = chunk[feature_cols].apply(pd.to_numeric, errors="coerce").to_numpy(np.float32)
+            if target is not None:
+                if task == "regression":
+                    with np.errstate(over="ignore"):
+                        y = pd.to_numeric(chunk[target], errors="coerce").to_numpy(np.float32)
+                    keep = np.isfinite(y)
+                    y = y[keep]
+                else:
+                    raw_labels = chunk[target]
+                    keep = raw_labels.notna().to_numpy()
+                    codes, uniques = pd.factorize(raw_labels[keep].astype(str))
+                    lookup = np.array([classes.setdefault(u, len(classes)) for u in uniques], dtype=np.int32)
+                    y = lookup[codes]
+                    if len(classes) > MAX_CLASSES:
+                        raise IngestError(f"Target '{target}' has more than {MAX_CLASSES} distinct values")
+                X = X[keep]
+            else:
+                y = np.zeros(len(X), dtype=np.int32)
+
+            # ±inf (in the data, or past float32's range) is treated as missing
+            X[np.isinf(X)] = np.nan
+            moments.update(np.column_stack([X, y]) if task == "regression" else X)
+            features.append(X)
+            labels.append(y[:, None])
+
+            digest.update(np.ascontiguousarray(X).tobytes())
+            target_digest.update(np.ascontiguousarray(y).tobytes())
+            n_rows += len(X)
+            peak_chunk_bytes = max(peak_chunk_bytes, int(chunk.memory_usage(deep=False).sum()) + X.nbytes)
+
+        if feature_cols is None or n_rows < MIN_ROWS:
+            raise IngestError(f"Need at least {MIN_ROWS} rows with a valid target, got {n_rows}")
+        features.close()
+        labels.close()
+
+        target_names, codes_map = _finalize_labels(task, target, classes)
+        if task == "classification":
+            _check_class_sizes(labels.paths[0], len(classes), target)
+
+        means = moments.means()[:len(feature_cols)].astype(np.float32)
+        digest.update(target_digest.digest())
+        dataset_id = f"upload-{digest.hexdigest()[:12]}"
+        _assemble(staging, features.paths, labels.paths[0], labels.dtype, n_rows, means, codes_map)
+
+        upload_meta = {
+            "task": task,
+            "dataset_id": dataset_id,
+            "name": name or f"Uploaded dataset ({n_rows:,} rows)",
+            "target": target,
+            "skipped_columns": skipped,
+        }
+        descr = f"User-uploaded dataset with {n_rows:,} rows and {len(feature_cols)} numeric features."
+        write_meta(staging, feature_cols, target_names, descr, {"upload": upload_meta})
+        np.savez(os.path.join(staging, MOMENTS_FILE), **moments.moments().arrays())
+        DATASET_STORE.install(dataset_id, staging)
+    finally:
+        for writer in (features, labels):
+            if writer is not None:
+                writer.close()
+        shutil.rmtree(staging, ignore_errors=True)
+
+    seconds = time.perf_counter() - started
+    return {
+        **upload_meta,
+        "rows": n_rows,
+        "features": len(feature_cols),
+        "feature_names": feature_cols,
+        "classes": len(target_names) if task != "regression" else None,
+        "stored_bytes": n_rows * (len(feature_cols) + 1) * 4,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(n_rows / seconds) if seconds > 0 else None,
+        "peak_chunk_bytes": peak_chunk_bytes,
+    }
+
+
+def register_upload(registries, upload_meta):
+    """Add an ingested dataset to its task's registry so run_* and /datasets see it."""
+    task = upload_meta["task"]
+    config = {
+        "name": upload_meta["name"],
+        "loader": functools.partial(_missing_upload, upload_meta["dataset_id"]),
+        "store_key": upload_meta["dataset_id"],
+        "uploaded": True,
+    }
+    if task == "regression":
+        config["target_name"] = upload_meta["target"]
+    elif task == "clustering":
+        config["is_artificial"] = False
+    registries[task][upload_meta["dataset_id"]] = config
+
+
+def restore_uploads(registries):
+    """Re-register every upload found in the dataset store (e.g. after a restart)."""
+    for _, meta in DATASET_STORE.iter_meta():
+        if "upload" in meta and meta["upload"]["task"] in registries:
+            register_upload(registries, meta["upload"])
+
+
+# ── Internals ──────────────────────────────────────────────────
+def _missing_upload(dataset_id):
+    raise FileNotFoundError(f"Uploaded dataset {dataset_id} is no longer in the dataset store")
+
+
+def _infer_schema(task, chunk, target):
+    import pandas as pd
+
+    if target is None and task != "clustering":
+        raise IngestError(f"A target column is required for {task}")
+    if target is not None and target not in chunk.columns:
+        raise IngestError(f"Target column '{target}' not found; columns are {list(chunk.columns)}")
+
+    feature_cols, skipped = [], []
+    for col in chunk.columns:
+        if col == target:
+            continue
+        if pd.api.types.is_numeric_dtype(chunk[col]) or pd.api.types.is_bool_dtype(chunk[col]):
+            feature_cols.append(str(col))
+        else:
+            skipped.append(str(col))
+    if not feature_cols:
+        raise IngestError("No numeric feature columns found")
+    return feature_cols, skipped
+
+
+def _finalize_labels(task, target, classes):
+    """Sorted class names plus an old-code -> new-code lookup (None when no remap is needed)."""
+    if task == "regression":
+        return [], None
+    if target is None:
+        return ["unlabeled"], None
+    names = sorted(classes, key=lambda v: (_as_number(v) is None, _as_number(v), v))
+    lookup = np.empty(len(classes), dtype=np.int32)
+    for new_code, label in enumerate(names):
+        lookup[classes[label]] = new_code
+    return names, lookup
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _check_class_sizes(path, n_classes, target):
+    counts = np.bincount(np.memmap(path, dtype=np.int32, mode="r"), minlength=n_classes)
+    if n_classes < 2:
+        raise IngestError(f"Target '{target}' needs at least 2 classes")
+    if counts.min() < 2:
+        raise IngestError(f"Every class of '{target}' needs at least 2 rows for a stratified split")
+
+
+def _assemble(staging, column_paths, target_path, target_dtype, n_rows, means, codes_map):
+    """Copy per-column raw files into a column-major .npy, imputing NaNs, in bounded blocks."""
+    data = np.lib.format.open_memmap(
+        os.path.join(staging, "data.npy"), mode="w+", dtype=np.float32,
+        shape=(n_rows, len(column_paths)), fortran_order=True,
+    )
+    for j, path in enumerate(column_paths):
+        column = np.memmap(path, dtype=np.float32, mode="r")
+        for start in range(0, n_rows, CHUNK_ROWS * 16):
+            block = np.array(column[start:start + CHUNK_ROWS * 16])
+            np.copyto(block, means[j], where=np.isnan(block))
+            data[start:start + len(block), j] = block
+        del column
+        os.remove(path)
+    data.flush()
+    del data
+
+    target = np.lib.format.open_memmap(
+        os.path.join(staging, "target.npy"), mode="w+", dtype=target_dtype, shape=(n_rows,),
+    )
+    source = np.memmap(target_path, dtype=target_dtype, mode="r")
+    for start in range(0, n_rows, CHUNK_ROWS * 16):
+        block = source[start:start + CHUNK_ROWS * 16]
+        target[start:start + len(block)] = codes_map[block] if codes_map is not None else block
+    target.flush()
+    del source
+    os.remove(target_path)
@@ -0,0 +1,248 @@
+"""
+Lightweight instrumentation.
+StageTimer records perf_counter spans for each stage of a training run (and,
+with ML_TRACE_MEMORY=1, the tracemalloc peak of each stage) for the `timings`
+block of the payload. METRICS is an in-process registry of latency histograms
+rendered in the Prometheus text exposition format by /metrics. STARTUP records
+the process's cold start: when it became importable and ready, and how long the
+first request to each route took.
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+TRACE_MEMORY = os.environ.get("ML_TRACE_MEMORY", "").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class StageTimer:
+    """
+    Wall-clock time per named stage of one run, plus per-model fit/predict/metrics
+    times measured on worker threads. tracemalloc peaks are process-wide, so they
+    are approximate when several runs overlap.
+    """
+
+    def __init__(self, task, trace_memory=TRACE_MEMORY):
+        self.task = task
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.models = {}
+        self.peak_memory = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak)
+
+    def model(self, name, **phases):
+        """Record the seconds spent in each phase (fit, predict, metrics) of one model."""
+        self.models[name] = phases
+
+    def finish(self):
+        """The `timings` block of the payload; also feeds the /metrics histograms."""
+        timings = {
+            "total": round(time.perf_counter() - self._started, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "models": {
+                name: {phase: round(seconds, 4) for phase, seconds in phases.items()}
+                for name, phases in self.models.items()
+            },
+        }
+        if self.trace_memory:
+            timings["peak_memory_mb"] = {name: round(b / 1024 ** 2, 3) for name, b in self.peak_memory.items()}
+        observe_timings(self.task, timings)
+        return timings
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value, labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            pairs = list(zip(self.label_names, labels))
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(pairs, le=_number(bound))} {n}")
+            lines.append(f"{self.name}_bucket{_labels(pairs, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-safe set of named histograms."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help_text, tuple(label_names), buckets)
+            return self._histograms[name]
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            histogram = self._histograms[name]
+            histogram.observe(value, tuple(str(labels[k]) for k in histogram.label_names))
+
+    def render(self, samples=()):
+        """
+        Prometheus text format of every histogram plus `samples`, an iterable of
+        (name, type, help, {label_pairs_or_None: value}) values read at scrape time.
+        """
+        with self._lock:
+            lines = [line for h in self._histograms.values() for line in h.render()]
+        for name, kind, help_text, samples in samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in samples.items():
+                lines.append(f"{name}{_labels(labels or ())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+METRICS.histogram("http_request_duration_seconds", "HTTP request latency, until the response body is sent.",
+                  ("method", "route", "status"))
+METRICS.histogram("ml_stage_duration_seconds", "Wall-clock duration of each stage of a training run.",
+                  ("task", "stage"))
+METRICS.histogram("ml_model_duration_seconds", "Time spent fitting, predicting and scoring each model.",
+                  ("task", "model", "phase"))
+
+
+def observe_timings(task, timings):
+    """Add a payload's `timings` block to the stage and model histograms."""
+    for stage, seconds in timings["stages"].items():
+        METRICS.observe("ml_stage_duration_seconds", seconds, task=task, stage=stage)
+    for model, phases in timings["models"].items():
+        for phase, seconds in phases.items():
+            METRICS.observe("ml_model_duration_seconds", seconds, task=task, model=model, phase=phase)
+
+
+def _process_started():
+    """Wall-clock time this process was started (from /proc on Linux), else None."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupClock:
+    """
+    Seconds from process start (or, off Linux, from this module's import) to
+    each startup milestone, plus the latency of the first request per route.
+    """
+
+    def __init__(self):
+        self.origin = _process_started() or time.time()
+        self.milestones = {}
+        self.warmup = None  # warm-up step -> seconds, when ML_WARMUP ran
+        self.first_requests = {}
+        self._lock = threading.Lock()
+
+    def mark(self, milestone):
+        self.milestones[milestone] = time.time() - self.origin
+
+    def request_done(self, route, seconds):
+        if route in self.first_requests:
+            return
+        with self._lock:
+            if route not in self.first_requests:
+                ready = self.milestones.get("ready")
+                self.first_requests[route] = {
+                    "seconds": round(seconds, 4),
+                    "completed_after_ready": round(time.time() - self.origin - ready, 3) if ready is not None else None,
+                }
+
+    def stats(self):
+        with self._lock:
+            first_requests = dict(self.first_requests)
+        return {
+            "milestones": {name: round(seconds, 4) for name, seconds in self.milestones.items()},
+            "warmup": self.warmup,
+            "first_requests": first_requests,
+        }
+
+
+STARTUP = StartupClock()
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", "unmatched")
+            METRICS.observe(
+                "http_request_duration_seconds", seconds, method=scope["method"], route=route, status=status,
+            )
+            STARTUP.request_done(route, seconds)
+
+
+def _labels(pairs, **extra):
+    items = list(pairs) + list(extra.items())
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if not isinstance(value, bool) else str(int(value))
@@ -0,0 +1,298 @@
+"""
+Asynchronous training jobs on a bounded pool of worker processes.
+Each pool slot is a dispatcher thread that owns one long-lived worker process and
+feeds it queued jobs one at a time. Because every job runs in a separate process,
+a job that exceeds its timeout or is cancelled mid-fit is stopped by terminating
+that process (a fresh one is spawned for the next job), and HTTP handlers never
+block on training.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from ml.parallel import CPU_SCHEDULER
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED, TIMED_OUT = (
+    "queued", "running", "succeeded", "failed", "cancelled", "timed_out",
+)
+FINISHED = (SUCCEEDED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+def _runner(task):
+    """(run_* function, dataset registry) of a task, imported inside the worker process on first use."""
+    if task == "regression":
+        from ml.regression import REGRESSION_DATASETS, run_regression
+        return run_regression, REGRESSION_DATASETS
+    if task == "classification":
+        from ml.classification import CLASSIFICATION_DATASETS, run_classification
+        return run_classification, CLASSIFICATION_DATASETS
+    if task == "clustering":
+        from ml.clustering import CLUSTERING_DATASETS, run_clustering
+        return run_clustering, CLUSTERING_DATASETS
+    raise ValueError(f"Unknown task: {task}")
+
+
+def _worker_main(conn, cpu_cores):
+    """Entry point of a worker process: run (task, dataset, options) messages until told to stop."""
+    from ml.ingest import restore_uploads
+
+    # Workers train side by side, so each leases only its share of the machine
+    CPU_SCHEDULER.resize(cpu_cores)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        task, dataset_name, options = message
+        try:
+            run, datasets = _runner(task)
+            if dataset_name not in datasets:
+                # Uploads live in the dataset store; register any this process has not seen yet
+                restore_uploads({task: datasets})
+            if dataset_name not in datasets:
+                # run_* would silently fall back to the default dataset
+                raise ValueError(f"Unknown {task} dataset: {dataset_name}")
+            conn.send(("ok", run(dataset_name, **options)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class Job:
+    def __init__(self, task, dataset_name, options, timeout, on_result, budget=None):
+        self.id = uuid.uuid4().hex
+        self.task = task
+        self.dataset_name = dataset_name
+        self.options = options
+        self.timeout = timeout
+        self.on_result = on_result
+        self.budget = budget  # latency-budget plan the catalog was fitted to, if any
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cached = False
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            "id": self.id,
+            "task": self.task,
+            "dataset": self.dataset_name,
+            "options": self.options,
+            "budget": self.budget,
+            "status": self.status,
+            "cached": self.cached,
+            "error": self.error,
+            "timeout": self.timeout,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": round((self.started_at or self.finished_at or now) - self.created_at, 3),
+            "run_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+        }
+
+
+class JobQueue:
+    """Bounded FIFO of training jobs served by `max_workers` worker processes."""
+
+    def __init__(self, max_workers=2, max_queued=32, default_timeout=300.0, max_history=500):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.default_timeout = default_timeout
+        self.max_history = max_history
+        self._jobs = OrderedDict()
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._dispatchers = []
+        self._procs = {}
+        self._ctx = multiprocessing.get_context("spawn")
+
+    # ── Public API ──────────────────────────────────────────────
+    def submit(self, task, dataset_name, options=None, timeout=None, on_result=None, result=None, budget=None):
+        """
+        Queue a job and return it. Passing `result` records an already-known payload
+        (e.g. a cache hit) as a finished job without touching the pool; `budget` is
+        the latency-budget plan reported alongside it.
+        """
+        job = Job(task, dataset_name, options or {}, timeout or self.default_timeout, on_result, budget)
+        with self._lock:
+            if result is not None:
+                job.status, job.result, job.cached = SUCCEEDED, result, True
+                job.finished_at = job.created_at
+                job.done.set()
+            elif self._count(QUEUED) >= self.max_queued:
+                raise QueueFull(f"{self.max_queued} jobs already queued")
+            self._jobs[job.id] = job
+            self._prune()
+        if result is None:
+            self._ensure_started()
+            self._pending.put(job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued job immediately, or stop a running one by killing its worker."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+            elif job.status == RUNNING:
+                job.cancel_requested = True
+        return job
+
+    def position(self, job):
+        """1-based position of a queued job in the FIFO, else None."""
+        if job.status != QUEUED:
+            return None
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j.status == QUEUED]
+        return queued.index(job) + 1 if job in queued else None
+
+    def list(self):
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def stats(self):
+        with self._lock:
+            counts = {status: self._count(status) for status in (QUEUED, RUNNING) + FINISHED}
+        return {
+            "workers": self.max_workers,
+            "max_queued": self.max_queued,
+            "default_timeout": self.default_timeout,
+            **counts,
+        }
+
+    def shutdown(self):
+        for _ in self._dispatchers:
+            self._pending.put(None)
+        for proc, conn in list(self._procs.values()):
+            _stop_worker(proc, conn)
+        self._procs.clear()
+
+    # ── Dispatch ────────────────────────────────────────────────
+    def _ensure_started(self):
+        with self._lock:
+            while len(self._dispatchers) < self.max_workers:
+                t = threading.Thread(target=self._dispatch, args=(len(self._dispatchers),), daemon=True)
+                self._dispatchers.append(t)
+                t.start()
+
+    def _spawn(self, slot):
+        parent_conn, child_conn = self._ctx.Pipe()
+        cpu_cores = max(1, CPU_SCHEDULER.cores // self.max_workers)
+        proc = self._ctx.Process(target=_worker_main, args=(child_conn, cpu_cores), daemon=True)
+        proc.start()
+        child_conn.close()
+        self._procs[slot] = (proc, parent_conn)
+        return proc, parent_conn
+
+    def _dispatch(self, slot):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                break
+            with self._lock:
+                if job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+
+            proc, conn = self._procs.get(slot) or self._spawn(slot)
+            if not proc.is_alive():
+                proc, conn = self._spawn(slot)
+            status, value = self._run_on_worker(job, proc, conn)
+            if status in (CANCELLED, TIMED_OUT) or not proc.is_alive():
+                # The worker is still busy with (or died during) this job; replace it.
+                _stop_worker(proc, conn, graceful=False)
+                self._procs.pop(slot, None)
+
+            if status == SUCCEEDED and job.on_result is not None:
+                try:
+                    job.on_result(value)
+                except Exception:
+                    # The payload is still served from the job; only its caching/calibration is lost
+                    logger.exception("on_result of job %s (%s on %s) failed", job.id, job.task, job.dataset_name)
+            with self._lock:
+                if status == SUCCEEDED:
+                    job.result = value
+                elif status == FAILED:
+                    job.error = value
+                elif status == TIMED_OUT:
+                    job.error = f"Job exceeded its {job.timeout:g}s timeout"
+                self._finish(job, status)
+
+    @staticmethod
+    def _run_on_worker(job, proc, conn):
+        """Send one job to the worker and wait for its answer, a timeout or a cancellation."""
+        conn.send((job.task, job.dataset_name, job.options))
+        deadline = job.started_at + job.timeout
+        while True:
+            if conn.poll(0.1):
+                try:
+                    kind, value = conn.recv()
+                except EOFError:
+                    return FAILED, "Worker process exited unexpectedly"
+                return (SUCCEEDED, value) if kind == "ok" else (FAILED, value)
+            if job.cancel_requested:
+                return CANCELLED, None
+            if time.time() > deadline:
+                return TIMED_OUT, None
+            if not proc.is_alive():
+                return FAILED, "Worker process exited unexpectedly"
+
+    # ── Internals (call with self._lock held) ───────────────────
+    def _count(self, status):
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        job.done.set()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[: max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job_id]
+
+
+def _stop_worker(proc, conn, graceful=True):
+    if graceful:
+        try:
+            conn.send(None)
+        except (OSError, ValueError):
+            pass
+        proc.join(timeout=0.5)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join(timeout=2)
+    conn.close()
+
+
+JOB_QUEUE = JobQueue(
+    max_workers=int(os.environ.get("ML_JOB_WORKERS", 2)),
+    max_queued=int(os.environ.get("ML_JOB_MAX_QUEUED", 32)),
+    default_timeout=float(os.environ.get("ML_JOB_TIMEOUT", 300)),
+)
@@ -0,0 +1,77 @@
+"""
+Single-pass scoring.
+Every classification metric is derived from one confusion matrix built with
+np.bincount, and every regression metric from one residual vector, instead of
+one sklearn call (and one pass over the labels) per metric. The task modules
+keep the best model's predictions from its scoring pass, so charts never
+predict again.
+"""
+
+import numpy as np
+
+
+def confusion(y_true, y_pred, n_classes):
+    """n_classes x n_classes counts; rows are true labels, columns predictions (codes 0..n-1)."""
+    codes = np.asarray(y_true, dtype=np.intp) * n_classes + np.asarray(y_pred, dtype=np.intp)
+    return np.bincount(codes, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def _divide(num, den):
+    """num / den with 0 where den is 0 (sklearn's zero_division=0)."""
+    out = np.zeros(len(num), dtype=np.float64)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def classification_scores(y_true, y_pred, n_classes):
+    """
+    Accuracy, support-weighted precision/recall/F1 and their per-class values,
+    all from the confusion matrix of one pass over the labels.
+    """
+    cm = confusion(y_true, y_pred, n_classes)
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+
+    precision = _divide(tp, predicted)
+    recall = _divide(tp, support)
+    f1 = _divide(2 * tp, support + predicted)
+    total = support.sum()
+
+    def weighted(values):
+        return float(np.dot(values, support) / total) if total else 0.0
+
+    return {
+        "accuracy": float(tp.sum() / total) if total else 0.0,
+        "precision": weighted(precision),
+        "recall": weighted(recall),
+        "f1": weighted(f1),
+        "confusion_matrix": cm,
+        "per_class": {"precision": precision, "recall": recall, "f1": f1, "support": support},
+    }
+
+
+def total_sum_of_squares(y_true):
+    """Σ(y - ȳ)², the R² denominator; computed once per test set and shared by every model."""
+    y = np.asarray(y_true, dtype=np.float64)
+    centered = y - y.mean()
+    return float(np.dot(centered, centered))
+
+
+def regression_scores(y_true, y_pred, sst=None):
+    """R², RMSE and MAE from one residual vector."""
+    residuals = np.subtract(y_true, y_pred, dtype=np.float64)
+    sse = float(np.dot(residuals, residuals))
+    n = len(residuals)
+    if sst is None:
+        sst = total_sum_of_squares(y_true)
+    if sst == 0:
+        # sklearn's convention for a constant target
+        r2 = 1.0 if sse == 0 else 0.0
+    else:
+        r2 = 1 - sse / sst
+    return {
+        "r2": r2,
+        "rmse": float(np.sqrt(sse / n)),
+        "mae": float(np.abs(residuals).sum() / n),
+    }
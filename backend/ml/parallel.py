@@ -0,0 +1,188 @@
+"""
+Parallel fitting of a model catalog.
+Independent fits (with their predict/metric steps) run on a thread pool, since
+sklearn's Cython and BLAS code releases the GIL and the training matrices can be
+shared without pickling. The CPU budget is split between the two levels of
+parallelism: the pool gets one worker per model up to the core count, and each
+model's own n_jobs plus the BLAS/OpenMP pools are capped to the per-worker share.
+
+Across concurrent requests, CPU_SCHEDULER leases the process's cores to training
+runs: each run's fits are capped to its lease, and runs queue (FIFO) while every
+core is leased, instead of each one starting a thread per core.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+
+from threadpoolctl import ThreadpoolController, threadpool_limits
+
+
+def available_cpus():
+    """Cores this process may run on (respects CPU affinity / container cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class CpuScheduler:
+    """
+    Process-wide admission control for training runs. acquire() blocks until it
+    is the caller's turn and a core is free, then grants its fair share: the
+    free cores split between the caller and the callers queued behind it, at
+    most `max_lease` (a lower cap keeps one large run from holding the whole
+    machine). The BLAS pool, which is process-global, is capped to the
+    smallest lease held, or to the per-fit share of a parallel batch running
+    on one (cap_blas).
+    """
+
+    def __init__(self, cores, max_lease=None):
+        self.cores = max(1, cores)
+        self.max_lease = max_lease or self.cores
+        self._free = self.cores
+        self._leases = []
+        self._blas_caps = []
+        self._waiting = deque()
+        self._cond = threading.Condition()
+        self._controller = None
+        self._counters = {"leases": 0, "queued": 0, "wait_seconds": 0.0}
+
+    def resize(self, cores):
+        """Change the number of cores leased out (e.g. a job worker's share of the machine)."""
+        with self._cond:
+            cores = max(1, cores)
+            self._free += cores - self.cores
+            self.max_lease = min(self.max_lease, cores)
+            self.cores = cores
+            self._cond.notify_all()
+
+    def acquire(self, want=None, on_wait=None):
+        """Block until cores are available and return how many the caller may use (at most `want`)."""
+        ticket = object()
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting.append(ticket)
+            if self._waiting[0] is not ticket or self._free < 1:
+                self._counters["queued"] += 1
+                if on_wait is not None:
+                    on_wait(len(self._waiting) - 1, len(self._leases))
+                while self._waiting[0] is not ticket or self._free < 1:
+                    self._cond.wait()
+            self._waiting.popleft()
+            share = -(-self._free // (1 + len(self._waiting)))
+            cores = min(want or self.max_lease, self.max_lease, share)
+            self._free -= cores
+            self._leases.append(cores)
+            self._counters["leases"] += 1
+            self._counters["wait_seconds"] += time.perf_counter() - start
+            self._limit_blas()
+            # What is left may be enough for the next caller in line
+            self._cond.notify_all()
+        return cores
+
+    def release(self, cores):
+        with self._cond:
+            self._free += cores
+            self._leases.remove(cores)
+            self._limit_blas()
+            self._cond.notify_all()
+
+    @contextmanager
+    def cap_blas(self, threads):
+        """Hold the BLAS pool to at most `threads` while a leased run's parallel batch fits."""
+        with self._cond:
+            self._blas_caps.append(threads)
+            self._limit_blas()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._blas_caps.remove(threads)
+                self._limit_blas()
+
+    def _limit_blas(self):
+        if not self._leases and not self._blas_caps:
+            return
+        if self._controller is None:
+            # Created on first use, once numpy/scipy have loaded their BLAS
+            self._controller = ThreadpoolController()
+        self._controller.limit(limits=min(self._leases + self._blas_caps), user_api="blas")
+
+    def stats(self):
+        with self._cond:
+            return {
+                "cores": self.cores,
+                "leased": self.cores - self._free,
+                "active": len(self._leases),
+                "waiting": len(self._waiting),
+                **self._counters,
+                "wait_seconds": round(self._counters["wait_seconds"], 3),
+            }
+
+
+CPU_SCHEDULER = CpuScheduler(
+    int(os.environ.get("ML_CPU_BUDGET", 0)) or available_cpus(),
+    int(os.environ.get("ML_CPU_LEASE_MAX", 0)) or None,
+)
+
+
+def split_cpu_budget(n_tasks, budget=None):
+    """Return (outer pool workers, inner threads per task) for n_tasks sharing `budget` cores."""
+    budget = max(1, budget or available_cpus())
+    outer = max(1, min(n_tasks, budget))
+    inner = max(1, budget // outer)
+    return outer, inner
+
+
+def fit_models(models, fit_one, parallel=False, cpu_budget=None, on_start=None, ordered=True):
+    """
+    Yield (name, fit_one(name, model)) for every model, in catalog order.
+    With parallel=True the calls run concurrently on a bounded thread pool; results
+    are still yielded in catalog order so logs and best-model selection stay deterministic,
+    unless `ordered` is False, when each is yielded as soon as it finishes.
+    With a `cpu_budget`, sequential fits get all of it and parallel ones a share each.
+    `on_start(name)` is called from the caller's thread as each fit is started/submitted.
+    """
+    if not parallel or len(models) < 2:
+        if cpu_budget:
+            _cap_n_jobs(models, cpu_budget)
+        # OpenMP limits are per thread, so this only affects this run's fits
+        with threadpool_limits(limits=cpu_budget, user_api="openmp") if cpu_budget else nullcontext():
+            for name, model in models.items():
+                if on_start is not None:
+                    on_start(name)
+                yield name, fit_one(name, model)
+        return
+
+    outer, inner = split_cpu_budget(len(models), cpu_budget)
+    _cap_n_jobs(models, inner)
+
+    def fit_capped(name, model):
+        with threadpool_limits(limits=inner, user_api="openmp"):
+            return fit_one(name, model)
+
+    # The BLAS pool is process-wide and shared with overlapping runs, so its cap
+    # goes through CPU_SCHEDULER, which restores the lease-wide cap afterwards
+    with CPU_SCHEDULER.cap_blas(inner), ThreadPoolExecutor(max_workers=outer) as pool:
+        futures = []
+        for name, model in models.items():
+            if on_start is not None:
+                on_start(name)
+            futures.append((name, pool.submit(fit_capped, name, model)))
+        if ordered:
+            for name, future in futures:
+                yield name, future.result()
+        else:
+            names = {future: name for name, future in futures}
+            for future in as_completed(names):
+                yield names[future], future.result()
+
+
+def _cap_n_jobs(models, n_jobs):
+    for model in models.values():
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=n_jobs)
@@ -0,0 +1,398 @@
+"""
+Shared training pipeline.
+Every task runs the same stages — load → split → scale → fit/score loop →
+register → task-specific outputs → EDA — through a TrainingRun, so each task
+module only declares its models and metrics. Deterministic stages (split
+indices, fitted scaler + scaled arrays, PCA projection, EDA) are memoized in
+ARTIFACTS, keyed by the dataset and the stage's parameters, so re-running with
+another model subset goes straight to fitting.
+
+Data stays in NumPy arrays from the memory-mapped store to the estimators: rows
+are gathered once by split index and scaled in place, in float32 for float32
+datasets (uploads) and float64 otherwise (ML_COMPUTE_DTYPE overrides). Tree
+ensembles, which cast to float32 internally, get a shared float32 copy instead
+of converting per fit.
+
+scikit-learn is imported where it is first used, not at module import, so the
+API process boots without loading it (see ml.warmup).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ml.cache import SingleFlight
+from ml.costmodel import COST_MODEL
+from ml.datastore import load_registered, store_key
+from ml.eda import compute_eda
+from ml.instrument import StageTimer
+from ml.parallel import CPU_SCHEDULER, fit_models
+from ml.registry import MODEL_REGISTRY
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _freeze(value):
+    """Mark cached arrays read-only: they are shared by every run that hits the cache."""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+class ArtifactCache:
+    """Byte-bounded LRU of intermediate stage outputs; concurrent misses compute once."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_or_compute(self, key, compute):
+        """(value, hit) for `key`, calling `compute()` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return self._entries[key][0], True
+
+        def miss():
+            value = _freeze(compute())
+            size = _nbytes(value)
+            with self._lock:
+                self._counters["misses"] += 1
+                if size <= self.max_bytes and key not in self._entries:
+                    self._entries[key] = (value, size)
+                    self._bytes += size
+                    while self._bytes > self.max_bytes:
+                        _, (_, evicted) = self._entries.popitem(last=False)
+                        self._bytes -= evicted
+                        self._counters["evictions"] += 1
+            return value
+
+        value, shared = self._flight.do(key, miss)
+        return value, shared
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes, **self._counters}
+
+
+ARTIFACTS = ArtifactCache(int(os.environ.get("ML_ARTIFACT_CACHE_BYTES", 256 * 1024 * 1024)))
+
+COMPUTE_DTYPE = os.environ.get("ML_COMPUTE_DTYPE", "auto")
+SCALE_CHUNK_ROWS = 65536
+
+# Projection solver: exact below both limits, randomized SVD for wide data, IncrementalPCA for tall data
+PCA_WIDE_FEATURES = 50
+PCA_TALL_ROWS = int(os.environ.get("ML_PCA_TALL_ROWS", 100_000))
+PCA_CHUNK_ROWS = 65536
+
+# Estimators (by class name) that validate X with dtype=float32 and would otherwise copy it on every fit/predict
+FLOAT32_NATIVE = {
+    "DecisionTreeClassifier", "DecisionTreeRegressor",
+    "RandomForestClassifier", "RandomForestRegressor",
+    "ExtraTreesClassifier", "ExtraTreesRegressor",
+    "GradientBoostingClassifier", "GradientBoostingRegressor",
+}
+
+
+def select_models(models, names=None, variants=None):
+    """
+    The catalog restricted to `names` (in catalog order, then any of the
+    cheaper `variants` named); all of the catalog when `names` is empty.
+    """
+    if not names:
+        return models
+    pool = {**models, **(variants or {})}
+    unknown = [n for n in names if n not in pool]
+    if unknown:
+        raise ValueError(f"Unknown model(s) {unknown}; choose from {list(models)}")
+    return {name: model for name, model in pool.items() if name in names}
+
+
+class TrainingRun:
+    """
+    State of one run_* call: logs and SSE events, stage timings, the loaded
+    dataset and the cached artifacts derived from it.
+    """
+
+    def __init__(self, task, datasets, dataset_name, default, on_event=None):
+        self.task = task
+        self.dataset_name = dataset_name if dataset_name in datasets else default
+        self.config = datasets[self.dataset_name]
+        self.on_event = on_event
+        self.logs = []
+        self.timer = StageTimer(task)
+        self.raw = None
+        self.workload = None  # (n_samples, n_features, n_classes, metric_units) the cost model sizes fits by
+        self._split_params = None
+
+    def emit(self, event, data):
+        if self.on_event is not None:
+            self.on_event(event, data)
+
+    def log(self, msg):
+        self.logs.append(msg)
+        self.emit("log", msg)
+
+    def stage(self, name):
+        return self.timer.stage(name)
+
+    # ── Stages ──────────────────────────────────────────────────
+    def load(self):
+        with self.stage("load"):
+            self.raw = load_registered(self.config)
+        return self.raw
+
+    @property
+    def dtype(self):
+        """Floating dtype the scaled matrices are computed in."""
+        if COMPUTE_DTYPE != "auto":
+            return np.dtype(COMPUTE_DTYPE)
+        return np.dtype(np.float32 if self.raw.data.dtype == np.float32 else np.float64)
+
+    def _artifact(self, stage, params, compute, log_hit=True):
+        key = (store_key(self.config), self.raw.data.shape, str(self.raw.data.dtype), str(self.dtype), stage, params)
+        with self.stage(stage):
+            value, hit = ARTIFACTS.get_or_compute(key, compute)
+        if hit and log_hit:
+            self.log(f"   ♻️  Reusing cached {stage} artifacts")
+        return value
+
+    def split(self, y, test_size=0.2, stratify=False):
+        """(train_idx, test_idx) row indices of a seeded train/test split."""
+        from sklearn.model_selection import train_test_split
+
+        self._split_params = (test_size, stratify)
+        return self._artifact(
+            "split", (test_size, stratify),
+            lambda: tuple(train_test_split(
+                np.arange(len(y)), test_size=test_size, random_state=42, stratify=y if stratify else None
+            )),
+        )
+
+    def scale(self, split):
+        """(scaler, X_train_scaled, X_test_scaled) with the scaler fitted on the training rows."""
+        train_idx, test_idx = split
+
+        def compute():
+            # The row gathers are the only copies; scaling then happens in place
+            X_train = np.asarray(self.raw.data[train_idx], dtype=self.dtype)
+            X_test = np.asarray(self.raw.data[test_idx], dtype=self.dtype)
+            scaler = _fit_scaler_in_place(X_train)
+            scaler.transform(X_test, copy=False)
+            return scaler, X_train, X_test
+
+        return self._artifact("scale", self._split_params, compute)
+
+    def kfold(self, y, n_folds, stratify=False):
+        """[(train_idx, test_idx)] row indices of seeded, shuffled k-fold cross-validation."""
+        from sklearn.model_selection import KFold, StratifiedKFold
+
+        self._split_params = ("folds", n_folds, stratify)
+        splitter = (StratifiedKFold if stratify else KFold)(n_splits=n_folds, shuffle=True, random_state=42)
+        return self._artifact(
+            "folds", (n_folds, stratify), lambda: list(splitter.split(np.zeros((len(y), 1)), y))
+        )
+
+    def scale_folds(self, folds):
+        """[(X_train_scaled, X_test_scaled)] per fold, each scaled by a scaler fitted on its training rows."""
+        def compute():
+            scaled = []
+            for train_idx, test_idx in folds:
+                X_train = np.asarray(self.raw.data[train_idx], dtype=self.dtype)
+                X_test = np.asarray(self.raw.data[test_idx], dtype=self.dtype)
+                _fit_scaler_in_place(X_train).transform(X_test, copy=False)
+                scaled.append((X_train, X_test))
+            return scaled
+
+        return self._artifact("scale", self._split_params, compute)
+
+    def scale_all(self):
+        """(scaler, X_scaled) fitted on every row, for unsupervised tasks."""
+        def compute():
+            X = np.array(self.raw.data, dtype=self.dtype)
+            return _fit_scaler_in_place(X), X
+
+        return self._artifact("scale", "all", compute)
+
+    def model_inputs(self, model, *arrays, fold=None):
+        """`arrays` as `model` wants them: a shared float32 copy for tree ensembles, else unchanged."""
+        if type(model).__name__ not in FLOAT32_NATIVE or all(a.dtype == np.float32 for a in arrays):
+            return arrays
+        return self._artifact(
+            "float32", (self._split_params, fold), lambda: tuple(np.asarray(a, dtype=np.float32) for a in arrays),
+            log_hit=fold is None,  # one line per model, not per model and fold
+        )
+
+    def pca(self, X_scaled, n_components=2):
+        """(explained_variance_ratio, projection) of the scaled data; the fitted PCA is cached with them."""
+        solver = pca_solver(*X_scaled.shape)
+        if solver != "exact":
+            self.log(f"   Using {solver} PCA for {X_scaled.shape[0]:,} x {X_scaled.shape[1]} data")
+        explained, projection, _ = self._artifact(
+            "pca", (n_components, solver), lambda: fit_projection(X_scaled, n_components, solver)
+        )
+        return explained, projection
+
+    def eda(self, target=None, class_names=None):
+        """The payload's `eda` block for the raw features (and target)."""
+        return self._artifact(
+            "eda", self.task,
+            lambda: compute_eda(self.task, self.raw.data, target, self.raw.feature_names, class_names,
+                                self.raw.get("moments")),
+        )
+
+    def train(self, models, fit_one, parallel=False):
+        """
+        Yield (name, result, fit_seconds) in catalog order, where `fit_one(name, model)`
+        returns (result, phases) and phases maps fit/predict/metrics to seconds.
+        The fits run on a lease of CPU_SCHEDULER's cores, queueing while none are free.
+        """
+        def on_start(name):
+            self.log(f"🏋️  Training {name}...")
+
+        if parallel:
+            self.log(f"⚡ Training {len(models)} models in parallel...")
+            # Concurrent fits contend for cores; only sequential timings calibrate the cost model
+            self.workload = None
+
+        for name, (result, phases) in self.fit_batch(models, fit_one, parallel, on_start):
+            self.timer.model(name, **phases)
+            if self.workload is not None:
+                COST_MODEL.observe(self.task, name, models[name], self.workload, sum(phases.values()))
+            yield name, result, phases["fit"]
+        if self.workload is not None:
+            COST_MODEL.save()
+
+    def cross_validate(self, models, n_folds, fit_fold, parallel=True):
+        """
+        Yield (name, fold_results, fold_fit_seconds) in catalog order, where
+        `fit_fold(name, model, fold)` fits a fresh clone of the model on one fold
+        and returns (result, phases). The whole (model x fold) grid is one batch,
+        fitted in parallel on the run's CPU lease unless `parallel` is False.
+        """
+        from sklearn.base import clone
+
+        grid = {(name, fold): clone(model) for name, model in models.items() for fold in range(n_folds)}
+
+        def on_start(key):
+            if key[1] == 0:
+                self.log(f"🏋️  Training {key[0]} on {n_folds} folds...")
+
+        if parallel:
+            self.log(f"⚡ Training {len(models)} models x {n_folds} folds in parallel...")
+        # Fold timings are not comparable with the single-split workload
+        self.workload = None
+
+        folds = []
+        for (name, fold), (result, phases) in self.fit_batch(
+            grid, lambda key, model: fit_fold(key[0], model, key[1]), parallel, on_start
+        ):
+            folds.append((result, phases))
+            if fold == n_folds - 1:
+                self.timer.model(name, **{phase: sum(p[phase] for _, p in folds) for phase in folds[0][1]})
+                yield name, [r for r, _ in folds], [p["fit"] for _, p in folds]
+                folds = []
+
+    def fit_batch(self, models, fit_one, parallel=False, on_start=None, ordered=True):
+        """
+        Yield (name, fit_one(name, model)) from fit_models() on a lease of
+        CPU_SCHEDULER's cores, timed as the `train` stage.
+        """
+        def on_wait(ahead, running):
+            self.log(f"⏳ All CPU cores are leased ({running} runs training, {ahead} queued ahead) — waiting...")
+
+        with self.stage("cpu_wait"):
+            cores = CPU_SCHEDULER.acquire(on_wait=on_wait)
+        try:
+            if cores < CPU_SCHEDULER.cores:
+                self.log(f"🧮 Leased {cores} of {CPU_SCHEDULER.cores} CPU cores")
+            with self.stage("train"):
+                yield from fit_models(models, fit_one, parallel, cores, on_start=on_start, ordered=ordered)
+        finally:
+            CPU_SCHEDULER.release(cores)
+
+    def register(self, fingerprint, models, scaler):
+        """Keep the fitted scaler + model pipelines for /predict."""
+        with self.stage("register"):
+            for name, model in models.items():
+                MODEL_REGISTRY.register(self.task, self.dataset_name, fingerprint, name, scaler, model)
+
+    def finish(self, payload):
+        """The task's payload with the run's stage timings added."""
+        payload["timings"] = self.timer.finish()
+        if self.workload is not None:
+            # Lets the parent process calibrate its cost model from job worker runs
+            payload["timings"]["workload"] = list(self.workload)
+        return payload
+
+
+def _fit_scaler_in_place(X, chunk_rows=SCALE_CHUNK_ROWS):
+    """
+    StandardScaler fitted on X that also overwrites X with its scaled values.
+    Both passes walk X in row blocks so the float64 scratch of the mean/variance
+    update stays bounded instead of growing to a full-size copy.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler(copy=False)
+    for start in range(0, len(X), chunk_rows):
+        scaler.partial_fit(X[start:start + chunk_rows])
+    for start in range(0, len(X), chunk_rows):
+        scaler.transform(X[start:start + chunk_rows])
+    # The registered pipeline must not scale callers' /predict batches in place
+    scaler.set_params(copy=True)
+    return scaler
+
+
+def pca_solver(n_rows, n_features):
+    if n_features >= PCA_WIDE_FEATURES:
+        return "randomized"
+    if n_rows >= PCA_TALL_ROWS:
+        return "incremental"
+    return "exact"
+
+
+def fit_projection(X, n_components=2, solver="exact", chunk_rows=PCA_CHUNK_ROWS):
+    """
+    (explained_variance_ratio, projection, fitted estimator). The incremental
+    solver fits and projects X in row blocks, so no centred copy of X is made.
+    """
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    if solver == "incremental":
+        pca = IncrementalPCA(n_components=n_components)
+        bounds = list(range(0, len(X), chunk_rows)) + [len(X)]
+        if len(bounds) > 2 and bounds[-1] - bounds[-2] < n_components:
+            # partial_fit needs >= n_components rows: fold a short tail into the previous block
+            del bounds[-2]
+        for start, stop in zip(bounds, bounds[1:]):
+            pca.partial_fit(X[start:stop])
+        projection = np.empty((len(X), n_components), dtype=X.dtype)
+        for start in range(0, len(X), chunk_rows):
+            projection[start:start + chunk_rows] = pca.transform(X[start:start + chunk_rows])
+    else:
+        pca = PCA(n_components=n_components, svd_solver="randomized" if solver == "randomized" else "auto",
+                  random_state=42)
+        projection = pca.fit_transform(X)
+    return pca.explained_variance_ratio_, projection, pca
@@ -0,0 +1,199 @@
+"""
+Registry of fitted models for inference.
+Every run_* function registers its fitted StandardScaler + estimator pairs as
+sklearn Pipelines keyed by (task, dataset, catalog fingerprint, model name).
+Pipelines live in an in-memory LRU and are written to disk with joblib in the
+background, so they survive eviction and restarts and are shared with job
+worker processes. The disk tier is bounded by evicting the least recently used
+files (by mtime, refreshed on every load). Reloads use mmap_mode="r" so large
+arrays are not copied.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+
+
+class ModelRegistry:
+    """LRU of fitted pipelines with a joblib disk tier."""
+
+    def __init__(self, max_entries=32, disk_dir=None, disk_max_bytes=1024 ** 3):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-registry")
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+
+    def register(self, task, dataset_name, fingerprint, model_name, scaler, model):
+        """Store a fitted scaler + model as a Pipeline and spill it to disk asynchronously."""
+        from sklearn.pipeline import Pipeline
+
+        if not hasattr(model, "predict"):
+            return None
+        pipeline = Pipeline([("scaler", scaler), ("model", model)])
+        key = (task, dataset_name, fingerprint, model_name)
+        with self._lock:
+            self._store_memory(key, pipeline)
+        if self.disk_dir:
+            self._writer.submit(self._write_disk, key, pipeline)
+        return pipeline
+
+    def get(self, task, dataset_name, fingerprint, model_name):
+        """Fitted pipeline from memory, else from disk (memory-mapped), else None."""
+        key = (task, dataset_name, fingerprint, model_name)
+        with self._lock:
+            pipeline = self._entries.get(key)
+            if pipeline is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return pipeline
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                pipeline = joblib.load(path, mmap_mode="r")
+            except Exception as e:
+                logger.warning("Could not load model %s: %s", path, e)
+                pipeline = None
+            if pipeline is not None:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._store_memory(key, pipeline)
+                return pipeline
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def list(self):
+        """Every known pipeline; disk-only entries are reported by their file-name slug."""
+        with self._lock:
+            keys = list(self._entries)
+        entries = {(t, d, f, _slug(m)): {"task": t, "dataset": d, "fingerprint": f, "model": m,
+                                         "in_memory": True, "on_disk": False}
+                   for t, d, f, m in keys}
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                parts = tuple(name[: -len(".joblib")].split("--")) if name.endswith(".joblib") else ()
+                if len(parts) != 4:
+                    continue
+                entry = entries.setdefault(parts, {"task": parts[0], "dataset": parts[1], "fingerprint": parts[2],
+                                                   "model": parts[3], "in_memory": False})
+                entry["on_disk"] = True
+        return list(entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, **self._counters}
+
+    def flush(self):
+        """Block until pending disk writes are done."""
+        self._writer.submit(lambda: None).result()
+
+    # ── Internals ───────────────────────────────────────────────
+    def _store_memory(self, key, pipeline):
+        self._entries[key] = pipeline
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _path(self, key):
+        if not self.disk_dir:
+            return None
+        task, dataset_name, fingerprint, model_name = key
+        return os.path.join(self.disk_dir, f"{task}--{dataset_name}--{fingerprint}--{_slug(model_name)}.joblib")
+
+    def _write_disk(self, key, pipeline):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            joblib.dump(pipeline, tmp)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("Could not write model %s: %s", path, e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least-recently-used model files until the tier fits disk_max_bytes."""
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".joblib"):
+                try:
+                    stat = os.stat(os.path.join(self.disk_dir, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                # Loaded copies are memory-mapped, so removing the file does not disturb them
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._counters["disk_evictions"] += 1
+
+
+def predict_batch(pipeline, X):
+    """Score a 2D batch in one vectorized call. Returns (predictions, seconds)."""
+    if X.ndim != 2:
+        raise ValueError("Expected a 2D batch of rows")
+    n_features = pipeline.n_features_in_
+    if X.shape[1] != n_features:
+        raise ValueError(f"Expected {n_features} features per row, got {X.shape[1]}")
+    centers = getattr(pipeline[-1], "cluster_centers_", None)
+    if centers is not None and X.dtype != centers.dtype:
+        # (MiniBatch)KMeans only predicts in the dtype it was fitted in (float32 for uploads)
+        X = X.astype(centers.dtype)
+    start = time.perf_counter()
+    predictions = pipeline.predict(X)
+    return np.asarray(predictions), time.perf_counter() - start
+
+
+def decode_columnar(body, n_features, dtype="float64"):
+    """
+    Decode a binary columnar batch: `n_features` contiguous little-endian columns
+    of equal length, concatenated. Returns a (n_rows, n_features) view, no copy.
+    """
+    dt = np.dtype(dtype).newbyteorder("<")
+    values = np.frombuffer(body, dtype=dt)
+    if n_features == 0 or values.size % n_features:
+        raise ValueError(f"Body of {values.size} values is not a whole number of {n_features} columns")
+    return values.reshape(n_features, -1).T
+
+
+MODEL_REGISTRY = ModelRegistry(
+    max_entries=int(os.environ.get("ML_MODEL_REGISTRY_SIZE", 32)),
+    disk_dir=os.environ.get("ML_MODEL_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".models"),
+    disk_max_bytes=int(os.environ.get("ML_MODEL_DISK_MAX_BYTES", 1024 ** 3)),
+)
@@ -4,50 +4,107 @@ Trains: Linear Regression, Decision Tree, Random Forest, SVR
 Returns step-by-step logs, per-model metrics, and chart data.
 """
 
+import math
 import time
 import numpy as np
-import pandas as pd
-from sklearn.datasets import fetch_california_housing, load_diabetes, load_linnerud
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
+from ml.cache import catalog_fingerprint
+from ml.datastore import load_registered, sklearn_loader
+from ml.incremental import can_grow, early_stopping_summary, grow, growth_log
+from ml.metrics import regression_scores, total_sum_of_squares
+from ml.pipeline import TrainingRun, select_models
+from ml.viz import POINT_BUDGET, density_grid, quantile_strata, sampling_summary, stratified_sample
+
+
+# Predicted-vs-actual points drawn per run
+CHART_POINTS = min(200, POINT_BUDGET)
 
 REGRESSION_DATASETS = {
     "california": {
         "name": "California Housing",
-        "loader": fetch_california_housing,
+        "loader": sklearn_loader("fetch_california_housing"),
         "target_name": "Median house value (in $100k)",
     },
     "diabetes": {
         "name": "Diabetes Dataset",
-        "loader": load_diabetes,
+        "loader": sklearn_loader("load_diabetes"),
         "target_name": "Disease progression measure",
     },
     "linnerud": {
         "name": "Linnerud Dataset",
-        "loader": load_linnerud,
+        "loader": sklearn_loader("load_linnerud"),
         "target_name": "Weight/Waist/Pulse (First Target)",
     },
 }
 
 
-def run_regression(dataset_name="california"):
-    logs = []
+def build_models():
+    """Fresh, unfitted instances of every model in the catalog."""
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.tree import DecisionTreeRegressor
 
-    def log(msg):
-        logs.append(msg)
+    return {
+        "Linear Regression": LinearRegression(),
+        "Decision Tree": DecisionTreeRegressor(max_depth=10, random_state=42),
+        "Random Forest": RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1),
+        "Gradient Boosting": GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42),
+    }
 
-    # 1. Load dataset
-    if dataset_name not in REGRESSION_DATASETS:
-        dataset_name = "california"
 
-    config = REGRESSION_DATASETS[dataset_name]
+def build_variants():
+    """Cheaper stand-ins a latency budget may train in place of catalog models (see VARIANTS)."""
+    from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+    return {
+        "Random Forest (30 trees)": RandomForestRegressor(n_estimators=30, max_depth=10, random_state=42, n_jobs=-1),
+        "Gradient Boosting (histogram)": HistGradientBoostingRegressor(max_iter=100, max_depth=5, random_state=42),
+    }
+
+
+# Catalog model -> its variants, best first
+VARIANTS = {
+    "Random Forest": ["Random Forest (30 trees)"],
+    "Gradient Boosting": ["Gradient Boosting (histogram)"],
+}
+
+# Catalog model -> hyperparameter grid for /api/regression/search, and the resource
+# successive halving grows (training rows, or n_estimators up to the catalog's)
+SEARCH_SPACES = {
+    "Decision Tree": {
+        "params": {"max_depth": [3, 5, 10, 20, None], "min_samples_leaf": [1, 5, 20]},
+        "resource": "n_samples",
+    },
+    "Random Forest": {
+        "params": {"max_depth": [5, 10, None], "max_features": [1.0, 0.5, "sqrt"], "min_samples_leaf": [1, 5]},
+        "resource": "n_estimators",
+    },
+    "Gradient Boosting": {
+        "params": {"learning_rate": [0.03, 0.1, 0.3], "max_depth": [2, 3, 5], "subsample": [0.7, 1.0]},
+        "resource": "n_estimators",
+    },
+}
+
+
+def workload(raw_data):
+    """(training rows, features, classes, metric units) the cost model sizes each fit by."""
+    n = len(raw_data.data)
+    return n - math.ceil(n * 0.2), raw_data.data.shape[1], 1, 0
+
+
+def workload_for(dataset_name):
+    """The workload run_regression(dataset_name) will train on."""
+    return workload(load_registered(REGRESSION_DATASETS.get(dataset_name, REGRESSION_DATASETS["california"])))
+
+
+def run_regression(dataset_name="california", parallel=False, on_event=None, model_names=None, cv=None,
+                   early_stop=False):
+    run = TrainingRun("regression", REGRESSION_DATASETS, dataset_name, "california", on_event)
+    config, log = run.config, run.log
+
+    # 1. Load dataset
     log(f"📂 Loading {config['name']}...")
-    raw_data = config["loader"]()
+    raw_data = run.load()
 
     # Handle multi-target datasets like Linnerud (just take first target)
     if len(raw_data.target.shape) > 1:
@@ -55,135 +112,166 @@ def run_regression(dataset_name="california"):
     else:
         target_vals = raw_data.target
 
-    df = pd.DataFrame(raw_data.data, columns=raw_data.feature_names)
-    df["target"] = target_vals
+    n_samples = len(raw_data.data)
 
-    log(f"✅ Loaded {len(df):,} samples with {len(raw_data.feature_names)} features")
+    log(f"✅ Loaded {n_samples:,} samples with {len(raw_data.feature_names)} features")
     log(f"📋 Features: {', '.join(raw_data.feature_names)}")
     log(f"🎯 Target: {config['target_name']}")
 
-    # 2. Split data
-    log("✂️  Splitting data into 80% train / 20% test...")
-    X = df[raw_data.feature_names]
-    y = df["target"]
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-    log(f"   Train: {len(X_train):,} samples | Test: {len(X_test):,} samples")
-
-    # 3. Scale features
-    log("⚙️  Scaling features with StandardScaler...")
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    # 4. Train models
-    models = {
-        "Linear Regression": LinearRegression(),
-        "Decision Tree": DecisionTreeRegressor(max_depth=10, random_state=42),
-        "Random Forest": RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1),
-        "Gradient Boosting": GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42),
-    }
-
+    models = select_models(build_models(), model_names, build_variants())
     results = []
     best_model = None
+    best_pred = None
     best_r2 = -float("inf")
     best_name = ""
+    learning_curves = {}
+
+    def fit_on(name, model, X_fit, X_eval, y_fit, y_eval, sst, fold=None):
+        X_fit, X_eval = run.model_inputs(model, X_fit, X_eval, fold=fold)
+        start = time.perf_counter()
+        if early_stop and can_grow(model):
+            growth = grow(model, X_fit, y_fit, lambda y_true, y_pred: regression_scores(y_true, y_pred)["r2"])
+            if fold in (None, 0):
+                learning_curves[name] = growth
+        else:
+            model.fit(X_fit, y_fit)
+        fitted = time.perf_counter()
+        y_pred = model.predict(X_eval)
+        predicted = time.perf_counter()
+        scores = regression_scores(y_eval, y_pred, sst)
+        phases = {"fit": fitted - start, "predict": predicted - fitted, "metrics": time.perf_counter() - predicted}
+        return (scores["r2"], scores["rmse"], scores["mae"], y_pred), phases
+
+    if cv:
+        # 2-4. k-fold cross-validation: folds and per-fold scaled matrices are shared by every model
+        log(f"✂️  Splitting data into {cv} cross-validation folds...")
+        folds = run.kfold(target_vals, cv)
+        log(f"   Train: ~{len(folds[0][0]):,} samples | Test: ~{len(folds[0][1]):,} samples per fold")
+        log("⚙️  Scaling each fold with StandardScaler...")
+        scaled_folds = run.scale_folds(folds)
+        fold_sst = [total_sum_of_squares(target_vals[test_idx]) for _, test_idx in folds]
+        first_fold_models = {}
+
+        def fit_fold(name, model, fold):
+            (train_idx, test_idx), (X_fit, X_eval) = folds[fold], scaled_folds[fold]
+            if fold == 0:
+                first_fold_models[name] = model
+            return fit_on(name, model, X_fit, X_eval, target_vals[train_idx], target_vals[test_idx], fold_sst[fold], fold)
+
+        y_eval = target_vals
+        trained = _cv_results(run.cross_validate(models, cv, fit_fold, parallel=True), folds, len(target_vals))
+    else:
+        # 2. Split data
+        log("✂️  Splitting data into 80% train / 20% test...")
+        train_idx, test_idx = run.split(target_vals)
+        y_train, y_test = target_vals[train_idx], target_vals[test_idx]
+        log(f"   Train: {len(train_idx):,} samples | Test: {len(test_idx):,} samples")
+
+        # 3. Scale features
+        log("⚙️  Scaling features with StandardScaler...")
+        scaler, X_train_scaled, X_test_scaled = run.scale((train_idx, test_idx))
 
-    for name, model in models.items():
-        log(f"🏋️  Training {name}...")
-        start = time.time()
-        model.fit(X_train_scaled, y_train)
-        train_time = time.time() - start
+        # 4. Train models
+        if not early_stop:
+            # Early-stopped ensembles fit less than their size predicts; keep them out of the cost model
+            run.workload = workload(raw_data)
+        sst = total_sum_of_squares(y_test)
 
-        y_pred = model.predict(X_test_scaled)
-        r2 = r2_score(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        mae = mean_absolute_error(y_test, y_pred)
+        def fit_one(name, model):
+            return fit_on(name, model, X_train_scaled, X_test_scaled, y_train, y_test, sst)
 
+        y_eval = y_test
+        trained = ((name, result, train_time, {}) for name, result, train_time in run.train(models, fit_one, parallel))
+
+    for name, (r2, rmse, mae, y_pred), train_time, spread in trained:
         results.append({
             "model": name,
-            "r2": round(r2, 4),
-            "rmse": round(rmse, 4),
-            "mae": round(mae, 4),
+            "r2": round(float(r2), 4),
+            "rmse": round(float(rmse), 4),
+            "mae": round(float(mae), 4),
             "train_time": round(train_time, 3),
+            **spread,
         })
+        run.emit("metric", results[-1])
 
-        log(f"   ✅ {name}: R²={r2:.4f} | RMSE={rmse:.4f} | MAE={mae:.4f} ({train_time:.3f}s)")
+        if spread:
+            log(f"   ✅ {name}: R²={r2:.4f} ± {spread['r2_std']:.4f} | RMSE={rmse:.4f} | MAE={mae:.4f} ({train_time:.3f}s)")
+        else:
+            log(f"   ✅ {name}: R²={r2:.4f} | RMSE={rmse:.4f} | MAE={mae:.4f} ({train_time:.3f}s)")
+        if name in learning_curves:
+            log(growth_log(name, learning_curves[name], "R²"))
 
         if r2 > best_r2:
             best_r2 = r2
-            best_model = model
+            best_pred = y_pred
+            best_model = first_fold_models[name] if cv else models[name]
             best_name = name
 
     log(f"🏆 Best model: {best_name} (R²={best_r2:.4f})")
 
-    # 5. Chart data — predicted vs actual for best model
-    y_pred_best = best_model.predict(X_test_scaled)
-    sample_idx = np.random.RandomState(42).choice(len(y_test), size=min(200, len(y_test)), replace=False)
-    chart_data = [
-        {"actual": round(float(y_test.iloc[i]), 3), "predicted": round(float(y_pred_best[i]), 3)}
-        for i in sample_idx
-    ]
+    if not cv and not early_stop:
+        # Cross-validated and early-stopped fits stay out of the registry; /predict serves the full catalog
+        run.register(catalog_fingerprint("regression", run.dataset_name, build_models()), models, scaler)
+
+    # 5. Chart data — predicted vs actual for best model (kept from its scoring pass; out-of-fold with cv)
+    with run.stage("charts"):
+        # Stratified by target band, keeping the largest residuals
+        sample_idx = stratified_sample(quantile_strata(y_eval), CHART_POINTS, np.abs(y_eval - best_pred))
+        chart_data = [
+            {"actual": round(float(y_eval[i]), 3), "predicted": round(float(best_pred[i]), 3)}
+            for i in sample_idx
+        ]
+        density = density_grid(y_eval, best_pred) if len(sample_idx) < len(y_eval) else None
 
-    # 6. Feature importance from best model
-    feature_importance = _get_feature_importance(best_model, raw_data.feature_names)
+        # 6. Feature importance from best model
+        feature_importance = _get_feature_importance(best_model, raw_data.feature_names)
 
     log("📊 Training complete! Results ready.")
 
     # 7. EDA
-    eda = _compute_eda_regression(df, raw_data.feature_names)
+    eda = run.eda(target_vals)
 
-    return {
+    return run.finish({
         "dataset": {
             "name": config["name"],
             "target_name": config["target_name"],
-            "samples": len(df),
+            "samples": n_samples,
             "features": len(raw_data.feature_names),
             "description": raw_data.get("DESCR", "")[:300],
         },
-        "logs": logs,
+        "logs": run.logs,
         "metrics": results,
         "best_model": best_name,
         "chart_data": chart_data,
+        "chart_sampling": sampling_summary(len(y_eval), sample_idx, density),
         "feature_importance": feature_importance,
         "eda": eda,
-    }
-
-
-def _compute_eda_regression(df, feature_names):
-    """Compute EDA stats for California Housing dataset."""
-    feature_stats = []
-    for col in feature_names:
-        s = df[col]
-        feature_stats.append({
-            "feature": col,
-            "mean": round(float(s.mean()), 4),
-            "std": round(float(s.std()), 4),
-            "min": round(float(s.min()), 4),
-            "max": round(float(s.max()), 4),
-        })
-
-    # Target distribution: bucket into 10 bins
-    target = df["target"]
-    counts, edges = np.histogram(target, bins=10)
-    target_dist = [
-        {"range": f"{edges[i]:.1f}–{edges[i+1]:.1f}", "count": int(counts[i])}
-        for i in range(len(counts))
-    ]
-
-    # Feature-target correlations
-    correlations = [
-        {"feature": col, "correlation": round(float(df[col].corr(target)), 4)}
-        for col in feature_names
-    ]
-    correlations.sort(key=lambda x: abs(x["correlation"]), reverse=True)
-
-    return {
-        "feature_stats": feature_stats,
-        "target_distribution": target_dist,
-        "correlations": correlations,
-    }
+        **({"cross_validation": _cv_summary(folds)} if cv else {}),
+        **({"early_stopping": early_stopping_summary(learning_curves)} if early_stop else {}),
+    })
+
+
+def _cv_results(folded, folds, n_samples):
+    """(name, (mean r2, mean rmse, mean mae, out-of-fold predictions), fit seconds, spread) per model."""
+    for name, fold_results, fold_times in folded:
+        scores = np.array([result[:3] for result in fold_results])
+        y_pred = np.empty(n_samples)
+        for (_, test_idx), result in zip(folds, fold_results):
+            y_pred[test_idx] = result[3]
+        r2, rmse, mae = scores.mean(axis=0)
+        r2_std, rmse_std, mae_std = scores.std(axis=0)
+        spread = {
+            "r2_std": round(float(r2_std), 4),
+            "rmse_std": round(float(rmse_std), 4),
+            "mae_std": round(float(mae_std), 4),
+            "fold_train_times": [round(t, 3) for t in fold_times],
+        }
+        yield name, (r2, rmse, mae, y_pred), sum(fold_times), spread
+
+
+def _cv_summary(folds):
+    """The payload's `cross_validation` block."""
+    return {"folds": len(folds), "stratified": False, "test_sizes": [len(test_idx) for _, test_idx in folds]}
 
 
 def _get_feature_importance(model, feature_names):
@@ -0,0 +1,253 @@
+"""
+Hyperparameter search by successive halving.
+Each task module declares SEARCH_SPACES: a grid per catalog model and the
+resource the search grows — training rows, or n_estimators for ensembles.
+The first round scores every candidate on a small budget; each later round
+keeps the best 1/eta of them at eta times the budget, so only the finalists
+are ever fitted at full size. A round's trials are one batch on the run's CPU
+lease, streamed as they finish, and every scored trial is stored in
+TRIAL_CACHE (a ResultCache of its own, so trials neither skew the payload
+cache's stats nor compete with payloads for space) under its exact
+configuration and budget, so repeating, widening or resuming an interrupted
+search only fits the trials it has not seen.
+"""
+
+import math
+import os
+import time
+
+import numpy as np
+
+from ml import classification, clustering, regression
+from ml.cache import ResultCache, make_key
+from ml.metrics import classification_scores, regression_scores, total_sum_of_squares
+from ml.pipeline import TrainingRun
+
+
+# task -> (task module, datasets, default dataset, metric maximised)
+SEARCH_TASKS = {
+    "regression": (regression, regression.REGRESSION_DATASETS, "california", "r2"),
+    "classification": (classification, classification.CLASSIFICATION_DATASETS, "iris", "accuracy"),
+    "clustering": (clustering, clustering.CLUSTERING_DATASETS, "iris", "silhouette"),
+}
+MAX_CANDIDATES = int(os.environ.get("ML_SEARCH_MAX_CANDIDATES", 27))
+# Budget of a first-round trial, per resource
+MIN_RESOURCE = {"n_samples": 30, "n_estimators": 5}
+LEADERBOARD_SIZE = 10
+
+TRIAL_CACHE = ResultCache(
+    max_bytes=int(os.environ.get("ML_SEARCH_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+    disk_dir=os.environ.get("ML_SEARCH_CACHE_DIR") or None,
+    disk_max_bytes=int(os.environ.get("ML_SEARCH_CACHE_DISK_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+
+def candidates(space, max_candidates=MAX_CANDIDATES, random_state=42):
+    """Every configuration of the grid, or a seeded random subset of `max_candidates` of them."""
+    from sklearn.model_selection import ParameterGrid
+
+    grid = list(ParameterGrid(space))
+    if len(grid) > max_candidates:
+        rng = np.random.RandomState(random_state)
+        grid = [grid[i] for i in sorted(rng.choice(len(grid), max_candidates, replace=False))]
+    return grid
+
+
+def schedule(n_candidates, max_resource, min_resource, eta=3):
+    """
+    Budget of each round: eta times the previous one, ending at `max_resource`.
+    There are enough rounds to narrow the candidates to one, unless the budget
+    range runs out first.
+    """
+    rounds = 1
+    while eta ** rounds <= n_candidates and min_resource * eta ** rounds <= max_resource:
+        rounds += 1
+    return [max(min_resource, int(max_resource / eta ** (rounds - 1 - i))) for i in range(rounds)]
+
+
+def run_search(task, dataset_name=None, model_name=None, eta=3, max_candidates=MAX_CANDIDATES, on_event=None):
+    """
+    Successive-halving search over `model_name`'s SEARCH_SPACES grid. Emits
+    `log`, `trial` (one per scored candidate) and `leaderboard` (after each
+    round) events; returns the payload with the final leaderboard.
+    """
+    from sklearn.base import clone
+
+    module, datasets, default, metric = SEARCH_TASKS[task]
+    if model_name not in module.SEARCH_SPACES:
+        raise ValueError(f"No search space for {model_name!r}; choose from {list(module.SEARCH_SPACES)}")
+    space = module.SEARCH_SPACES[model_name]
+    resource = space["resource"]
+
+    run = TrainingRun(task, datasets, dataset_name, default, on_event)
+    config, log = run.config, run.log
+
+    # 1. Load dataset
+    log(f"📂 Loading {config['name']}...")
+    raw_data = run.load()
+    log(f"✅ Loaded {len(raw_data.data):,} samples with {raw_data.data.shape[1]} features")
+
+    # 2-3. Split and scale once; every trial shares the matrices
+    base = module.build_models()[model_name]
+    n_rows, evaluate = _evaluator(run, task, raw_data, base)
+
+    configs = candidates(space["params"], max_candidates)
+    max_resource = base.get_params()["n_estimators"] if resource == "n_estimators" else n_rows
+    budgets = schedule(len(configs), max_resource, min(MIN_RESOURCE[resource], max_resource), eta)
+    log(f"🔎 Searching {len(configs)} {model_name} configurations by successive halving "
+        f"(η={eta}, {len(budgets)} rounds, {resource} {budgets[0]:,} → {budgets[-1]:,})")
+
+    # 4. Rounds
+    alive = list(range(len(configs)))
+    latest = {}  # candidate -> its trial at the largest budget it reached
+    rounds = []
+    for round_no, budget in enumerate(budgets):
+        log(f"🏁 Round {round_no + 1}/{len(budgets)}: {len(alive)} candidates at {resource}={budget:,}")
+        rows = budget if resource == "n_samples" else n_rows
+        pending = {}
+
+        def record(candidate, trial, cached):
+            latest[candidate] = {
+                "candidate": candidate, "round": round_no, "params": configs[candidate],
+                "resource": budget, **trial, "cached": cached,
+            }
+            run.emit("trial", latest[candidate])
+            shown = "failed" if trial["score"] is None else f"{metric}={trial['score']:.4f}"
+            log(f"   {'♻️ ' if cached else '✅'} {_describe(configs[candidate])}: {shown} ({trial['fit_time']:.3f}s)")
+
+        for candidate in alive:
+            model = clone(base).set_params(**configs[candidate])
+            if resource == "n_estimators":
+                model.set_params(n_estimators=budget)
+            key = make_key(task, run.dataset_name, {model_name: model}, {"search": {"metric": metric, "rows": rows}})
+            trial = TRIAL_CACHE.get(key)
+            if trial is not None:
+                record(candidate, trial, cached=True)
+            else:
+                pending[candidate] = (model, key)
+
+        def fit_one(candidate, model):
+            return evaluate(model, rows)
+
+        batch = {candidate: model for candidate, (model, _) in pending.items()}
+        if batch:
+            for candidate, (score, fit_time) in run.fit_batch(batch, fit_one, parallel=True, ordered=False):
+                trial = {"score": score, "fit_time": round(fit_time, 4)}
+                TRIAL_CACHE.put(pending[candidate][1], trial, task, run.dataset_name)
+                record(candidate, trial, cached=False)
+
+        ranked = sorted(alive, key=lambda c: _rank(latest[c]), reverse=True)
+        rounds.append({
+            "round": round_no,
+            "resource": budget,
+            "candidates": len(alive),
+            "fitted": len(pending),
+            "cached": len(alive) - len(pending),
+            "best_score": latest[ranked[0]]["score"],
+        })
+        if round_no < len(budgets) - 1:
+            alive = ranked[:math.ceil(len(alive) / eta)]
+        run.emit("leaderboard", _leaderboard(latest))
+
+    board = _leaderboard(latest)
+    best = board[0]
+    if best["score"] is None:
+        log(f"⚠️  No {model_name} configuration could be scored")
+    else:
+        log(f"🏆 Best {model_name}: {_describe(best['params'])} ({metric}={best['score']:.4f})")
+
+    return run.finish({
+        "dataset": {
+            "name": config["name"],
+            "samples": len(raw_data.data),
+            "features": raw_data.data.shape[1],
+        },
+        "model": model_name,
+        "metric": metric,
+        "logs": run.logs,
+        "metrics": board,
+        "best": {"params": best["params"], "score": best["score"], "resource": best["resource"]},
+        "search": {
+            "space": space["params"],
+            "resource": resource,
+            "eta": eta,
+            "candidates": len(configs),
+            "rounds": rounds,
+            "trials": sum(r["candidates"] for r in rounds),
+            "cached_trials": sum(r["cached"] for r in rounds),
+        },
+    })
+
+
+def _evaluator(run, task, raw_data, base):
+    """(rows available to a trial, evaluate(model, rows) -> (score or None, fit seconds))."""
+    log = run.log
+    if task == "clustering":
+        log("⚙️  Scaling features with StandardScaler...")
+        _, X = run.scale_all()
+        # Row budgets take a seeded sample, not the (often class-ordered) first rows
+        order = np.random.RandomState(42).permutation(len(X))
+
+        def evaluate(model, rows):
+            X_fit = X[np.sort(order[:rows])] if rows < len(X) else X
+            start = time.perf_counter()
+            try:
+                labels = model.fit_predict(X_fit)
+            except ValueError:
+                return None, time.perf_counter() - start
+            fit_time = time.perf_counter() - start
+            if not 1 < len(np.unique(labels)) < len(X_fit):
+                return None, fit_time
+            score, _, _ = clustering.sampled_silhouette(X_fit, labels, clustering.SILHOUETTE_SAMPLE_SIZE)
+            return float(score), fit_time
+
+        return len(X), evaluate
+
+    y = raw_data.target[:, 0] if raw_data.target.ndim > 1 else raw_data.target
+    log("✂️  Splitting data into 80% train / 20% test...")
+    train_idx, test_idx = run.split(y, stratify=task == "classification")
+    log("⚙️  Scaling features with StandardScaler...")
+    _, X_train, X_test = run.scale((train_idx, test_idx))
+    # Every candidate is the same estimator class, so they share one set of model inputs
+    X_train, X_test = run.model_inputs(base, X_train, X_test)
+    y_train, y_test = y[train_idx], y[test_idx]
+    if task == "regression":
+        sst = total_sum_of_squares(y_test)
+
+        def score(y_pred):
+            return regression_scores(y_test, y_pred, sst)["r2"]
+    else:
+        n_classes = len(raw_data.target_names)
+
+        def score(y_pred):
+            return classification_scores(y_test, y_pred, n_classes)["accuracy"]
+
+    def evaluate(model, rows):
+        # The split is shuffled, so the first `rows` training rows are a random sample
+        start = time.perf_counter()
+        try:
+            model.fit(X_train[:rows], y_train[:rows])
+        except ValueError:
+            return None, time.perf_counter() - start
+        fit_time = time.perf_counter() - start
+        return float(score(model.predict(X_test))), fit_time
+
+    return len(X_train), evaluate
+
+
+def _rank(trial):
+    """Sort key: trials that reached a larger budget first, then by score (failures last)."""
+    return trial["resource"], -math.inf if trial["score"] is None else trial["score"]
+
+
+def _leaderboard(latest):
+    ranked = sorted(latest.values(), key=_rank, reverse=True)[:LEADERBOARD_SIZE]
+    return [
+        {"rank": i + 1, "params": t["params"], "score": None if t["score"] is None else round(t["score"], 4),
+         "resource": t["resource"], "round": t["round"]}
+        for i, t in enumerate(ranked)
+    ]
+
+
+def _describe(params):
+    return ", ".join(f"{k}={v}" for k, v in params.items())
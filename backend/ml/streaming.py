@@ -0,0 +1,71 @@
+"""
+Server-Sent Events for live training progress.
+A run_* function executes on a worker thread with an `on_event` callback that
+forwards its log lines and per-model metric rows to an asyncio queue; the
+response body drains that queue as `text/event-stream` frames and finishes with
+the full payload, so clients see the first bytes within milliseconds.
+"""
+
+import asyncio
+
+from ml.encoding import dumps
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+
+async def stream_run(run, on_result=None, encode_result=None):
+    """
+    Call `run(on_event)` on a worker thread and yield SSE frames as it emits:
+    `log` and `metric` events while training (or whatever else the run emits,
+    e.g. a search's `trial`s), then `result` (or `error`).
+    `on_result(payload)` is invoked on the worker thread before the result is sent.
+    `run` may instead return (payload, shared); a shared payload was computed by
+    another request, so its logs and metrics are replayed before the result.
+    `encode_result(payload)` (e.g. to_columnar) reshapes the payload for the wire.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed (server shutting down) — nobody is listening.
+            pass
+
+    def worker():
+        try:
+            payload = run(lambda event, data: put((event, data)))
+            if isinstance(payload, tuple):
+                payload, shared = payload
+                if shared:
+                    for msg in payload["logs"]:
+                        put(("log", msg))
+                    for row in payload["metrics"]:
+                        put(("metric", row))
+            if on_result is not None:
+                on_result(payload)
+            put(("result", encode_result(payload) if encode_result else payload))
+        except Exception as e:
+            put(("error", {"detail": str(e)}))
+        finally:
+            put(done)
+
+    loop.run_in_executor(None, worker)
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        yield format_sse(*item)
+
+
+async def replay_payload(payload, encode_result=None):
+    """SSE frames for an already-computed payload (e.g. a cache hit)."""
+    for msg in payload["logs"]:
+        yield format_sse("log", msg)
+    for row in payload["metrics"]:
+        yield format_sse("metric", row)
+    yield format_sse("result", encode_result(payload) if encode_result else payload)
@@ -0,0 +1,119 @@
+"""
+Bounded-size visualization data.
+Scatter charts are sent at most POINT_BUDGET points, however large the
+dataset. Above the budget, points are sampled per stratum (cluster, or target
+quantile band for regression) with a floor per stratum so small clusters and
+noise stay visible, after first reserving the most extreme points (farthest
+from their cluster centre, largest residuals) so outliers are never dropped.
+A density grid of every point — cell centres with counts and the dominant
+label — goes alongside, ready for a Recharts bubble scatter.
+"""
+
+import os
+
+import numpy as np
+
+
+POINT_BUDGET = int(os.environ.get("ML_VIZ_POINT_BUDGET", 2000))
+OUTLIER_FRACTION = 0.05
+MIN_PER_STRATUM = 20
+DENSITY_BINS = 40
+
+
+def stratified_sample(strata, budget=POINT_BUDGET, outlier_scores=None, random_state=42):
+    """
+    Sorted row indices of at most `budget` rows: every row when that fits, else
+    the top OUTLIER_FRACTION by `outlier_scores` plus a per-stratum sample
+    proportional to stratum size, with at least MIN_PER_STRATUM rows (or the
+    whole stratum) each.
+    """
+    n = len(strata)
+    if n <= budget:
+        return np.arange(n)
+
+    rng = np.random.RandomState(random_state)
+    chosen = np.zeros(n, dtype=bool)
+    if outlier_scores is not None:
+        k = int(budget * OUTLIER_FRACTION)
+        if k:
+            chosen[np.argpartition(outlier_scores, n - k)[n - k:]] = True
+
+    _, codes, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    order = np.argsort(codes, kind="stable")
+    groups = np.split(order, np.cumsum(counts)[:-1])
+    available = np.array([len(g) - chosen[g].sum() for g in groups])
+
+    alloc = _allocate(available, budget - int(chosen.sum()))
+    for group, size in zip(groups, alloc):
+        if size:
+            candidates = group[~chosen[group]]
+            chosen[rng.choice(candidates, size=size, replace=False)] = True
+    return np.flatnonzero(chosen)
+
+
+def _allocate(available, total):
+    """Per-stratum sample sizes summing to at most `total`: proportional, with a floor, capped by `available`."""
+    if total <= 0 or not available.sum():
+        return np.zeros(len(available), dtype=int)
+    share = np.floor(available * total / available.sum()).astype(int)
+    alloc = np.minimum(np.maximum(share, MIN_PER_STRATUM), available)
+    # The floors may overshoot the budget: take the excess back from the largest strata
+    while alloc.sum() > total:
+        alloc[np.argmax(alloc)] -= 1
+    return alloc
+
+
+def centroid_distances(points, labels):
+    """Distance of each point from the mean of its label's points."""
+    _, codes = np.unique(labels, return_inverse=True)
+    k = codes.max() + 1
+    counts = np.bincount(codes, minlength=k)[:, None]
+    centres = np.stack([np.bincount(codes, weights=points[:, j], minlength=k) for j in range(points.shape[1])], axis=1)
+    centres /= np.maximum(counts, 1)
+    return np.linalg.norm(points - centres[codes], axis=1)
+
+
+def quantile_strata(values, bands=10):
+    """Quantile band (0..bands-1) of each value, for stratifying a continuous target."""
+    edges = np.quantile(values, np.linspace(0, 1, bands + 1)[1:-1])
+    return np.searchsorted(edges, values, side="right")
+
+
+def density_grid(x, y, labels=None, bins=DENSITY_BINS):
+    """
+    Non-empty cells of a bins x bins grid over (x, y): [{"x", "y", "count", "label"}]
+    with the cell centre, the number of points and (with `labels`) the most common label.
+    """
+    x_edges = np.linspace(x.min(), x.max(), bins + 1)
+    y_edges = np.linspace(y.min(), y.max(), bins + 1)
+    xi = np.clip(np.searchsorted(x_edges, x, side="right") - 1, 0, bins - 1)
+    yi = np.clip(np.searchsorted(y_edges, y, side="right") - 1, 0, bins - 1)
+    cell = xi * bins + yi
+    counts = np.bincount(cell, minlength=bins * bins)
+
+    dominant = None
+    if labels is not None:
+        uniq, codes = np.unique(labels, return_inverse=True)
+        per_label = np.bincount(cell * len(uniq) + codes, minlength=bins * bins * len(uniq))
+        dominant = uniq[per_label.reshape(bins * bins, len(uniq)).argmax(axis=1)]
+
+    x_mid = (x_edges[:-1] + x_edges[1:]) / 2
+    y_mid = (y_edges[:-1] + y_edges[1:]) / 2
+    cells = []
+    for c in np.flatnonzero(counts):
+        entry = {"x": round(float(x_mid[c // bins]), 3), "y": round(float(y_mid[c % bins]), 3), "count": int(counts[c])}
+        if dominant is not None:
+            entry["label"] = dominant[c].item()
+        cells.append(entry)
+    return cells
+
+
+def sampling_summary(total, idx, density=None):
+    """The payload's `chart_sampling` block."""
+    sampled = len(idx) < total
+    return {
+        "total_points": int(total),
+        "shown_points": int(len(idx)),
+        "method": "stratified" if sampled else "all",
+        "density": density if sampled else None,
+    }
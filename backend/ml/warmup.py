@@ -0,0 +1,88 @@
+"""
+Optional warm-up of an API worker (ML_WARMUP).
+The process imports scikit-learn, pandas and the estimator modules lazily, so it
+boots and binds its port quickly, and the first request then pays for them.
+A warm-up run during startup — before uvicorn accepts connections, so before
+/health answers — pays that up front instead:
+
+- `light` (or `1`): open every registered dataset from the store (or the
+  offline bundle), then fit each catalog model once on a few random rows, which
+  imports its modules and starts its BLAS/OpenMP thread pools.
+- `full`: also compute each task's default training run into the result cache.
+"""
+
+import importlib
+import logging
+import os
+import time
+
+import numpy as np
+
+from ml import classification, clustering, regression
+from ml.datastore import preload_registries
+
+
+logger = logging.getLogger(__name__)
+
+_LEVEL = os.environ.get("ML_WARMUP", "").lower()
+WARMUP = "full" if _LEVEL == "full" else "light" if _LEVEL in ("1", "true", "yes", "light") else "off"
+# Rows of the random data each catalog model is fitted on
+WARMUP_ROWS = 60
+
+
+def warm_up(level=WARMUP, runs=()):
+    """
+    Run the warm-up steps for `level`; `runs` holds (name, callable) pairs run
+    at the `full` level. Returns the seconds spent in each step; a failing step
+    is logged and does not stop startup.
+    """
+    steps = {
+        "datasets": lambda: preload_registries(
+            regression.REGRESSION_DATASETS, classification.CLASSIFICATION_DATASETS, clustering.CLUSTERING_DATASETS
+        ),
+        "estimators": _fit_catalogs,
+    }
+    if level == "full":
+        steps.update(runs)
+
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+        timings[name] = round(time.perf_counter() - start, 3)
+    logger.info("Warm-up (%s) finished in %.2fs: %s", level, sum(timings.values()),
+                ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    return timings
+
+
+def _fit_catalogs(n_rows=WARMUP_ROWS):
+    """Fit every catalog and variant model, plus the shared pipeline steps, once on random data."""
+    # Imported for its side effect only: the first upload would otherwise pay for it (ingest parses with pandas)
+    importlib.import_module("pandas")
+    from sklearn.decomposition import PCA
+    from sklearn.metrics import silhouette_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.RandomState(42)
+    X = StandardScaler().fit_transform(rng.normal(size=(n_rows, 4)))
+    labels = np.arange(n_rows) % 3
+    train_test_split(X, labels, test_size=0.2, random_state=42, stratify=labels)
+    PCA(n_components=2).fit(X)
+    silhouette_score(X, labels)
+
+    catalogs = (
+        (regression.build_models, X[:, 0]),
+        (regression.build_variants, X[:, 0]),
+        (classification.build_models, labels),
+        (classification.build_variants, labels),
+        (clustering.build_models, None),
+        (lambda: clustering.build_models(large=True), None),
+        (clustering.build_variants, None),
+    )
+    for build, y in catalogs:
+        for model in build().values():
+            model.fit(X) if y is None else model.fit(X, y)
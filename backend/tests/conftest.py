@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# The stores are configured from the environment at import time, so point them
+# at a scratch directory before any test imports `ml` or `main`
+_SCRATCH = tempfile.mkdtemp(prefix="mltrainer-tests-")
+os.environ.setdefault("ML_DATA_DIR", os.path.join(_SCRATCH, "data"))
+os.environ.setdefault("ML_MODEL_DIR", os.path.join(_SCRATCH, "models"))
+os.environ.setdefault("ML_DATASET_BUNDLE", os.path.join(_SCRATCH, "datasets.tar.gz"))
+os.environ.setdefault("ML_JOB_WORKERS", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
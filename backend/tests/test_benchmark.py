@@ -0,0 +1,46 @@
+import json
+
+import benchmark
+
+
+def _case(total, fit, status="ok"):
+    return {"status": status, "wall": total, "peak_rss_mb": 100.0,
+            "timings": {"total": total, "stages": {"train": fit}, "models": {"Ridge": {"fit": fit}}}}
+
+
+def _suite(**cases):
+    return {"meta": {}, "cases": cases}
+
+
+def test_compare_flags_slowdowns_beyond_the_threshold_and_failures():
+    baseline = _suite(a=_case(1.0, 0.5), b=_case(1.0, 0.5), c=_case(1.0, 0.5), d=_case(0.01, 0.01))
+    current = _suite(a=_case(1.1, 0.55), b=_case(1.5, 0.9), c=_case(0, 0, status="timeout"), d=_case(0.05, 0.05))
+    regressions = benchmark.compare(baseline, current, threshold=0.2)
+
+    assert {(r["case"], r["metric"]) for r in regressions} == {
+        ("b", "total"), ("b", "stage:train"), ("b", "Ridge:fit"), ("c", "timeout"),
+    }
+    assert next(r for r in regressions if r["metric"] == "total")["change"] == 0.5
+
+
+def test_best_of_keeps_the_fastest_repeat():
+    best = benchmark._best_of([_case(1.0, 0.6), _case(1.2, 0.4)])
+    assert best["timings"]["total"] == 1.0
+    assert best["timings"]["models"]["Ridge"]["fit"] == 0.4
+
+
+def test_compare_command_exits_non_zero_on_a_slowdown(tmp_path):
+    paths = {}
+    for name, total in (("baseline", 1.0), ("current", 2.0)):
+        paths[name] = tmp_path / f"{name}.json"
+        paths[name].write_text(json.dumps(_suite(a=_case(total, 0.5))))
+    assert benchmark.main(["compare", str(paths["baseline"]), str(paths["current"])]) == 1
+    assert benchmark.main(["compare", str(paths["baseline"]), str(paths["baseline"])]) == 0
+
+
+def test_synthetic_case_runs_in_its_own_process():
+    result = benchmark.run_case("regression", None, rows=2000)
+    assert result["status"] == "ok", result.get("error")
+    assert result["rows"] == 2000
+    assert result["peak_rss_mb"] > 0
+    assert "train" in result["timings"]["stages"] and result["timings"]["models"]
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ml import bundle, warmup
+from ml.bundle import build_bundle, builtin_datasets, read_manifest
+from ml.datastore import DatasetStore, sklearn_loader
+from ml.instrument import StartupClock
+
+
+def _offline():
+    raise OSError("no network")
+
+
+@pytest.fixture
+def datasets(monkeypatch):
+    entries = {"load_iris": sklearn_loader("load_iris"), "load_wine": sklearn_loader("load_wine")}
+    monkeypatch.setattr(bundle, "builtin_datasets", lambda: entries)
+    return entries
+
+
+def test_builtin_datasets_leave_out_uploads():
+    entries = builtin_datasets()
+    assert {"load_iris", "load_diabetes", "fetch_california_housing"} <= set(entries)
+    assert not any(key.startswith("upload") for key in entries)
+
+
+def test_bundle_restores_every_dataset_offline(tmp_path, datasets):
+    path = str(tmp_path / "datasets.tar.gz")
+    manifest = build_bundle(path, store=DatasetStore(str(tmp_path / "build")))
+    assert manifest["datasets"] == {"load_iris": {"rows": 150, "features": 4}, "load_wine": {"rows": 178, "features": 13}}
+    assert read_manifest(path) == manifest
+
+    # A fresh container with an empty store and no network
+    store = DatasetStore(str(tmp_path / "store"), bundle=path)
+    assert store.load("load_iris", _offline).data.shape == (150, 4)
+    assert store.load("load_wine", _offline).target.shape == (178,)
+
+
+def test_missing_datasets_fail_the_build_unless_allowed(tmp_path, datasets, capsys):
+    datasets["fetch_california_housing"] = _offline
+    path = tmp_path / "datasets.tar.gz"
+    with pytest.raises(RuntimeError, match="fetch_california_housing"):
+        build_bundle(str(path), store=DatasetStore(str(tmp_path / "build")))
+    assert list(tmp_path.glob("datasets.tar.gz*")) == []
+
+    manifest = build_bundle(str(path), store=DatasetStore(str(tmp_path / "build")), allow_missing=True)
+    assert set(manifest["datasets"]) == {"load_iris", "load_wine"}
+    assert manifest["missing"] == {"fetch_california_housing": "no network"}
+
+    assert bundle.main(["--output", str(path), "--list"]) == 0
+    assert json.loads(capsys.readouterr().out) == manifest
+
+
+def test_warm_up_times_each_step_and_survives_failures(monkeypatch):
+    monkeypatch.setattr(warmup, "preload_registries", lambda *registries: _offline())
+    timings = warmup.warm_up("full", runs=[("regression", lambda: None)])
+    assert list(timings) == ["datasets", "estimators", "regression"]
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert list(warmup.warm_up("light", runs=[("regression", lambda: None)])) == ["datasets", "estimators"]
+
+
+def test_startup_endpoint_reports_milestones_and_first_requests(monkeypatch):
+    clock = StartupClock()
+    monkeypatch.setattr(main, "STARTUP", clock)
+    clock.mark("imported")
+    clock.mark("ready")
+    clock.request_done("/api/regression/train", 0.5)
+    clock.request_done("/api/regression/train", 0.1)
+
+    stats = TestClient(main.app).get("/api/startup").json()
+    assert stats["warmup_level"] == warmup.WARMUP
+    assert list(stats["milestones"]) == ["imported", "ready"]
+    assert stats["milestones"]["imported"] <= stats["milestones"]["ready"]
+    assert stats["first_requests"]["/api/regression/train"]["seconds"] == 0.5
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+
+import pytest
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LinearRegression
+
+from ml.cache import ResultCache, SingleFlight, make_key
+
+
+def _catalog(**params):
+    return {"Linear Regression": LinearRegression(), "Random Forest": RandomForestClassifier(random_state=42, **params)}
+
+
+def test_make_key_is_stable():
+    key = make_key("regression", "diabetes", _catalog())
+    assert key == make_key("regression", "diabetes", _catalog())
+    assert key == make_key("regression", "diabetes", dict(reversed(list(_catalog().items()))))
+    assert len(key) == 64 and int(key, 16) >= 0
+
+
+def test_make_key_covers_everything_that_shapes_the_payload():
+    key = make_key("regression", "diabetes", _catalog())
+    assert key != make_key("classification", "diabetes", _catalog())
+    assert key != make_key("regression", "california", _catalog())
+    assert key != make_key("regression", "diabetes", _catalog(n_estimators=10))
+    assert key != make_key("regression", "diabetes", {"Linear Regression": LinearRegression()})
+    assert key != make_key("regression", "diabetes", _catalog(), {"cv": 5})
+    assert make_key("regression", "diabetes", _catalog(), {"cv": 5}) == make_key(
+        "regression", "diabetes", _catalog(), {"cv": 5})
+
+
+def test_make_key_includes_the_payload_version(monkeypatch):
+    from ml import cache
+
+    key = make_key("regression", "diabetes", _catalog())
+    monkeypatch.setattr(cache, "PAYLOAD_VERSION", cache.PAYLOAD_VERSION + 1)
+    assert make_key("regression", "diabetes", _catalog()) != key
+
+
+def test_disk_tier_survives_a_restart_and_invalidates_by_task(tmp_path):
+    key = make_key("regression", "diabetes", _catalog())
+    other = make_key("classification", "iris", _catalog())
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put(key, {"best_model": "Linear Regression"}, "regression", "diabetes")
+    cache.put(other, {"best_model": "Random Forest"}, "classification", "iris")
+    assert os.path.exists(tmp_path / f"{key}.json")
+
+    restarted = ResultCache(disk_dir=str(tmp_path))
+    assert restarted.get(key) == {"best_model": "Linear Regression"}
+    assert restarted.stats()["disk_hits"] == 1
+
+    assert restarted.invalidate(task="regression") == 2  # the memory entry and its file
+    assert ResultCache(disk_dir=str(tmp_path)).get(key) is None
+    assert ResultCache(disk_dir=str(tmp_path)).get(other) == {"best_model": "Random Forest"}
+
+
+def test_train_endpoint_serves_a_repeat_request_from_the_cache():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    first = client.get("/api/regression/train", params={"dataset": "diabetes"})
+    assert first.status_code == 200, first.text
+    hits = main.RESULT_CACHE.stats()["memory_hits"]
+    second = client.get("/api/regression/train", params={"dataset": "diabetes"})
+    assert main.RESULT_CACHE.stats()["memory_hits"] == hits + 1
+    assert second.json() == first.json()
+
+
+def test_single_flight_runs_concurrent_identical_calls_once():
+    flight, calls, results = SingleFlight(), [], []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"best_model": "Ridge"}
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", compute))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result is results[0][0] for result, _ in results)
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 3}
+
+    # Once finished, the key is computed afresh
+    assert flight.do("key", compute) == ({"best_model": "Ridge"}, False)
+    assert len(calls) == 2
+
+
+def test_single_flight_shares_the_leaders_exception():
+    flight, started, errors = SingleFlight(), threading.Event(), []
+
+    def fail():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("Unknown dataset")
+
+    def follow():
+        started.wait()
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    follower.join()
+    assert len(errors) == 1 and flight.stats()["coalesced"] == 1
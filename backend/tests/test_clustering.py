@@ -0,0 +1,42 @@
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score, silhouette_score
+
+from ml import clustering
+from ml.clustering import chunked_ch_db, run_clustering, sampled_silhouette
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    return make_blobs(n_samples=3000, centers=4, n_features=3, random_state=0)
+
+
+def test_chunked_ch_db_matches_sklearn(blobs):
+    X, labels = blobs
+    ch, db = chunked_ch_db(X, labels, chunk_rows=256)
+    assert ch == pytest.approx(calinski_harabasz_score(X, labels))
+    assert db == pytest.approx(davies_bouldin_score(X, labels))
+
+
+def test_sampled_silhouette_covers_the_exact_value(blobs):
+    X, labels = blobs
+    mean, (low, high), n_sampled = sampled_silhouette(X, labels, 600)
+    assert n_sampled == pytest.approx(600, abs=4)
+    assert low < silhouette_score(X, labels) < high
+    assert high - low < 0.05
+
+    # Small data is scored exactly
+    mean, ci, n_sampled = sampled_silhouette(X[:200], labels[:200], 600)
+    assert mean == pytest.approx(silhouette_score(X[:200], labels[:200]))
+    assert ci == (mean, mean) and n_sampled == 200
+
+
+def test_large_mode_trains_the_mini_batch_catalog(monkeypatch):
+    monkeypatch.setattr(clustering, "SILHOUETTE_SAMPLE_SIZE", 100)
+    payload = run_clustering("blobs", mode="large")
+    assert [m["model"] for m in payload["metrics"]] == list(clustering.build_models(large=True))
+    assert payload["scaling"]["mode"] == "large"
+    assert payload["scaling"]["silhouette_sample_size"] == 100
+    assert all(m["silhouette_ci95"] is not None for m in payload["metrics"])
+
+    assert run_clustering("blobs", mode="auto")["scaling"]["mode"] == "standard"
@@ -0,0 +1,81 @@
+import os
+from unittest import mock
+
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+
+import main
+from ml.costmodel import BASE_SECONDS, CostModel, plan_catalog
+
+
+WORKLOAD = (10_000, 10, 1, 0)
+
+
+class _FixedCosts:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def estimate(self, task, name, model, workload):
+        return self.seconds[name]
+
+
+def _plan(budget, fits=1):
+    models = {"Linear Regression": LinearRegression(), "Random Forest": RandomForestRegressor(),
+              "Gradient Boosting": RandomForestRegressor()}
+    variants = {"Random Forest (30 trees)": RandomForestRegressor(n_estimators=30),
+                "Hist Gradient Boosting": HistGradientBoostingRegressor()}
+    alternatives = {"Random Forest": ["Random Forest (30 trees)"], "Gradient Boosting": ["Hist Gradient Boosting"]}
+    costs = _FixedCosts({"Linear Regression": 0.1, "Random Forest": 3.0, "Random Forest (30 trees)": 1.0,
+                         "Gradient Boosting": 5.0, "Hist Gradient Boosting": 0.5})
+    return plan_catalog("regression", models, variants, alternatives, WORKLOAD, budget, fits, cost_model=costs)
+
+
+def test_plan_keeps_the_catalog_when_it_fits():
+    names, plan = _plan(10.0)
+    assert names == ["Linear Regression", "Random Forest", "Gradient Boosting"]
+    assert plan["estimated_seconds"] == pytest.approx(8.1) and plan["skipped"] == []
+
+
+def test_plan_swaps_in_variants_then_skips():
+    names, plan = _plan(4.0)
+    # Cheapest-first admission, then upgrades in catalog order: the forest fits at full size, boosting does not
+    assert names == ["Linear Regression", "Random Forest", "Hist Gradient Boosting"]
+    assert {"model": "Hist Gradient Boosting", "estimate": 0.5, "replaces": "Gradient Boosting"} in plan["models"]
+
+    names, plan = _plan(1.0)
+    assert names == ["Linear Regression", "Hist Gradient Boosting"]
+    assert [s["model"] for s in plan["skipped"]] == ["Random Forest"]
+    assert "even as Random Forest (30 trees)" in plan["skipped"][0]["reason"]
+
+    # Five folds cost five times as much
+    assert _plan(4.0, fits=5)[0] == ["Linear Regression", "Hist Gradient Boosting"]
+
+
+def test_observations_calibrate_the_rate_and_persist_once_per_run(tmp_path):
+    path = str(tmp_path / "cost.json")
+    model = CostModel(path)
+    ridge = Ridge()
+    timings = {"workload": list(WORKLOAD), "models": {"Ridge": {"fit": 0.8, "predict": 0.2}, "Lasso": {"fit": 2.0}}}
+    with mock.patch("ml.costmodel.os.replace", wraps=os.replace) as replace:
+        model.calibrate("regression", timings, {"Ridge": ridge, "Lasso": Ridge()})
+    assert replace.call_count == 1
+    assert model.estimate("regression", "Ridge", ridge, WORKLOAD) == pytest.approx(1.0)
+
+    # Later runs move the rate part of the way, in log space
+    model.observe("regression", "Ridge", ridge, WORKLOAD, 4.0)
+    assert 1.0 < model.estimate("regression", "Ridge", ridge, WORKLOAD) < 4.0
+    assert CostModel(path).stats()["regression/Ridge"]["runs"] == 1
+
+
+def test_budgeted_request_reports_its_plan():
+    client = TestClient(main.app)
+    payload = client.get("/api/regression/train", params={"dataset": "diabetes", "budget": 1000}).json()
+    assert payload["budget"]["skipped"] == []
+    assert [m["model"] for m in payload["budget"]["models"]] == [m["model"] for m in payload["metrics"]]
+
+    # Every fit costs at least BASE_SECONDS, so nothing fits a smaller budget
+    response = client.get("/api/regression/train", params={"dataset": "diabetes", "budget": BASE_SECONDS / 5})
+    assert response.status_code == 400
+    assert response.json()["detail"]["budget"]["models"] == []
@@ -0,0 +1,43 @@
+import pytest
+from sklearn.datasets import load_diabetes
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml import pipeline
+from ml.classification import run_classification
+from ml.pipeline import ArtifactCache
+from ml.regression import run_regression
+
+
+@pytest.fixture(autouse=True)
+def artifacts(monkeypatch):
+    monkeypatch.setattr(pipeline, "ARTIFACTS", ArtifactCache())
+
+
+def test_fold_means_match_scikit_learn_cross_validation():
+    payload = run_regression("diabetes", cv=4, model_names=["Linear Regression"])
+    row = payload["metrics"][0]
+    X, y = load_diabetes(return_X_y=True)
+    scores = cross_val_score(make_pipeline(StandardScaler(), LinearRegression()), X, y, scoring="r2",
+                             cv=KFold(4, shuffle=True, random_state=42))
+    assert row["r2"] == pytest.approx(scores.mean(), abs=1e-4)
+    assert row["r2_std"] == pytest.approx(scores.std(), abs=1e-4)
+    assert len(row["fold_train_times"]) == 4
+    assert payload["cross_validation"] == {"folds": 4, "stratified": False, "test_sizes": [111, 111, 110, 110]}
+    # The chart holds out-of-fold predictions of every row
+    assert payload["chart_sampling"]["total_points"] == len(y)
+    assert r2_score([p["actual"] for p in payload["chart_data"]], [p["predicted"] for p in payload["chart_data"]]) > 0.3
+
+
+def test_classification_folds_are_stratified_and_shared_between_runs():
+    payload = run_classification("iris", cv=5, model_names=["Logistic Regression"])
+    assert payload["cross_validation"]["stratified"] is True
+    assert payload["cross_validation"]["test_sizes"] == [30] * 5
+    assert 0.9 < payload["metrics"][0]["accuracy"] <= 1.0
+
+    again = run_classification("iris", cv=5, model_names=["Decision Tree"])
+    assert any("Reusing cached folds" in line for line in again["logs"])
+    assert any("Reusing cached scale" in line for line in again["logs"])
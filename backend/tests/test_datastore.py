@@ -0,0 +1,74 @@
+import os
+import tarfile
+import threading
+
+import numpy as np
+from sklearn.utils import Bunch
+
+from ml.datastore import DATASET_FILES, DatasetStore
+
+
+def _loader(rows, calls=None, gate=None):
+    def load():
+        if calls is not None:
+            calls.append(1)
+        if gate is not None:
+            gate.wait(10)
+        return Bunch(data=np.arange(rows * 2, dtype=float).reshape(rows, 2), target=np.arange(rows),
+                     feature_names=["a", "b"], target_names=[], DESCR="test")
+    return load
+
+
+def test_load_materializes_once_and_memory_maps(tmp_path):
+    calls = []
+    store = DatasetStore(str(tmp_path))
+    bunch = store.load("small", _loader(5, calls))
+    assert isinstance(bunch.data, np.memmap)
+    assert bunch.feature_names == ["a", "b"]
+
+    # A fresh store (another worker, or a restart) opens the files without calling the loader
+    reopened = DatasetStore(str(tmp_path)).load("small", _loader(5, calls))
+    np.testing.assert_array_equal(reopened.data, bunch.data)
+    assert len(calls) == 1
+
+
+def test_a_slow_loader_only_blocks_its_own_key(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    calls, gate = [], threading.Event()
+    waiting = [threading.Thread(target=store.load, args=("slow", _loader(3, calls, gate))) for _ in range(3)]
+    for thread in waiting:
+        thread.start()
+    try:
+        assert store.load("fast", _loader(2)).data.shape == (2, 2)
+    finally:
+        gate.set()
+        for thread in waiting:
+            thread.join()
+    assert len(calls) == 1
+    assert store.load("slow", _loader(3)).data.shape == (3, 2)
+
+
+def test_install_replaces_a_stale_directory_and_keeps_a_materialized_one(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    os.makedirs(store.path("stale"))
+    open(os.path.join(store.path("stale"), "partial.npy"), "w").close()
+    assert store.load("stale", _loader(4)).data.shape == (4, 2)
+    assert sorted(os.listdir(store.path("stale"))) == sorted(DATASET_FILES)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".")]
+
+    store.write("stale", np.zeros((9, 2)), np.zeros(9), ["a", "b"], [], "")
+    assert DatasetStore(str(tmp_path)).load("stale", _loader(9)).data.shape == (4, 2)
+
+
+def test_restore_from_bundle_needs_no_loader(tmp_path):
+    source = DatasetStore(str(tmp_path / "source"))
+    source.load("bundled", _loader(6))
+    bundle = tmp_path / "datasets.tar.gz"
+    with tarfile.open(bundle, "w:gz") as tar:
+        tar.add(source.path("bundled"), arcname="bundled")
+
+    def offline():
+        raise OSError("no network")
+
+    store = DatasetStore(str(tmp_path / "store"), bundle=str(bundle))
+    assert store.load("bundled", offline).data.shape == (6, 2)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.utils import Bunch
+
+from ml import pipeline
+from ml.pipeline import ArtifactCache, TrainingRun
+
+
+def _registry(dtype):
+    def load():
+        rng = np.random.RandomState(0)
+        return Bunch(data=rng.normal(size=(200, 3)).astype(dtype), target=rng.normal(size=200),
+                     feature_names=["a", "b", "c"], target_names=[], DESCR="test")
+
+    load.__name__ = f"test_{dtype}"
+    return {"toy": {"name": "Toy", "loader": load}}
+
+
+@pytest.fixture(autouse=True)
+def artifacts(monkeypatch):
+    monkeypatch.setattr(pipeline, "ARTIFACTS", ArtifactCache())
+
+
+def _scaled(dtype):
+    run = TrainingRun("regression", _registry(dtype), "toy", "toy")
+    raw = run.load()
+    return run, raw, run.scale(run.split(raw.target))
+
+
+def test_float32_data_is_scaled_in_float32_from_the_memory_map():
+    run, raw, (_, X_train, X_test) = _scaled("float32")
+    assert isinstance(raw.data, np.memmap) and raw.data.dtype == np.float32
+    assert run.dtype == np.float32
+    assert X_train.dtype == X_test.dtype == np.float32
+    assert not np.shares_memory(X_train, raw.data)
+
+
+def test_compute_dtype_overrides_the_dataset_dtype(monkeypatch):
+    assert _scaled("float64")[0].dtype == np.float64
+    monkeypatch.setattr(pipeline, "COMPUTE_DTYPE", "float32")
+    assert _scaled("float64")[2][1].dtype == np.float32
+
+
+def test_tree_ensembles_share_one_float32_copy():
+    run, _, (_, X_train, X_test) = _scaled("float64")
+    assert all(a is b for a, b in zip(run.model_inputs(Ridge(), X_train, X_test), (X_train, X_test)))
+
+    forest = run.model_inputs(RandomForestRegressor(), X_train, X_test)
+    assert [a.dtype for a in forest] == [np.float32, np.float32]
+    again = run.model_inputs(RandomForestRegressor(n_estimators=5), X_train, X_test)
+    assert all(a is b for a, b in zip(forest, again))
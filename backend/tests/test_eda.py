@@ -0,0 +1,82 @@
+import numpy as np
+
+from ml.eda import ColumnMoments, ImputedMoments, compute_eda, summarize
+
+
+def _data(seed=0, rows=1000):
+    rng = np.random.RandomState(seed)
+    # Large offsets and mixed scales, where a naive sum-of-squares update loses precision
+    return rng.normal(size=(rows, 4)) * [1.0, 100.0, 0.01, 5.0] + [3.0, 1e4, 0.0, -2.0]
+
+
+def _assert_same(a, b):
+    assert a.n == b.n
+    np.testing.assert_allclose(a.mean, b.mean, rtol=1e-12)
+    np.testing.assert_allclose(a.comoment, b.comoment, rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(a.min, b.min)
+    np.testing.assert_array_equal(a.max, b.max)
+
+
+def test_merge_matches_single_pass():
+    X = _data()
+    single = ColumnMoments(4).update(X)
+
+    merged = ColumnMoments(4)
+    for start, stop in ((0, 1), (1, 300), (300, 301), (301, 1000)):
+        merged.merge(ColumnMoments(4).update(X[start:stop]))
+    _assert_same(merged, single)
+    np.testing.assert_allclose(merged.std(), X.std(axis=0, ddof=1), rtol=1e-12)
+    np.testing.assert_allclose(merged.corr(), np.corrcoef(X, rowvar=False), atol=1e-12)
+
+
+def test_merge_with_empty_accumulators():
+    X = _data()
+    moments = ColumnMoments(4).merge(ColumnMoments(4)).merge(ColumnMoments(4).update(X)).merge(ColumnMoments(4))
+    _assert_same(moments, ColumnMoments(4).update(X))
+
+
+def test_imputed_moments_match_a_pass_over_the_imputed_columns():
+    rng = np.random.RandomState(1)
+    X = _data(seed=1)
+    X[rng.rand(*X.shape) < 0.2] = np.nan
+    X[:, 3] = np.nan  # a column with no observed value is imputed with 0
+
+    streamed = ImputedMoments(4)
+    for start in range(0, len(X), 64):
+        streamed.update(X[start:start + 64])
+
+    means = streamed.means()
+    np.testing.assert_allclose(means[:3], np.nanmean(X[:, :3], axis=0), rtol=1e-12)
+    assert means[3] == 0
+    imputed = np.where(np.isnan(X), means, X)
+    _assert_same(streamed.moments(), ColumnMoments(4).update(imputed))
+
+
+def test_moments_round_trip_through_arrays():
+    moments = ColumnMoments(4).update(_data())
+    _assert_same(ColumnMoments.from_arrays(moments.arrays()), moments)
+
+
+def test_regression_eda_matches_numpy_over_row_blocks():
+    X = _data()
+    y = X[:, 0] * 2 - X[:, 3] + np.random.RandomState(1).normal(size=len(X))
+    eda = compute_eda("regression", X, y, ["a", "b", "c", "d"])
+
+    stats = {row["feature"]: row for row in eda["feature_stats"]}
+    assert stats["b"]["mean"] == round(X[:, 1].mean(), 4)
+    assert stats["b"]["std"] == round(X[:, 1].std(ddof=1), 4)
+    correlations = {row["feature"]: row["correlation"] for row in eda["correlations"]}
+    assert correlations["a"] == round(np.corrcoef(X[:, 0], y)[0, 1], 4)
+    assert [abs(c) for c in correlations.values()] == sorted(map(abs, correlations.values()), reverse=True)
+
+    counts, _ = summarize(X, y, with_target=True, chunk_rows=64)["histogram"]
+    np.testing.assert_array_equal(counts, np.histogram(y, bins=10)[0])
+    assert [row["count"] for row in eda["target_distribution"]] == counts.tolist()
+
+
+def test_classification_eda_counts_classes():
+    X = _data(rows=300)
+    y = np.arange(300) % 3
+    eda = compute_eda("classification", X, y, ["a", "b", "c", "d"], class_names=["x", "y", "z"])
+    assert eda["class_distribution"] == [{"class": c, "count": 100} for c in ("x", "y", "z")]
+    np.testing.assert_allclose(eda["correlation"]["matrix"], np.round(np.corrcoef(X, rowvar=False), 3), atol=1e-3)
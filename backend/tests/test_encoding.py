@@ -0,0 +1,108 @@
+import json
+import struct
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from ml.encoding import BINARY_MAGIC, dumps, encode_binary, to_columnar
+
+
+PAYLOAD = {
+    "best_model": "KMeans (k=3)",
+    "metrics": [{"model": "KMeans (k=3)", "silhouette": 0.46}],
+    "chart_data": [
+        {"x": 0.5, "y": -1.25, "cluster": 0, "true_label": "setosa"},
+        {"x": 1.0, "y": 2.0, "cluster": -1, "true_label": "virginica"},
+        {"x": -3.5, "y": 0.0, "cluster": 2, "true_label": "setosa"},
+    ],
+    "true_chart_data": [
+        {"x": 0.5, "y": -1.25, "cluster": 0, "label": "setosa"},
+        {"x": 1.0, "y": 2.0, "cluster": 2, "label": "virginica"},
+        {"x": -3.5, "y": 0.0, "cluster": 0, "label": "setosa"},
+    ],
+}
+
+
+# Python mirror of the frontend's decodePayload (src/payload.js), plus a binary decoder for API consumers
+def _value(column, i):
+    return column["dictionary"][column["codes"][i]] if isinstance(column, dict) else column[i]
+
+
+def _decode(payload):
+    if payload.get("encoding") not in ("columnar", "binary"):
+        return payload
+    shared = payload.get("shared_columns", {})
+    out = {}
+    for key, value in payload.items():
+        if key in ("encoding", "shared_columns"):
+            continue
+        if isinstance(value, dict) and "columns" in value and "length" in value:
+            columns = {name: shared[name] for name in value["shared"]}
+            columns.update(value["columns"])
+            value = [{name: _value(col, i) for name, col in columns.items()} for i in range(value["length"])]
+        out[key] = value
+    return out
+
+
+def _decode_binary(body):
+    assert body[:4] == BINARY_MAGIC
+    (header_length,) = struct.unpack("<I", body[4:8])
+    header = json.loads(body[8:8 + header_length])
+    base = 8 + header_length
+
+    def resolve(value):
+        if isinstance(value, list):
+            return [resolve(v) for v in value]
+        if isinstance(value, dict):
+            if "$array" in value:
+                dtype = np.dtype(value["dtype"]).newbyteorder("<")
+                return np.frombuffer(body, dtype=dtype, count=value["length"], offset=base + value["offset"]).tolist()
+            return {k: resolve(v) for k, v in value.items()}
+        return value
+
+    return _decode(resolve(header))
+
+
+def test_columnar_round_trip():
+    columnar = json.loads(dumps(to_columnar(PAYLOAD)))
+    assert columnar["encoding"] == "columnar"
+    # x/y are identical in both scatters, so they are stored once
+    assert sorted(columnar["shared_columns"]) == ["x", "y"]
+    assert columnar["chart_data"]["columns"]["true_label"]["dictionary"] == ["setosa", "virginica"]
+    assert _decode(columnar) == PAYLOAD
+
+
+def test_binary_round_trip():
+    body = encode_binary(to_columnar(PAYLOAD))
+    assert len(body[8:]) % 8 == 0
+    assert _decode_binary(body) == PAYLOAD
+
+
+def test_payload_without_chart_tables_is_unchanged():
+    payload = {"best_model": "Linear Regression", "metrics": []}
+    assert to_columnar(payload) == payload
+
+
+def test_train_endpoint_negotiates_the_format_and_compression():
+    client = TestClient(main.app)
+    params = {"dataset": "iris", "models": "KMeans (k=3)"}
+    records = client.get("/api/clustering/train", params=params, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in records.headers
+
+    columnar = client.get("/api/clustering/train", params={**params, "format": "columnar"},
+                          headers={"Accept-Encoding": "gzip"})
+    assert columnar.headers["content-encoding"] == "gzip"
+    assert columnar.headers["content-type"].startswith("application/vnd.mltrainer.columnar+json")
+    assert _decode(columnar.json()) == records.json()
+
+    binary = client.get("/api/clustering/train", params=params,
+                        headers={"Accept": "application/vnd.mltrainer.columnar"})
+    decoded, expected = _decode_binary(binary.content), records.json()
+    # Coordinates travel as float32
+    for table in ("chart_data", "true_chart_data"):
+        for axis in ("x", "y"):
+            np.testing.assert_allclose([p[axis] for p in decoded[table]], [p[axis] for p in expected[table]], rtol=1e-6)
+            for row in decoded[table] + expected[table]:
+                row.pop(axis)
+    assert decoded == expected
@@ -0,0 +1,53 @@
+import numpy as np
+from sklearn.datasets import load_iris
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, r2_score
+
+from ml.classification import run_classification
+from ml.incremental import _holdout, grow, growth_log
+
+
+def test_holdout_of_class_ordered_rows_is_stratified_and_shuffled():
+    # As in cv mode, where a fold's training rows keep the dataset's class order
+    y = np.repeat([0, 1, 2], 40)
+    fit_idx, val_idx = _holdout(RandomForestClassifier(), y, 0.2)
+    assert len(val_idx) == 24 and np.bincount(y[val_idx]).tolist() == [8, 8, 8]
+    assert not np.array_equal(val_idx, np.arange(96, 120))
+    assert np.array_equal(np.sort(np.r_[fit_idx, val_idx]), np.arange(120))
+    np.testing.assert_array_equal(val_idx, _holdout(LogisticRegression(), y, 0.2)[1])
+
+    # A class too small to split falls back to a plain seeded split
+    y = np.r_[np.zeros(50, dtype=int), [1]]
+    assert len(_holdout(RandomForestClassifier(), y, 0.2)[1]) == 11
+
+
+def test_growth_stops_on_a_plateau_and_refits_the_best_size_on_every_row():
+    X, y = load_iris(return_X_y=True)
+    model = RandomForestClassifier(n_estimators=100, random_state=0)
+    growth = grow(model, X, y, accuracy_score)
+
+    assert growth["stopped_early"] and growth["refitted"]
+    assert growth["estimators"] < growth["grown"] < 100
+    assert growth["training_rows"] == 150 and growth["validation_rows"] == 30
+    assert [p["estimators"] for p in growth["curve"]] == list(range(10, growth["grown"] + 1, 10))
+    assert model.n_estimators == len(model.estimators_) == growth["estimators"]
+    assert not model.warm_start and model.n_features_in_ == 4
+    assert "refitted" in growth_log("Random Forest", growth, "accuracy")
+
+
+def test_growth_that_ends_at_its_best_size_keeps_the_fit():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(300, 5))
+    y = X @ rng.normal(size=5) + np.sin(3 * X[:, 0])
+    growth = grow(GradientBoostingRegressor(n_estimators=30, learning_rate=0.1, random_state=0), X, y, r2_score)
+    assert growth["estimators"] == growth["grown"] == 30
+    assert not growth["stopped_early"] and not growth["refitted"]
+    assert growth["refit_seconds"] == 0 and growth["training_rows"] == 240
+
+
+def test_early_stopping_with_cross_validation():
+    payload = run_classification("iris", cv=3, early_stop=True, model_names=["Random Forest"])
+    curves = payload["early_stopping"]["models"]
+    assert set(curves) == {"Random Forest"}
+    assert curves["Random Forest"]["estimators"] <= curves["Random Forest"]["grown"] < 100
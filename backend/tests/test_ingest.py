@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.datastore import DATASET_STORE
+from ml.ingest import IngestError, ingest
+
+
+def _frame(n=40):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame({
+        "a": rng.normal(size=n),
+        "b": np.arange(n, dtype=float),
+        "note": ["text"] * n,
+        "label": np.where(np.arange(n) % 2, "odd", "even"),
+    })
+
+
+def _chunks(frame, size=15):
+    return [frame.iloc[i:i + size] for i in range(0, len(frame), size)]
+
+
+def _open(report):
+    return DATASET_STORE.load(report["dataset_id"], lambda: pytest.fail("upload was not stored"))
+
+
+def test_chunked_upload_is_stored_as_float32_columns():
+    frame = _frame()
+    report = ingest("classification", _chunks(frame), target="label", name="Parity")
+    assert report["rows"] == 40 and report["features"] == 2
+    assert report["skipped_columns"] == ["note"]
+    assert report["peak_chunk_bytes"] > 0
+
+    bunch = _open(report)
+    assert bunch.data.dtype == np.float32
+    np.testing.assert_array_equal(bunch.data, frame[["a", "b"]].to_numpy(np.float32))
+    assert list(bunch.target_names) == ["even", "odd"]
+    np.testing.assert_array_equal(bunch.target, np.arange(40) % 2)
+
+
+def test_missing_values_are_imputed_and_rows_without_a_target_dropped():
+    frame = _frame()[["a", "b"]]
+    frame.loc[3, "a"] = np.nan
+    frame.loc[5, "a"] = np.inf
+    frame.loc[7, "b"] = np.nan  # regression target
+
+    report = ingest("regression", _chunks(frame), target="b")
+    bunch = _open(report)
+    assert report["rows"] == 39
+    assert np.isfinite(bunch.data).all()
+    observed = frame["a"].drop(index=[3, 5, 7]).to_numpy(np.float32)
+    assert bunch.data[3, 0] == bunch.data[5, 0] == pytest.approx(observed.mean(), rel=1e-5)
+
+
+def test_upload_id_covers_the_schema_and_the_name():
+    frame = _frame()
+    first = ingest("classification", _chunks(frame), target="label", name="Parity")
+    assert ingest("classification", _chunks(frame, size=7), target="label", name="Parity")["dataset_id"] == \
+        first["dataset_id"]
+
+    others = {
+        ingest("classification", _chunks(frame), target="label", name="Other")["dataset_id"],
+        ingest("clustering", _chunks(frame), target="label", name="Parity")["dataset_id"],
+        ingest("classification", _chunks(frame.rename(columns={"a": "z"})), target="label", name="Parity")["dataset_id"],
+        ingest("regression", _chunks(frame.drop(columns="label")), target="b", name="Parity")["dataset_id"],
+    }
+    assert len(others) == 4 and first["dataset_id"] not in others
+
+
+def test_upload_needs_a_known_target_and_enough_rows():
+    with pytest.raises(IngestError):
+        ingest("classification", _chunks(_frame()), target="missing")
+    with pytest.raises(IngestError):
+        ingest("regression", _chunks(_frame(5)[["a", "b"]]), target="b")
@@ -0,0 +1,50 @@
+import time
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+import main
+from ml.instrument import MetricsRegistry, StageTimer
+
+
+def test_stage_timer_accumulates_stages_and_models():
+    timer = StageTimer("test-task", trace_memory=True)
+    with timer.stage("load"):
+        time.sleep(0.01)
+    with timer.stage("load"):
+        data = bytearray(4 * 1024 * 1024)
+    tracemalloc.stop()
+    del data
+    timer.model("Ridge", fit=0.25, predict=0.01)
+    timings = timer.finish()
+
+    assert timings["stages"]["load"] >= 0.01
+    assert timings["models"] == {"Ridge": {"fit": 0.25, "predict": 0.01}}
+    assert timings["peak_memory_mb"]["load"] >= 4
+    assert timings["total"] >= timings["stages"]["load"]
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        registry.observe("latency_seconds", value, route='/a"b')
+    text = registry.render([("queue_depth", "gauge", "Queued jobs.", {None: 3})])
+
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{route="/a\\"b"} 5.55' in text
+    assert "# TYPE queue_depth gauge\nqueue_depth 3.0" in text
+
+
+def test_metrics_endpoint_reports_requests_and_training_stages():
+    client = TestClient(main.app)
+    payload = client.get("/api/classification/train", params={"dataset": "iris", "models": "Decision Tree"}).json()
+    assert set(payload["timings"]["stages"]) >= {"load", "train"}
+    assert set(payload["timings"]["models"]["Decision Tree"]) == {"fit", "predict", "metrics"}
+
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/classification/train",status="200"}' in text
+    assert 'ml_stage_duration_seconds_count{task="classification",stage="train"}' in text
+    assert 'ml_model_duration_seconds_count{task="classification",model="Decision Tree",phase="fit"}' in text
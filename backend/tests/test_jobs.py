@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ml.jobs import CANCELLED, FAILED, JOB_QUEUE, QUEUED, SUCCEEDED, JobQueue, QueueFull
+
+
+@pytest.fixture(scope="module")
+def client():
+    # No lifespan: it would preload (and possibly download) every built-in dataset
+    yield TestClient(main.app)
+    JOB_QUEUE.shutdown()
+
+
+@pytest.fixture(scope="module")
+def upload(client):
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(120, 3))
+    lines = ["a,b,c,label"] + [f"{a},{b},{c},{'yes' if a > 0 else 'no'}" for a, b, c in X]
+    response = client.post("/api/classification/upload", params={"target": "label", "name": "Signs"},
+                           content="\n".join(lines).encode())
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _wait(client, job_id):
+    status = client.get(f"/api/jobs/{job_id}", params={"wait": 60}).json()
+    assert status["status"] in (SUCCEEDED, FAILED), status
+    return status
+
+
+def test_job_trains_the_uploaded_dataset(client, upload):
+    job = client.post("/api/jobs", json={"task": "classification", "dataset": upload["dataset_id"], "cv": 3})
+    assert job.status_code == 202, job.text
+    status = _wait(client, job.json()["id"])
+    assert status["status"] == SUCCEEDED, status["error"]
+
+    result = client.get(f"/api/jobs/{status['id']}/result").json()
+    assert result["dataset"]["name"] == "Signs"
+    assert result["dataset"]["samples"] == 120
+    assert result["dataset"]["class_names"] == ["no", "yes"]
+
+    # The job's payload is cached under the upload's key, so the sync endpoint serves the same one
+    sync = client.get("/api/classification/train", params={"dataset": upload["dataset_id"], "cv": 3}).json()
+    assert sync["dataset"]["name"] == "Signs"
+
+
+def test_worker_rejects_an_unknown_dataset(client):
+    job = JOB_QUEUE.submit("classification", "upload-000000000000", options={"cv": 3})
+    status = _wait(client, job.id)
+    assert status["status"] == FAILED
+    assert "Unknown classification dataset" in status["error"]
+
+
+def test_queue_is_bounded_and_cancels_waiting_jobs():
+    # No workers, so submitted jobs stay queued
+    jobs = JobQueue(max_workers=0, max_queued=2)
+    first = jobs.submit("regression", "diabetes")
+    second = jobs.submit("regression", "wine")
+    with pytest.raises(QueueFull):
+        jobs.submit("regression", "iris")
+    assert jobs.position(second) == 2
+
+    assert jobs.cancel(first.id).status == CANCELLED
+    assert jobs.position(second) == 1
+    assert jobs.submit("regression", "iris").status == QUEUED
+    assert jobs.stats()[QUEUED] == 2
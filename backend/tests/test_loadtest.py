@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+import pytest
+
+import loadtest
+import main
+
+
+def test_parse_mix_and_stages():
+    assert loadtest.parse_mix("datasets=4,train") == (["datasets", "train"], [4.0, 1.0])
+    with pytest.raises(ValueError):
+        loadtest.parse_mix("upload=1")
+    assert loadtest.parse_stages("10:30,0:5") == [(10, 30.0), (0, 5.0)]
+
+
+@pytest.mark.parametrize("elapsed, users", [(0, 0), (15, 5), (30, 10), (32.5, 5), (40, None)])
+def test_target_users_ramps_linearly_between_stages(elapsed, users):
+    assert loadtest.target_users([(10, 30.0), (0, 5.0)], elapsed) == users
+
+
+def test_in_process_run_reports_latency_percentiles():
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await loadtest.run_load(client, [(3, 1.0)], mix="health=2,datasets=1",
+                                           datasets="regression:diabetes", in_process=True, log=lambda msg: None)
+
+    report = asyncio.run(run())
+    overall = report["overall"]
+    assert overall["requests"] > 0 and overall["error_rate"] == 0
+    assert overall["p50_ms"] <= overall["p95_ms"] <= overall["p99_ms"] <= overall["max_ms"]
+    assert set(report["by_kind"]) == {"health", "datasets"}
+    assert sum(report["timeline_rps"]) == overall["requests"]
+    assert report["server_cpu"]["cpus"] >= 1
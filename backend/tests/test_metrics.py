@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sklearn import metrics
+
+from ml.metrics import classification_scores, confusion, regression_scores
+
+
+@pytest.mark.parametrize("n_classes", [2, 3, 5])
+def test_classification_scores_match_sklearn(n_classes):
+    rng = np.random.RandomState(n_classes)
+    y_true = rng.randint(0, n_classes, 300)
+    # Mostly right, and one class never predicted, to exercise zero_division
+    y_pred = np.where(rng.rand(300) < 0.7, y_true, rng.randint(0, n_classes - 1, 300))
+
+    scores = classification_scores(y_true, y_pred, n_classes)
+    labels = list(range(n_classes))
+    np.testing.assert_array_equal(scores["confusion_matrix"], metrics.confusion_matrix(y_true, y_pred, labels=labels))
+    assert scores["accuracy"] == pytest.approx(metrics.accuracy_score(y_true, y_pred))
+    precision, recall, f1, support = metrics.precision_recall_fscore_support(
+        y_true, y_pred, labels=labels, zero_division=0,
+    )
+    np.testing.assert_allclose(scores["per_class"]["precision"], precision)
+    np.testing.assert_allclose(scores["per_class"]["recall"], recall)
+    np.testing.assert_allclose(scores["per_class"]["f1"], f1)
+    np.testing.assert_array_equal(scores["per_class"]["support"], support)
+    for name, fn in (("precision", metrics.precision_score), ("recall", metrics.recall_score), ("f1", metrics.f1_score)):
+        assert scores[name] == pytest.approx(fn(y_true, y_pred, labels=labels, average="weighted", zero_division=0))
+
+
+def test_confusion_counts_classes_missing_from_both_sides():
+    cm = confusion([0, 0, 2], [0, 2, 2], 4)
+    assert cm.shape == (4, 4)
+    np.testing.assert_array_equal(cm, metrics.confusion_matrix([0, 0, 2], [0, 2, 2], labels=[0, 1, 2, 3]))
+
+
+def test_regression_scores_match_sklearn():
+    rng = np.random.RandomState(0)
+    y_true = rng.normal(size=200)
+    y_pred = y_true + rng.normal(scale=0.5, size=200)
+
+    scores = regression_scores(y_true, y_pred)
+    assert scores["r2"] == pytest.approx(metrics.r2_score(y_true, y_pred))
+    assert scores["rmse"] == pytest.approx(np.sqrt(metrics.mean_squared_error(y_true, y_pred)))
+    assert scores["mae"] == pytest.approx(metrics.mean_absolute_error(y_true, y_pred))
+
+
+def test_regression_scores_constant_target():
+    assert regression_scores([2.0, 2.0], [2.0, 2.0])["r2"] == metrics.r2_score([2.0, 2.0], [2.0, 2.0])
+    assert regression_scores([2.0, 2.0], [1.0, 3.0])["r2"] == metrics.r2_score([2.0, 2.0], [1.0, 3.0])
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import Ridge
+
+from ml import parallel
+from ml.classification import run_classification
+from ml.parallel import CpuScheduler, fit_models, split_cpu_budget
+
+
+@pytest.mark.parametrize("n_tasks, budget, expected", [(4, 8, (4, 2)), (8, 4, (4, 1)), (3, 1, (1, 1)), (1, 6, (1, 6))])
+def test_split_cpu_budget(n_tasks, budget, expected):
+    assert split_cpu_budget(n_tasks, budget) == expected
+
+
+def test_parallel_fits_are_yielded_in_catalog_order_and_capped():
+    models = {"slow": RandomForestClassifier(n_jobs=-1), "fast": Ridge(), "middle": Ridge()}
+    delays = {"slow": 0.2, "fast": 0.0, "middle": 0.1}
+    threads = set()
+    # Every fit waits for the other two, so each runs on its own thread
+    together = threading.Barrier(3, timeout=5)
+
+    def fit_one(name, model):
+        threads.add(threading.get_ident())
+        together.wait()
+        time.sleep(delays[name])
+        return name
+
+    results = list(fit_models(models, fit_one, parallel=True, cpu_budget=6))
+    assert results == [("slow", "slow"), ("fast", "fast"), ("middle", "middle")]
+    assert len(threads) == 3
+    assert models["slow"].n_jobs == 2
+
+    finished = [name for name, _ in fit_models(models, fit_one, parallel=True, cpu_budget=6, ordered=False)]
+    assert finished == ["fast", "middle", "slow"]
+
+
+def test_parallel_run_matches_the_sequential_one():
+    sequential = run_classification("wine", parallel=False)
+    threaded = run_classification("wine", parallel=True)
+    assert threaded["best_model"] == sequential["best_model"]
+    assert [m["model"] for m in threaded["metrics"]] == [m["model"] for m in sequential["metrics"]]
+    for seq, par in zip(sequential["metrics"], threaded["metrics"]):
+        assert par["accuracy"] == seq["accuracy"]
+
+
+def test_scheduler_shares_cores_and_queues_in_order():
+    scheduler = CpuScheduler(8, max_lease=6)
+    assert scheduler.acquire() == 6
+    assert scheduler.acquire(want=1) == 1
+    assert scheduler.stats()["leased"] == 7
+
+    order, waits = [], []
+
+    def run(name, want):
+        cores = scheduler.acquire(want, on_wait=lambda position, active: waits.append(name))
+        order.append((name, cores))
+
+    # 1 core free: the first in line gets it, the second queues behind it until cores are released
+    first = threading.Thread(target=run, args=("first", 4))
+    first.start()
+    first.join(5)
+    second = threading.Thread(target=run, args=("second", 4))
+    second.start()
+    time.sleep(0.1)
+    assert order == [("first", 1)] and waits == ["second"]
+    scheduler.release(6)
+    second.join(5)
+    assert order == [("first", 1), ("second", 4)]
+    assert scheduler.stats()["queued"] == 1
+
+
+class _BlasLimits:
+    """Stands in for threadpoolctl's controller, recording each BLAS limit."""
+
+    def __init__(self):
+        self.limits = []
+
+    def limit(self, limits, user_api):
+        assert user_api == "blas"
+        self.limits.append(limits)
+
+
+def test_parallel_batch_caps_blas_to_the_per_fit_share(monkeypatch):
+    scheduler = CpuScheduler(8)
+    blas = scheduler._controller = _BlasLimits()
+    monkeypatch.setattr(parallel, "CPU_SCHEDULER", scheduler)
+
+    lease = scheduler.acquire()
+    seen = []
+    models = {f"m{i}": Ridge() for i in range(4)}
+    list(fit_models(models, lambda name, model: seen.append(blas.limits[-1]), parallel=True, cpu_budget=lease))
+    assert seen == [2, 2, 2, 2]
+    # Back to the lease-wide cap once the batch is done
+    assert blas.limits == [8, 2, 8]
+    scheduler.release(lease)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from ml import pipeline
+from ml.clustering import run_clustering
+from ml.pipeline import ArtifactCache, _fit_scaler_in_place, fit_projection, pca_solver, select_models
+from ml.regression import build_models, build_variants, run_regression
+
+
+def test_artifact_cache_evicts_by_bytes_and_freezes_values():
+    cache = ArtifactCache(max_bytes=2000)
+    first, hit = cache.get_or_compute("a", lambda: np.zeros(100))
+    assert not hit and not first.flags.writeable
+    assert cache.get_or_compute("a", lambda: pytest.fail("recomputed"))[1]
+
+    cache.get_or_compute("b", lambda: np.zeros(100))
+    cache.get_or_compute("c", lambda: np.zeros(100))
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    assert not cache.get_or_compute("a", lambda: np.zeros(100))[1]
+
+
+def test_scaler_fitted_in_blocks_matches_standard_scaler():
+    X = np.random.RandomState(0).normal(3, 2, size=(1000, 4))
+    expected = StandardScaler().fit_transform(X)
+    scaler = _fit_scaler_in_place(X, chunk_rows=128)
+    np.testing.assert_allclose(X, expected)
+    # The fitted scaler no longer overwrites its input
+    batch = np.ones((2, 4))
+    scaler.transform(batch)
+    assert (batch == 1).all()
+
+
+def test_select_models_keeps_catalog_order_and_rejects_unknown_names():
+    models, variants = build_models(), build_variants()
+    names = list(models)
+    assert list(select_models(models, [names[2], names[0]])) == [names[0], names[2]]
+    assert select_models(models, None) is models
+    assert list(select_models(models, [next(iter(variants))], variants)) == [next(iter(variants))]
+    with pytest.raises(ValueError):
+        select_models(models, ["Nope"])
+
+
+def test_model_subset_reuses_the_cached_split_and_scaling(monkeypatch):
+    monkeypatch.setattr(pipeline, "ARTIFACTS", ArtifactCache())
+    names = list(build_models())
+    full = run_regression("diabetes", model_names=names[:2])
+    subset = run_regression("diabetes", model_names=names[1:2])
+
+    assert pipeline.ARTIFACTS.stats()["hits"] >= 2
+    assert any("Reusing cached split" in line for line in subset["logs"])
+    assert any("Reusing cached scale" in line for line in subset["logs"])
+    # Same split and scaling, so the shared model scores the same
+    assert subset["metrics"][0] == {**full["metrics"][1], "train_time": subset["metrics"][0]["train_time"]}
+
+
+def test_pca_solver_by_shape(monkeypatch):
+    monkeypatch.setattr(pipeline, "PCA_TALL_ROWS", 1000)
+    assert pca_solver(999, 10) == "exact"
+    assert pca_solver(1000, 10) == "incremental"
+    assert pca_solver(10, 50) == "randomized"
+
+
+@pytest.mark.parametrize("solver, rows", [("randomized", 500), ("incremental", 500), ("incremental", 257)])
+def test_projection_solvers_match_exact_pca(solver, rows):
+    rng = np.random.RandomState(0)
+    # Two dominant directions plus noise, so every solver recovers the same plane
+    X = rng.normal(size=(rows, 2)) * [5, 2] @ rng.normal(size=(2, 6)) + rng.normal(scale=0.1, size=(rows, 6))
+    exact_ratio, exact, _ = fit_projection(X)
+    # 257 rows in 128-row blocks leaves a 1-row tail, which is folded into the previous block
+    ratio, projection, _ = fit_projection(X, solver=solver, chunk_rows=128)
+    np.testing.assert_allclose(ratio, exact_ratio, rtol=1e-2)
+    for j in range(2):
+        assert abs(np.corrcoef(projection[:, j], exact[:, j])[0, 1]) > 0.999
+
+
+def test_clustering_projection_is_cached_per_solver(monkeypatch):
+    monkeypatch.setattr(pipeline, "ARTIFACTS", ArtifactCache())
+    monkeypatch.setattr(pipeline, "PCA_TALL_ROWS", 100)
+    first = run_clustering("blobs", model_names=["KMeans (k=4)"])
+    assert any("Using incremental PCA" in line for line in first["logs"])
+    again = run_clustering("blobs", model_names=["KMeans (k=3)"])
+    assert any("Reusing cached pca" in line for line in again["logs"])
+    assert again["pca_variance"] == first["pca_variance"]
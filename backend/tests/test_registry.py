@@ -0,0 +1,87 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.datasets import load_iris
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+
+import main
+from ml.registry import ModelRegistry, decode_columnar
+
+
+def _fitted():
+    X, y = np.random.RandomState(0).normal(size=(20, 2)), np.arange(20.0)
+    return StandardScaler().fit(X), Ridge().fit(X, y)
+
+
+def test_predict_scores_json_and_binary_batches():
+    client = TestClient(main.app)
+    X = load_iris().data[[0, 60, 120]]
+    params = {"dataset": "iris", "model": "Decision Tree"}
+
+    response = client.post("/api/classification/predict", params=params, json={"rows": X.tolist()})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["model"] == "Decision Tree" and result["n_rows"] == 3
+    assert result["labels"] == ["setosa", "versicolor", "virginica"]
+
+    body = np.ascontiguousarray(X.T).astype("<f8").tobytes()
+    binary = client.post("/api/classification/predict", params=params, content=body,
+                         headers={"Content-Type": "application/octet-stream", "Accept": "application/octet-stream"})
+    assert binary.headers["x-model"] == "Decision Tree"
+    np.testing.assert_array_equal(np.frombuffer(binary.content, dtype="<f8"), result["predictions"])
+
+    wrong = client.post("/api/classification/predict", params=params, json={"rows": [[1.0, 2.0]]})
+    assert wrong.status_code == 400
+
+
+def test_registry_reloads_pipelines_from_disk(tmp_path):
+    registry = ModelRegistry(disk_dir=str(tmp_path))
+    registry.register("regression", "toy", "f", "Ridge", *_fitted())
+    registry.flush()
+
+    restarted = ModelRegistry(disk_dir=str(tmp_path))
+    pipeline = restarted.get("regression", "toy", "f", "Ridge")
+    assert pipeline is not None and restarted.stats()["disk_hits"] == 1
+    assert restarted.get("regression", "toy", "f", "Lasso") is None
+    assert restarted.list() == [{"task": "regression", "dataset": "toy", "fingerprint": "f", "model": "Ridge",
+                                 "in_memory": True, "on_disk": True}]
+
+
+def test_disk_tier_evicts_the_least_recently_used_file(tmp_path):
+    registry = ModelRegistry(disk_dir=str(tmp_path))
+    registry.register("regression", "a", "f", "Ridge", *_fitted())
+    registry.flush()
+    size = os.path.getsize(tmp_path / "regression--a--f--Ridge.joblib")
+    registry.disk_max_bytes = 2 * size + size // 2
+
+    time.sleep(0.01)
+    registry.register("regression", "b", "f", "Ridge", *_fitted())
+    registry.flush()
+    time.sleep(0.01)
+    # Loading "a" marks it as recently used, so "b" is evicted to make room for "c"
+    assert ModelRegistry(disk_dir=str(tmp_path)).get("regression", "a", "f", "Ridge") is not None
+    time.sleep(0.01)
+    registry.register("regression", "c", "f", "Ridge", *_fitted())
+    registry.flush()
+
+    assert sorted(os.listdir(tmp_path)) == ["regression--a--f--Ridge.joblib", "regression--c--f--Ridge.joblib"]
+    assert registry.stats()["disk_evictions"] == 1
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float32"])
+def test_decode_columnar_round_trip(dtype):
+    X = np.random.RandomState(0).normal(size=(7, 3)).astype(dtype)
+    body = np.ascontiguousarray(X.T).astype(np.dtype(dtype).newbyteorder("<")).tobytes()
+    decoded = decode_columnar(body, 3, dtype)
+    assert decoded.shape == (7, 3)
+    np.testing.assert_array_equal(decoded, X)
+
+
+def test_decode_columnar_rejects_a_partial_column():
+    body = np.arange(7, dtype="<f8").tobytes()
+    with pytest.raises(ValueError):
+        decode_columnar(body, 3)
@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ml import search
+from ml.cache import ResultCache
+from ml.search import candidates, run_search, schedule
+
+
+@pytest.fixture(autouse=True)
+def trial_cache(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(search, "TRIAL_CACHE", cache)
+    monkeypatch.setattr(main, "TRIAL_CACHE", cache)
+    return cache
+
+
+@pytest.mark.parametrize("n_candidates, max_resource, min_resource, eta, expected", [
+    (27, 1000, 30, 3, [37, 111, 333, 1000]),
+    (27, 100, 30, 3, [33, 100]),
+    (1, 100, 30, 3, [100]),
+    (16, 160, 10, 2, [10, 20, 40, 80, 160]),
+])
+def test_schedule_grows_the_budget_by_eta(n_candidates, max_resource, min_resource, eta, expected):
+    assert schedule(n_candidates, max_resource, min_resource, eta) == expected
+
+
+def test_candidates_sample_the_grid_reproducibly():
+    space = {"a": [1, 2, 3, 4], "b": ["x", "y", "z"]}
+    assert len(candidates(space)) == 12
+    sampled = candidates(space, max_candidates=5)
+    assert len(sampled) == 5 and sampled == candidates(space, max_candidates=5)
+
+
+def test_halving_narrows_the_candidates_and_caches_every_trial(trial_cache):
+    events = []
+    payload = run_search("classification", "wine", "Decision Tree", eta=3, max_candidates=9,
+                         on_event=lambda event, data: events.append(event))
+    rounds = payload["search"]["rounds"]
+    assert [r["candidates"] for r in rounds] == [9, 3]
+    assert rounds[-1]["resource"] > rounds[0]["resource"]
+    assert events.count("trial") == payload["search"]["trials"]
+    assert events.count("leaderboard") == len(rounds)
+    assert payload["best"]["score"] == max(m["score"] for m in payload["metrics"] if m["score"] is not None)
+
+    repeat = run_search("classification", "wine", "Decision Tree", eta=3, max_candidates=9)
+    assert repeat["search"]["cached_trials"] == repeat["search"]["trials"]
+    assert repeat["best"] == payload["best"]
+    assert trial_cache.stats()["entries"] == payload["search"]["trials"]
+
+
+def test_search_endpoint_keeps_trials_out_of_the_payload_cache():
+    client = TestClient(main.app)
+    before = main.RESULT_CACHE.stats()
+    response = client.get("/api/classification/search",
+                          params={"model": "Logistic Regression", "dataset": "iris", "candidates": 3})
+    assert response.status_code == 200, response.text
+    after = main.RESULT_CACHE.stats()
+    assert (after["entries"], after["misses"]) == (before["entries"], before["misses"])
+    assert client.get("/api/cache/stats").json()["search_trials"]["entries"] == response.json()["search"]["trials"]
+
+    assert client.get("/api/classification/search", params={"model": "Nope"}).status_code == 400
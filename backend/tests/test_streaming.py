@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from ml.streaming import stream_run
+
+
+def _events(text):
+    events = []
+    for frame in text.strip().split("\n\n"):
+        event, data = frame.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def _collect(frames):
+    async def drain():
+        return [frame async for frame in frames]
+    return _events("".join(asyncio.run(drain())))
+
+
+def test_stream_sends_logs_and_metrics_before_the_result():
+    client = TestClient(main.app)
+    params = {"dataset": "iris", "models": "Logistic Regression,Decision Tree"}
+    response = client.get("/api/classification/train/stream", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _events(response.text)
+    kinds = [event for event, _ in events]
+    assert kinds[-1] == "result" and kinds.count("result") == 1
+    assert kinds.index("metric") > kinds.index("log")
+    result = events[-1][1]
+    assert [data for event, data in events if event == "metric"] == result["metrics"]
+    assert [data for event, data in events if event == "log"] == result["logs"]
+
+    # The run went into the result cache, so a repeat replays its logs, then its metrics, then the result
+    replayed = _events(client.get("/api/classification/train/stream", params=params).text)
+    assert replayed == ([("log", msg) for msg in result["logs"]] + [("metric", row) for row in result["metrics"]]
+                        + [("result", result)])
+
+
+def test_stream_reports_a_failed_run_as_an_error_event():
+    def run(on_event):
+        on_event("log", "starting")
+        raise ValueError("Unknown dataset")
+
+    assert _collect(stream_run(run)) == [("log", "starting"), ("error", {"detail": "Unknown dataset"})]
+
+
+def test_a_shared_run_is_replayed_to_followers():
+    payload = {"logs": ["a", "b"], "metrics": [{"model": "m"}], "best_model": "m"}
+    events = _collect(stream_run(lambda on_event: (payload, True)))
+    assert events == [("log", "a"), ("log", "b"), ("metric", {"model": "m"}), ("result", payload)]
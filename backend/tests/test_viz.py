@@ -0,0 +1,47 @@
+import numpy as np
+
+from ml import clustering, viz
+from ml.viz import MIN_PER_STRATUM, density_grid, quantile_strata, sampling_summary, stratified_sample
+
+
+def test_small_data_is_not_sampled():
+    np.testing.assert_array_equal(stratified_sample(np.zeros(50), budget=100), np.arange(50))
+    assert sampling_summary(50, np.arange(50))["method"] == "all"
+
+
+def test_sample_keeps_outliers_and_every_stratum():
+    rng = np.random.RandomState(0)
+    strata = np.r_[np.zeros(9900, dtype=int), np.ones(100, dtype=int)]
+    scores = rng.rand(10_000)
+    idx = stratified_sample(strata, budget=500, outlier_scores=scores)
+
+    assert len(idx) <= 500 and np.all(np.diff(idx) > 0)
+    top = np.argsort(scores)[-int(500 * viz.OUTLIER_FRACTION):]
+    assert set(top) <= set(idx)
+    # The small stratum gets its floor, not its 1% share
+    assert (strata[idx] == 1).sum() >= MIN_PER_STRATUM
+    np.testing.assert_array_equal(idx, stratified_sample(strata, budget=500, outlier_scores=scores))
+
+
+def test_quantile_strata_are_balanced():
+    bands = quantile_strata(np.random.RandomState(0).normal(size=1000), bands=10)
+    assert np.bincount(bands).tolist() == [100] * 10
+
+
+def test_density_grid_counts_every_point():
+    rng = np.random.RandomState(0)
+    x, y = rng.normal(size=5000), rng.normal(size=5000)
+    labels = np.where(x > 0, "right", "left")
+    cells = density_grid(x, y, labels, bins=8)
+    assert sum(c["count"] for c in cells) == 5000
+    assert len(cells) <= 64
+    assert {c["label"] for c in cells if c["x"] > 0.5} == {"right"}
+
+
+def test_clustering_chart_respects_the_point_budget(monkeypatch):
+    monkeypatch.setattr(clustering, "POINT_BUDGET", 60)
+    payload = clustering.run_clustering("blobs", model_names=["KMeans (k=4)"])
+    sampling = payload["chart_sampling"]
+    assert len(payload["chart_data"]) == len(payload["true_chart_data"]) == sampling["shown_points"] <= 60
+    assert sampling["total_points"] == 200 and sampling["method"] == "stratified"
+    assert sum(cell["count"] for cell in sampling["density"]) == 200
@@ -153,27 +153,28 @@ export default function Classification() {
         fetchDatasets()
     }, [])
 
-    const startTraining = async () => {
+    const startTraining = () => {
         setStatus('training')
         setVisibleLogs(['🚀 Initializing training request...'])
         setData(null)
 
-        try {
-            const res = await fetch(`${API_URL}/api/classification/train?dataset=${selectedDataset}`)
-            const result = await res.json()
-            setData(result)
-
-            result.logs.forEach((log, i) => {
-                setTimeout(() => {
-                    setVisibleLogs(prev => [...prev, log])
-                }, i * 300)
-            })
-
-            setTimeout(() => setStatus('done'), result.logs.length * 300 + 200)
-        } catch (err) {
-            setVisibleLogs(prev => [...prev, `❌ Error: ${err.message}`])
+        // Logs and metric rows arrive live as Server-Sent Events, then the full result
+        const source = new EventSource(`${API_URL}/api/classification/train/stream?dataset=${selectedDataset}`)
+        source.addEventListener('log', (e) => {
+            const log = JSON.parse(e.data)
+            setVisibleLogs(prev => [...prev, log])
+        })
+        source.addEventListener('result', (e) => {
+            source.close()
+            setData(JSON.parse(e.data))
+            setStatus('done')
+        })
+        source.addEventListener('error', (e) => {
+            source.close()
+            const detail = e.data ? JSON.parse(e.data).detail : 'Lost connection to the training stream'
+            setVisibleLogs(prev => [...prev, `❌ Error: ${detail}`])
             setStatus('idle')
-        }
+        })
     }
 
     useEffect(() => {
@@ -4,6 +4,7 @@ import {
     ScatterChart, Scatter, XAxis, YAxis, CartesianGrid, Tooltip,
     ResponsiveContainer, Legend,
 } from 'recharts'
+import { decodePayload } from '../payload'
 
 const API_URL = (import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000').replace(/\/$/, '')
 const CLUSTER_COLORS = ['#6c5ce7', '#4facfe', '#f093fb', '#2ed573', '#ffa502', '#f5576c', '#00d2ff']
@@ -116,27 +117,29 @@ export default function Clustering() {
         fetchDatasets()
     }, [])
 
-    const startTraining = async () => {
+    const startTraining = () => {
         setStatus('training')
         setVisibleLogs(['🚀 Initializing training request...'])
         setData(null)
 
-        try {
-            const res = await fetch(`${API_URL}/api/clustering/train?dataset=${selectedDataset}`)
-            const result = await res.json()
-            setData(result)
-
-            result.logs.forEach((log, i) => {
-                setTimeout(() => {
-                    setVisibleLogs(prev => [...prev, log])
-                }, i * 300)
-            })
-
-            setTimeout(() => setStatus('done'), result.logs.length * 300 + 200)
-        } catch (err) {
-            setVisibleLogs(prev => [...prev, `❌ Error: ${err.message}`])
+        // Logs and metric rows arrive live as Server-Sent Events, then the full result
+        const source = new EventSource(`${API_URL}/api/clustering/train/stream?dataset=${selectedDataset}&format=columnar`)
+        source.addEventListener('log', (e) => {
+            const log = JSON.parse(e.data)
+            setVisibleLogs(prev => [...prev, log])
+        })
+        source.addEventListener('result', (e) => {
+            source.close()
+            // Chart tables arrive as columns; expand them back into point objects
+            setData(decodePayload(JSON.parse(e.data)))
+            setStatus('done')
+        })
+        source.addEventListener('error', (e) => {
+            source.close()
+            const detail = e.data ? JSON.parse(e.data).detail : 'Lost connection to the training stream'
+            setVisibleLogs(prev => [...prev, `❌ Error: ${detail}`])
             setStatus('idle')
-        }
+        })
     }
 
     useEffect(() => {
@@ -342,6 +345,11 @@ export default function Clustering() {
                             <div style={{ marginBottom: '12px', display: 'flex', gap: '8px' }}>
                                 <span className="badge badge-pink">PC1: {(data.pca_variance.pc1 * 100).toFixed(1)}% variance</span>
                                 <span className="badge badge-purple">PC2: {(data.pca_variance.pc2 * 100).toFixed(1)}% variance</span>
+                                {data.chart_sampling?.method === 'stratified' && (
+                                    <span className="badge badge-pink">
+                                        Showing {data.chart_sampling.shown_points.toLocaleString()} of {data.chart_sampling.total_points.toLocaleString()} points
+                                    </span>
+                                )}
                             </div>
                         )}
 
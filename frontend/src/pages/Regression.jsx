@@ -4,6 +4,7 @@ import {
     ScatterChart, Scatter, XAxis, YAxis, CartesianGrid, Tooltip,
     ResponsiveContainer, BarChart, Bar, Cell, ReferenceLine,
 } from 'recharts'
+import { decodePayload } from '../payload'
 
 // ── EDA helpers ────────────────────────────────────────────────
 function EDASection({ eda }) {
@@ -115,28 +116,29 @@ export default function Regression() {
         fetchDatasets()
     }, [])
 
-    const startTraining = async () => {
+    const startTraining = () => {
         setStatus('training')
         setVisibleLogs(['🚀 Initializing training request...'])
         setData(null)
 
-        try {
-            const res = await fetch(`${API_URL}/api/regression/train?dataset=${selectedDataset}`)
-            const result = await res.json()
-            setData(result)
-
-            // Animate logs one by one
-            result.logs.forEach((log, i) => {
-                setTimeout(() => {
-                    setVisibleLogs(prev => [...prev, log])
-                }, i * 300)
-            })
-
-            setTimeout(() => setStatus('done'), result.logs.length * 300 + 200)
-        } catch (err) {
-            setVisibleLogs(prev => [...prev, `❌ Error: ${err.message}`])
+        // Logs and metric rows arrive live as Server-Sent Events, then the full result
+        const source = new EventSource(`${API_URL}/api/regression/train/stream?dataset=${selectedDataset}&format=columnar`)
+        source.addEventListener('log', (e) => {
+            const log = JSON.parse(e.data)
+            setVisibleLogs(prev => [...prev, log])
+        })
+        source.addEventListener('result', (e) => {
+            source.close()
+            // Chart tables arrive as columns; expand them back into point objects
+            setData(decodePayload(JSON.parse(e.data)))
+            setStatus('done')
+        })
+        source.addEventListener('error', (e) => {
+            source.close()
+            const detail = e.data ? JSON.parse(e.data).detail : 'Lost connection to the training stream'
+            setVisibleLogs(prev => [...prev, `❌ Error: ${detail}`])
             setStatus('idle')
-        }
+        })
     }
 
     useEffect(() => {
@@ -0,0 +1,33 @@
+// Decoder for the backend's columnar training payload (see backend/ml/encoding.py),
+// which the pages stream over SSE. The binary format is for API consumers only.
+
+function columnValue(column, i) {
+    return column.dictionary ? column.dictionary[column.codes[i]] : column[i]
+}
+
+// Chart table {length, columns, shared} -> array of row objects
+function tableToRecords(table, sharedColumns) {
+    const columns = {}
+    for (const name of table.shared || []) columns[name] = sharedColumns[name]
+    Object.assign(columns, table.columns)
+    const names = Object.keys(columns)
+    const rows = new Array(table.length)
+    for (let i = 0; i < table.length; i++) {
+        const row = {}
+        for (const name of names) row[name] = columnValue(columns[name], i)
+        rows[i] = row
+    }
+    return rows
+}
+
+// Columnar payload -> records payload
+export function decodePayload(payload) {
+    if (!payload || payload.encoding !== 'columnar') return payload
+    const { shared_columns: sharedColumns = {}, encoding, ...rest } = payload
+    for (const [key, value] of Object.entries(rest)) {
+        if (value && typeof value === 'object' && 'columns' in value && 'length' in value) {
+            rest[key] = tableToRecords(value, sharedColumns)
+        }
+    }
+    return rest
+}